@@ -0,0 +1,19 @@
+"""
+Shared mapping of parse-pool failures to HTTP errors.
+"""
+from fastapi import HTTPException
+from ..services.parse_pool import ParseCancelled, ParseQueueFull, ParseTimeout
+
+
+def pool_http_error(e: Exception) -> HTTPException:
+    if isinstance(e, ParseQueueFull):
+        return HTTPException(
+            status_code=503,
+            detail="Server busy parsing other ALS files; retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    if isinstance(e, ParseTimeout):
+        return HTTPException(status_code=504, detail=str(e))
+    if isinstance(e, ParseCancelled):
+        return HTTPException(status_code=409, detail=str(e))
+    raise TypeError(f"not a parse-pool error: {e!r}")
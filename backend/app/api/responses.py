@@ -0,0 +1,69 @@
+"""
+Response helpers for the ALS / SSD routes.
+
+  - FastJSONResponse: JSON rendered with orjson when it is installed (same bytes as
+    the stdlib path for the payloads these routes return); routes hand it their
+    payload directly, so FastAPI's own encoding pass is skipped
+  - ndjson_response(): one JSON document per line, streamed as it is produced
+  - encode_cursor() / decode_cursor(): opaque page cursors for folder pagination
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Iterator
+import base64
+import json
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used without it
+    orjson = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# NDJSON lines are sent in chunks of about this many bytes
+_NDJSON_CHUNK = 64 * 1024
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, matching starlette's JSONResponse output."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _ndjson_chunks(lines: Iterable[Any]) -> Iterator[bytes]:
+    buf = bytearray()
+    for obj in lines:
+        buf += dumps(obj)
+        buf += b"\n"
+        if len(buf) >= _NDJSON_CHUNK:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+def ndjson_response(lines: Iterable[Any]) -> StreamingResponse:
+    """Stream `lines` (JSON-serializable objects, possibly a lazy generator) as NDJSON."""
+    return StreamingResponse(_ndjson_chunks(lines), media_type=NDJSON_MEDIA_TYPE)
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(dumps(state)).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Inverse of encode_cursor(); a malformed cursor is a 400."""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(state, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return state
@@ -1,31 +1,73 @@
 # file path: /backend/app/api/routes_als.py
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import Response
 from typing import Optional, Dict, Any, List
-from ..services.als_matrix import extract_matrix, discover_matrix_sheets
-import pandas as pd
-import io
+from ..config import ReaderName
+from ..services.parse_cache import ParsedWorkbook, sheet_list_only, workbook_cache
+from ..services.parse_pool import (
+    ParseCancelled,
+    ParseQueueFull,
+    ParseTimeout,
+    diff_als_pooled,
+    extract_all_matrices_pooled,
+    parse_matrix_pooled,
+)
+from .errors import pool_http_error
+from .responses import FastJSONResponse, decode_cursor, encode_cursor, ndjson_response
+from .uploads import spool_upload, upload_or_hash
+import asyncio
 import logging
 
-router = APIRouter(prefix="/als", tags=["ALS"])
+router = APIRouter(prefix="/als", tags=["ALS"], default_response_class=FastJSONResponse)
 log = logging.getLogger("als")
 
-def _ok(payload: Dict[str, Any]) -> Dict[str, Any]:
-    return {"status": "ok", **payload}
+# als_matrix (pandas, openpyxl) is imported inside the handlers, on the first parse,
+# so the app starts and answers /als/ping without loading it
+
+def _ok(payload: Dict[str, Any]) -> FastJSONResponse:
+    return FastJSONResponse({"status": "ok", **payload})
+
+def _page_payload(
+    file_hash: str, entry: ParsedWorkbook, matrix_oid: Optional[str], limit: int, after: Optional[str]
+) -> Dict[str, Any]:
+    """A matrix_page() with total counts in meta and the page cursor for GET /als/matrix/folders."""
+    from ..services.als_matrix import matrix_counts, matrix_page
+
+    result = matrix_page(entry, matrix_oid, limit, after)
+    n_folders, n_forms = matrix_counts(entry, result["meta"]["sheet"])
+    result["meta"] = {**result["meta"], "folderCount": n_folders, "formCount": n_forms}
+    next_after = result["page"].pop("after")
+    result["page"]["nextCursor"] = None if next_after is None else encode_cursor(
+        {"h": file_hash, "m": result["meta"]["matrixOID"], "a": next_after, "n": limit}
+    )
+    return result
+
+_ALS_HASH_HELP = "SHA-256 of an ALS uploaded before (see GET /uploads/{sha256}); replaces als_file"
 
 @router.post("/matrices")
-async def list_matrices(als_file: UploadFile = File(...)) -> Dict[str, Any]:
+async def list_matrices(
+    als_file: Optional[UploadFile] = File(default=None),
+    als_hash: Optional[str] = Query(default=None, description=_ALS_HASH_HELP),
+) -> FastJSONResponse:
     """
     Returns list of available matrices (matrixOID -> sheet) as JSON.
     """
+    from ..services.als_matrix import discover_workbook
+
+    upload = await upload_or_hash(als_file, als_hash, "als")
     try:
-        content = await als_file.read()
-        if not content:
+        if not upload.size:
             raise ValueError("Empty upload")
-        xl = pd.ExcelFile(io.BytesIO(content))
-        mats = discover_matrix_sheets(xl)
-        log.info("Discovered %d matrices from %s", len(mats), als_file.filename)
+        # off the event loop: a cache miss may read the result store, and non-.xlsx
+        # workbooks are fully loaded to list their sheets
+        entry = await asyncio.to_thread(workbook_cache.get, upload.sha256, sheet_list_only)
+        if entry is None:
+            entry = await asyncio.to_thread(discover_workbook, upload.path)
+            workbook_cache.put(upload.sha256, entry)
+        mats = [dict(m) for m in entry.available]
+        log.info("Discovered %d matrices from %s", len(mats), upload.filename)
         return _ok({
-            "file_name": als_file.filename,
+            "file_name": upload.filename,
             "count": len(mats),
             "availableMatrices": mats,
             "preferredDefault": "MASTERDASHBOARD"
@@ -33,29 +75,142 @@ async def list_matrices(als_file: UploadFile = File(...)) -> Dict[str, Any]:
     except Exception as e:
         log.exception("ALS matrix discovery error")
         raise HTTPException(status_code=400, detail=f"ALS matrix discovery error: {e}")
+    finally:
+        upload.close()
 
 @router.post("/matrix")
 async def parse_matrix(
-    als_file: UploadFile = File(...),
+    als_file: Optional[UploadFile] = File(default=None),
+    als_hash: Optional[str] = Query(default=None, description=_ALS_HASH_HELP),
     matrix_oid: Optional[str] = Query(default=None, description="Pick which Matrix to parse; default prefers MASTERDASHBOARD"),
-    ssd_folder_forms: Optional[Dict[str, List[str]]] = None
-) -> Dict[str, Any]:
+    ssd_folder_forms: Optional[Dict[str, List[str]]] = None,
+    reader: Optional[ReaderName] = Query(default=None, description="Workbook reader backend; default from WORKBOOK_READER"),
+    stream: bool = Query(default=False, description="Stream NDJSON: a meta line, one line per folder, then diff / end lines"),
+    limit: Optional[int] = Query(default=None, ge=1, description="Return only the first `limit` folders plus a cursor for the next page"),
+) -> Response:
+    from ..services.als_matrix import build_matrix_result, iter_matrix_lines
+
+    upload = await upload_or_hash(als_file, als_hash, "als")
     try:
-        content = await als_file.read()
-        if not content:
+        if not upload.size:
             raise ValueError("Empty upload")
-        result = extract_matrix(content, matrix_oid=matrix_oid, ssd_matrix=ssd_folder_forms)
+        if stream and limit is not None:
+            raise ValueError("'stream' and 'limit' cannot be combined")
+        entry = await parse_matrix_pooled(upload.path, matrix_oid, file_hash=upload.sha256, reader=reader)
+        if stream:
+            # the folders are grouped and serialized while the response is sent
+            return ndjson_response(iter_matrix_lines(entry, matrix_oid, ssd_matrix=ssd_folder_forms))
+        if limit is not None:
+            result = _page_payload(upload.sha256, entry, matrix_oid, limit, None)
+            if ssd_folder_forms is not None:
+                result["diff"] = build_matrix_result(entry, matrix_oid, ssd_matrix=ssd_folder_forms)["diff"]
+            return _ok(result)
+        result = build_matrix_result(entry, matrix_oid, ssd_matrix=ssd_folder_forms)
         folders = result.get("folders", [])
         n_forms = sum(len(f.get("forms", [])) for f in folders)
         log.info("Parsed matrix=%s: %d folders, %d forms", result.get("meta", {}).get("matrixOID"), len(folders), n_forms)
         # keep original result; just add counters for visibility
         result["meta"] = {**result.get("meta", {}), "folderCount": len(folders), "formCount": n_forms}
         return _ok(result)
+    except (ParseQueueFull, ParseTimeout, ParseCancelled) as e:
+        raise pool_http_error(e)
+    except Exception as e:
+        log.exception("ALS parse error")
+        raise HTTPException(status_code=400, detail=f"ALS parse error: {e}")
+    finally:
+        upload.close()
+
+@router.get("/matrix/folders")
+def matrix_folders_page(
+    cursor: str = Query(..., description="nextCursor of the previous page"),
+    limit: Optional[int] = Query(default=None, ge=1, description="Page size; defaults to the first page's"),
+) -> FastJSONResponse:
+    """
+    Next page of folders of a matrix paginated with POST /als/matrix?limit=N, served
+    from the parse cache. 410 once the workbook has been evicted (upload it again).
+    """
+    from ..services.als_matrix import is_parsed, matrix_parts
+
+    state = decode_cursor(cursor)
+    file_hash, matrix_oid, after = state.get("h"), state.get("m"), state.get("a")
+    if not isinstance(file_hash, str) or not isinstance(after, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    entry = workbook_cache.get(file_hash, matrix_parts(matrix_oid))
+    if entry is None or not is_parsed(entry, matrix_oid):
+        raise HTTPException(status_code=410, detail="Parsed workbook is no longer cached; upload it again")
+    try:
+        return _ok(_page_payload(file_hash, entry, matrix_oid, limit or int(state.get("n") or 100), after))
+    except Exception as e:
+        log.exception("ALS page error")
+        raise HTTPException(status_code=400, detail=f"ALS page error: {e}")
+
+@router.post("/matrix/all")
+async def parse_all_matrices(
+    als_file: UploadFile = File(...),
+    concurrent: bool = Query(default=False, description="Parse the matrix sheets in parallel worker processes"),
+    reader: Optional[ReaderName] = Query(default=None, description="Workbook reader backend; default from WORKBOOK_READER"),
+) -> FastJSONResponse:
+    """
+    Parses every matrix sheet in one workbook pass; returns matrixOID -> folders structure.
+    """
+    upload = await spool_upload(als_file)
+    try:
+        if not upload.size:
+            raise ValueError("Empty upload")
+        result = await extract_all_matrices_pooled(
+            upload.path, file_hash=upload.sha256, concurrent=concurrent, reader=reader
+        )
+        for parsed in result["matrices"].values():
+            folders = parsed.get("folders", [])
+            n_forms = sum(len(f.get("forms", [])) for f in folders)
+            parsed["meta"] = {**parsed.get("meta", {}), "folderCount": len(folders), "formCount": n_forms}
+        log.info("Parsed %d matrices from %s", result["meta"]["matrixCount"], als_file.filename)
+        return _ok(result)
+    except (ParseQueueFull, ParseTimeout, ParseCancelled) as e:
+        raise pool_http_error(e)
     except Exception as e:
         log.exception("ALS parse error")
         raise HTTPException(status_code=400, detail=f"ALS parse error: {e}")
+    finally:
+        upload.close()
+
+@router.post("/diff")
+async def diff_versions(
+    old_file: UploadFile = File(..., description="Previous ALS version"),
+    new_file: UploadFile = File(..., description="Amended ALS version"),
+    reader: Optional[ReaderName] = Query(default=None, description="Workbook reader backend; default from WORKBOOK_READER"),
+) -> FastJSONResponse:
+    """
+    Diffs two ALS versions: matrices added/removed, FolderName/DraftFormName changes,
+    and forms added to/removed from folders per matrix. Unchanged sheets are skipped.
+    """
+    old_upload = await spool_upload(old_file)
+    try:
+        new_upload = await spool_upload(new_file)
+    except BaseException:
+        old_upload.close()
+        raise
+    try:
+        if not old_upload.size or not new_upload.size:
+            raise ValueError("Empty upload")
+        diff = await diff_als_pooled(
+            old_upload.path, new_upload.path, old_upload.sha256, new_upload.sha256, reader=reader
+        )
+        log.info(
+            "Diffed %s -> %s: %d changed sheets",
+            old_file.filename, new_file.filename, len(diff["meta"]["changedSheets"]),
+        )
+        return _ok({"old_file_name": old_file.filename, "new_file_name": new_file.filename, **diff})
+    except (ParseQueueFull, ParseTimeout, ParseCancelled) as e:
+        raise pool_http_error(e)
+    except Exception as e:
+        log.exception("ALS diff error")
+        raise HTTPException(status_code=400, detail=f"ALS diff error: {e}")
+    finally:
+        old_upload.close()
+        new_upload.close()
 
 # Optional: very small ping to test server quickly
 @router.get("/ping")
-def ping() -> Dict[str, Any]:
+def ping() -> FastJSONResponse:
     return _ok({"message":"pong"})
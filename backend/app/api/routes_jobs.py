@@ -0,0 +1,112 @@
+"""
+Parse job API
+Submit an ALS matrix parse or an SSD compare as a background job and poll for it:
+  - POST /jobs/als-matrix, POST /jobs/ssd-compare -> 202 { job: {id, status, ...}, deduplicated }
+  - GET  /jobs/{id} -> { job: {..., status, step, progress, error}, result }   (result once done)
+
+Results are the payloads of POST /als/matrix and POST /ssd/compare (without "status").
+Identical submissions (same file hashes and parameters) share one job.
+"""
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import Response
+from typing import Dict, Any, Optional
+from ..services import jobs
+from ..config import ReaderName
+from ..services.parse_pool import extract_matrix_pooled
+from .responses import FastJSONResponse, dumps
+from .routes_ssd import _compare_payload, _parse_ssd_upload
+from .uploads import spool_upload
+import asyncio
+import logging
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"], default_response_class=FastJSONResponse)
+log = logging.getLogger("jobs")
+
+
+def _accepted(job: Dict[str, Any], created: bool) -> FastJSONResponse:
+    return FastJSONResponse({"status": "ok", "job": job, "deduplicated": not created}, status_code=202)
+
+
+@router.post("/als-matrix", status_code=202)
+async def submit_als_matrix(
+    als_file: UploadFile = File(...),
+    matrix_oid: Optional[str] = Query(default=None, description="Pick which Matrix to parse; default prefers MASTERDASHBOARD"),
+    reader: Optional[ReaderName] = Query(default=None, description="Workbook reader backend; default from WORKBOOK_READER"),
+) -> FastJSONResponse:
+    upload = await spool_upload(als_file)
+    if not upload.size:
+        upload.close()
+        raise HTTPException(status_code=400, detail="ALS file is empty")
+
+    async def work(progress: jobs.Progress) -> bytes:
+        progress("parse", 0.1)
+        result = await extract_matrix_pooled(upload.path, file_hash=upload.sha256, matrix_oid=matrix_oid, reader=reader)
+        progress("serialize", 0.9)
+        folders = result.get("folders", [])
+        n_forms = sum(len(f.get("forms", [])) for f in folders)
+        result["meta"] = {**result.get("meta", {}), "folderCount": len(folders), "formCount": n_forms}
+        return dumps(result)
+
+    params = {"file_name": als_file.filename, "matrix_oid": matrix_oid}
+    # both reader backends give the same result, so the reader is not part of the key
+    key = jobs.dedupe_key("als-matrix", als=upload.sha256, matrix_oid=matrix_oid)
+    job, created = await jobs.submit("als-matrix", key, params, work, upload.close)
+    log.info("Job %s (als-matrix) %s for %s", job["id"], "queued" if created else "reused", als_file.filename)
+    return _accepted(job, created)
+
+
+@router.post("/ssd-compare", status_code=202)
+async def submit_ssd_compare(
+    als_file: UploadFile = File(...),
+    ssd_file: UploadFile = File(...),
+    matrix_oid: Optional[str] = Query(default=None),
+    reader: Optional[ReaderName] = Query(default=None, description="Workbook reader backend; default from WORKBOOK_READER"),
+) -> FastJSONResponse:
+    als_upload = await spool_upload(als_file)
+    try:
+        ssd_upload = await spool_upload(ssd_file)
+    except BaseException:
+        als_upload.close()
+        raise
+
+    def cleanup() -> None:
+        als_upload.close()
+        ssd_upload.close()
+
+    if not als_upload.size or not ssd_upload.size:
+        cleanup()
+        raise HTTPException(status_code=400, detail=f"{'ALS' if not als_upload.size else 'SSD'} file is empty")
+    ssd_name = ssd_file.filename or ""
+
+    async def work(progress: jobs.Progress) -> bytes:
+        progress("ssd_parse", 0.05)
+        ssd_map = await asyncio.to_thread(_parse_ssd_upload, ssd_upload.path, ssd_name, ssd_upload.sha256, reader)
+        progress("parse", 0.2)
+        parsed = await extract_matrix_pooled(
+            als_upload.path, file_hash=als_upload.sha256, matrix_oid=matrix_oid, ssd_matrix=ssd_map, reader=reader
+        )
+        progress("serialize", 0.9)
+        return dumps(_compare_payload(parsed))
+
+    params = {"als_file_name": als_file.filename, "ssd_file_name": ssd_name, "matrix_oid": matrix_oid}
+    # the SSD format comes from the file extension, so it is part of the key
+    key = jobs.dedupe_key(
+        "ssd-compare", als=als_upload.sha256, ssd=ssd_upload.sha256,
+        ssd_format=ssd_name.lower().rsplit(".", 1)[-1], matrix_oid=matrix_oid,
+    )
+    job, created = await jobs.submit("ssd-compare", key, params, work, cleanup)
+    log.info("Job %s (ssd-compare) %s for %s", job["id"], "queued" if created else "reused", als_file.filename)
+    return _accepted(job, created)
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str) -> Response:
+    """Job status and progress; `result` holds the payload once the job is done."""
+    store = jobs.get_store()
+    job = await asyncio.to_thread(store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    result = await asyncio.to_thread(store.result, job_id) if job["status"] == jobs.DONE else None
+    # the stored result is already JSON; splice it in instead of decoding it again
+    body = b'{"status":"ok","job":' + dumps(job) + b',"result":' + (result or b"null") + b"}"
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,71 @@
+"""
+Progress API
+Follow a parse while it runs, and cancel it:
+  - WS /progress/{channel}: server -> client, one JSON event per message (see
+    services.progress), each with its `seq`; the socket closes after the "end" event
+  - client -> server: {"action": "cancel"} stops the parse; answered with {"type": "cancelling"}
+
+A channel is a job id (POST /jobs/...) or the `progress_id` passed to a synchronous
+route (e.g. POST /als/matrix?progress_id=abc); connect before or while the request
+runs, events already published are sent first. A cancelled synchronous request
+answers 409, a cancelled job ends with status "error".
+"""
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from ..services import progress
+from .responses import dumps
+import asyncio
+
+router = APIRouter(prefix="/progress", tags=["Progress"])
+
+# new events are looked for this often (seconds)
+_POLL_S = 0.1
+# a channel without events for this long is closed (seconds)
+_IDLE_S = 600.0
+
+
+async def _send_events(ws: WebSocket, store: progress.ProgressStore, channel: str) -> None:
+    after, idle = 0, 0.0
+    while idle < _IDLE_S:
+        events = await asyncio.to_thread(store.events, channel, after)
+        if not events:
+            await asyncio.sleep(_POLL_S)
+            idle += _POLL_S
+            continue
+        idle = 0.0
+        for seq, event in events:
+            await ws.send_text(dumps({**event, "seq": seq}).decode("utf-8"))
+            after = seq
+            if event.get("type") == "end":
+                return
+
+
+async def _receive_commands(ws: WebSocket, store: progress.ProgressStore, channel: str) -> None:
+    while True:
+        try:
+            message = await ws.receive_json()
+        except ValueError:
+            continue  # not JSON; ignore
+        if isinstance(message, dict) and message.get("action") == "cancel":
+            await asyncio.to_thread(store.request_cancel, channel)
+            await ws.send_text('{"type":"cancelling"}')
+
+
+@router.websocket("/{channel}")
+async def follow_progress(ws: WebSocket, channel: str) -> None:
+    if not progress.is_channel_id(channel):
+        await ws.close(code=1008, reason="Invalid channel id")
+        return
+    await ws.accept()
+    store = progress.get_store()
+    sender = asyncio.create_task(_send_events(ws, store, channel))
+    receiver = asyncio.create_task(_receive_commands(ws, store, channel))
+    try:
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (sender, receiver):
+            task.cancel()
+        await asyncio.gather(sender, receiver, return_exceptions=True)
+    try:
+        await ws.close()
+    except (RuntimeError, WebSocketDisconnect):
+        pass  # the client went first
@@ -8,120 +8,165 @@ Response keys include both snake_case and camelCase for convenience:
   - missingInDB, extraInDB (aliases of the above)
 """
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query
-from typing import Dict, Any, List, Optional
-from ..services.als_matrix import extract_matrix
-import pandas as pd
-import json
-import io
-
-router = APIRouter(prefix="/ssd", tags=["SSD"])
-
-
-def _map_from_rows(df: pd.DataFrame) -> Dict[str, List[str]]:
-    # normalize column names for lookup
-    cols = {str(c).strip().lower(): str(c) for c in df.columns}
-    def pick(options: List[str]) -> Optional[str]:
-        for opt in options:
-            k = opt.strip().lower()
-            if k in cols:
-                return cols[k]
-        return None
-
-    fo_col = pick(["FolderOID", "Folder OID"])  # type: ignore[arg-type]
-    # Form OID may be labeled just "OID" in SSD exports
-    fm_col = pick(["OID", "FormOID", "Form OID"])      # type: ignore[arg-type]
-    if not fo_col or not fm_col:
-        return {}
-    out: Dict[str, List[str]] = {}
-    seen: Dict[str, set] = {}
-    for _, r in df.iterrows():
-        fo = str(r.get(fo_col) or "").strip()
-        fm = str(r.get(fm_col) or "").strip()
-        if not fo or not fm:
-            continue
-        # normalize for robust comparison (case-insensitive)
-        fm_norm = fm.upper()
-        fo_norm = fo.upper()
-        if fo_norm not in seen:
-            seen[fo_norm] = set()
-        if fm_norm not in seen[fo_norm]:
-            seen[fo_norm].add(fm_norm)
-    for k, v in seen.items():
-        out[k] = sorted(v)
-    return out
-
-
-def _parse_ssd_upload(content: bytes, filename: str) -> Dict[str, List[str]]:
-    name = filename.lower()
-    # JSON path
-    if name.endswith(".json"):
-        try:
-            obj = json.loads(content.decode("utf-8"))
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
-        if isinstance(obj, dict):
-            out: Dict[str, List[str]] = {}
-            for k, v in obj.items():
-                if isinstance(v, list):
-                    out[str(k)] = sorted({str(x).upper() for x in v})
-            return out
-        if isinstance(obj, list):
-            try:
-                df = pd.DataFrame(obj)
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Invalid JSON rows: {e}")
-            return _map_from_rows(df)
-        raise HTTPException(status_code=400, detail="Unsupported JSON structure for SSD")
+from typing import Dict, Any, List, Optional, Union
+from ..config import ALS_PARSE_WORKERS, BATCH_MAX_FILES, ReaderName
+from ..services.parse_pool import ParseCancelled, ParseQueueFull, ParseTimeout, extract_matrix_pooled
+from .errors import pool_http_error
+from .responses import FastJSONResponse
+from .uploads import SpooledUpload, spool_upload, upload_or_hash
+import asyncio
+import logging
 
-    # CSV path
-    if name.endswith(".csv"):
-        try:
-            df = pd.read_csv(io.BytesIO(content), dtype=str, keep_default_na=False)
-            return _map_from_rows(df)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Invalid CSV: {e}")
+router = APIRouter(prefix="/ssd", tags=["SSD"], default_response_class=FastJSONResponse)
+log = logging.getLogger("ssd")
 
-    # Excel path
-    if name.endswith(".xlsx") or name.endswith(".xls"):
-        try:
-            df = pd.read_excel(io.BytesIO(content), engine="openpyxl", dtype=str, keep_default_na=False)
-            return _map_from_rows(df)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Invalid Excel file: {e}")
 
-    raise HTTPException(status_code=400, detail="Unsupported SSD file format; use JSON, CSV, or XLSX")
+def _parse_ssd_upload(
+    source: Union[bytes, str], filename: str, file_hash: Optional[str] = None, reader: Optional[str] = None
+) -> Dict[str, List[str]]:
+    # imported on first use: ssd_reader loads pandas
+    from ..services.ssd_reader import SSDFormatError, read_ssd
+
+    try:
+        return read_ssd(source, filename, file_hash, reader)
+    except SSDFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _compare_payload(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    diff = parsed.get("diff", {"missing_in_db": {}, "extra_in_db": {}})
+    folders = parsed.get("folders", [])
+    n_forms = sum(len(f.get("forms", [])) for f in folders)
+    return {
+        "meta": parsed.get("meta", {}),
+        "counts": {"folders": len(folders), "forms": n_forms},
+        "diff": diff,
+        # camelCase aliases
+        "missingInDB": diff.get("missing_in_db", {}),
+        "extraInDB": diff.get("extra_in_db", {}),
+    }
 
 
 @router.post("/compare")
 async def compare(
-    als_file: UploadFile = File(...),
-    ssd_file: UploadFile = File(...),
-    matrix_oid: Optional[str] = Query(default=None)
-) -> Dict[str, Any]:
+    als_file: Optional[UploadFile] = File(default=None),
+    ssd_file: Optional[UploadFile] = File(default=None),
+    matrix_oid: Optional[str] = Query(default=None),
+    reader: Optional[ReaderName] = Query(default=None, description="Workbook reader backend; default from WORKBOOK_READER"),
+    als_hash: Optional[str] = Query(default=None, description="SHA-256 of an ALS uploaded before; replaces als_file"),
+    ssd_hash: Optional[str] = Query(default=None, description="SHA-256 of an SSD uploaded before; replaces ssd_file"),
+) -> FastJSONResponse:
+    """
+    Compare an ALS against an SSD. Either file can be replaced by the hash of an
+    earlier upload (GET /uploads/{sha256} tells whether the server still holds it).
+    """
+    als_upload = await upload_or_hash(als_file, als_hash, "als")
     try:
-        als_bytes = await als_file.read()
-        ssd_bytes = await ssd_file.read()
-        if not als_bytes:
+        ssd_upload = await upload_or_hash(ssd_file, ssd_hash, "ssd")
+    except BaseException:
+        als_upload.close()
+        raise
+    try:
+        if not als_upload.size:
             raise HTTPException(status_code=400, detail="ALS file is empty")
-        if not ssd_bytes:
+        if not ssd_upload.size:
             raise HTTPException(status_code=400, detail="SSD file is empty")
 
-        ssd_map = _parse_ssd_upload(ssd_bytes, ssd_file.filename or "")
+        ssd_map = await asyncio.to_thread(
+            _parse_ssd_upload, ssd_upload.path, ssd_upload.filename, ssd_upload.sha256, reader
+        )
         # Reuse extract_matrix to compute diff
-        parsed = extract_matrix(als_bytes, matrix_oid=matrix_oid, ssd_matrix=ssd_map)
-        diff = parsed.get("diff", {"missing_in_db": {}, "extra_in_db": {}})
-        folders = parsed.get("folders", [])
-        n_forms = sum(len(f.get("forms", [])) for f in folders)
-        return {
-            "status": "ok",
-            "meta": parsed.get("meta", {}),
-            "counts": {"folders": len(folders), "forms": n_forms},
-            "diff": diff,
-            # camelCase aliases
-            "missingInDB": diff.get("missing_in_db", {}),
-            "extraInDB": diff.get("extra_in_db", {}),
-        }
+        parsed = await extract_matrix_pooled(
+            als_upload.path, file_hash=als_upload.sha256, matrix_oid=matrix_oid, ssd_matrix=ssd_map, reader=reader
+        )
+        return FastJSONResponse({"status": "ok", **_compare_payload(parsed)})
     except HTTPException:
         raise
+    except (ParseQueueFull, ParseTimeout, ParseCancelled) as e:
+        raise pool_http_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"SSD compare error: {e}")
+    finally:
+        als_upload.close()
+        ssd_upload.close()
+
+
+@router.post("/compare/batch")
+async def compare_batch(
+    als_files: List[UploadFile] = File(...),
+    ssd_file: UploadFile = File(...),
+    matrix_oid: Optional[str] = Query(default=None),
+    reader: Optional[ReaderName] = Query(default=None, description="Workbook reader backend; default from WORKBOOK_READER"),
+) -> FastJSONResponse:
+    """
+    Compare many ALS files (at most BATCH_MAX_FILES) against one SSD specification.
+    The SSD is parsed once; ALS files are parsed in parallel in the worker pool.
+    A failing ALS file is reported in its own result and does not abort the others; a
+    full parse queue is waited out rather than reported.
+    """
+    if len(als_files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_FILES} ALS files per batch")
+    uploads: List[SpooledUpload] = []
+    try:
+        ssd_upload = await spool_upload(ssd_file)
+        uploads.append(ssd_upload)
+        if not ssd_upload.size:
+            raise HTTPException(status_code=400, detail="SSD file is empty")
+        als_uploads = []
+        for f in als_files:
+            als_uploads.append(await spool_upload(f))
+            uploads.append(als_uploads[-1])
+
+        ssd_map = await asyncio.to_thread(
+            _parse_ssd_upload, ssd_upload.path, ssd_file.filename or "", ssd_upload.sha256, reader
+        )
+
+        # keep at most one parse per pool worker in flight so a big batch queues here
+        # instead of overflowing the pool's admission limit
+        gate = asyncio.Semaphore(max(ALS_PARSE_WORKERS, 1))
+
+        async def one(upload: SpooledUpload) -> Dict[str, Any]:
+            if not upload.size:
+                return {"file_name": upload.filename, "status": "error", "error": "ALS file is empty"}
+            try:
+                async with gate:
+                    while True:
+                        try:
+                            parsed = await extract_matrix_pooled(
+                                upload.path, file_hash=upload.sha256, matrix_oid=matrix_oid, ssd_matrix=ssd_map,
+                                reader=reader,
+                            )
+                            break
+                        except ParseQueueFull as e:
+                            # other requests hold the pool: wait for room as jobs do, the file itself is fine
+                            await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                log.warning("Batch compare failed for %s: %s", upload.filename, e)
+                return {"file_name": upload.filename, "status": "error", "error": str(e) or type(e).__name__}
+            return {"file_name": upload.filename, "status": "ok", **_compare_payload(parsed)}
+
+        results = await asyncio.gather(*(one(u) for u in als_uploads))
+        ok = [r for r in results if r["status"] == "ok"]
+        return FastJSONResponse({
+            "status": "ok",
+            "ssd": {
+                "file_name": ssd_file.filename,
+                "folders": len(ssd_map),
+                "forms": sum(len(v) for v in ssd_map.values()),
+            },
+            "counts": {
+                "files": len(results),
+                "ok": len(ok),
+                "failed": len(results) - len(ok),
+                "missingInDB": sum(sum(len(v) for v in r["missingInDB"].values()) for r in ok),
+                "extraInDB": sum(sum(len(v) for v in r["extraInDB"].values()) for r in ok),
+            },
+            "results": results,
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"SSD batch compare error: {e}")
+    finally:
+        for u in uploads:
+            u.close()
@@ -0,0 +1,28 @@
+"""
+Upload check API
+Lets clients on slow links skip re-sending files the server already holds:
+  - GET /uploads/{sha256} -> { upload: {sha256, file_name, size, stored, expires} }, 404 if unknown
+
+Held uploads are used by passing `als_hash` / `ssd_hash` instead of the file to
+POST /als/matrices, POST /als/matrix and POST /ssd/compare. Checking an upload counts
+as using it, so it does not expire right after a successful check.
+"""
+from fastapi import APIRouter, HTTPException
+from ..services import upload_store
+from .responses import FastJSONResponse
+import asyncio
+
+router = APIRouter(prefix="/uploads", tags=["Uploads"], default_response_class=FastJSONResponse)
+
+
+@router.get("/{sha256}")
+async def check_upload(sha256: str) -> FastJSONResponse:
+    """Whether the server holds the upload with this SHA-256 (hex) of its content."""
+    key = upload_store.normalize_hash(sha256)
+    if key is None:
+        raise HTTPException(status_code=400, detail="Expected a hex SHA-256")
+    store = upload_store.get_store()
+    info = await asyncio.to_thread(store.info, key) if store is not None else None
+    if info is None:
+        raise HTTPException(status_code=404, detail="Unknown upload; send the file")
+    return FastJSONResponse({"status": "ok", "upload": info})
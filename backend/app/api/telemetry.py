@@ -0,0 +1,72 @@
+"""
+Request timing: Server-Timing response headers and latency metrics.
+
+TimingMiddleware binds a PhaseTimer to each HTTP request, so the phases recorded
+while it is handled (upload spooling, workbook load, meta sheets, header detection,
+pair extraction, SSD parsing and diff, ...) are returned in a Server-Timing header,
+e.g.
+
+    Server-Timing: upload;dur=41.2;desc="bytes=5242880", workbook_load;dur=812.0;desc="sheets=14", ..., total;dur=905.3
+
+and observed into the /metrics histograms together with the request latency per route.
+
+A request with a `progress_id` query parameter also publishes its phases, as they
+complete, to that progress channel (WS /progress/{progress_id}), followed by an
+"end" event once the response is sent.
+"""
+from __future__ import annotations
+from typing import Optional
+from urllib.parse import parse_qs
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..services import progress
+from ..services.metrics import observe_phases, observe_request
+from ..services.timing import PhaseTimer, activate, deactivate
+
+def progress_channel(scope: Scope) -> Optional[str]:
+    """The request's `progress_id` query parameter, if it is a valid channel name."""
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("progress_id")
+    if values and progress.is_channel_id(values[-1]):
+        return values[-1]
+    return None
+
+
+class TimingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        channel = progress_channel(scope)
+        if channel is not None:
+            await progress.in_order(progress.get_store().open, channel)
+        timer = PhaseTimer(progress.ChannelListener(channel, queued=True) if channel is not None else None)
+        token = activate(timer)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def timed_send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_ms = (time.perf_counter() - t0) * 1000
+                headers = list(message.get("headers") or [])
+                headers.append((b"server-timing", timer.server_timing(total_ms).encode("latin-1", "replace")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            deactivate(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            observe_request(route, scope.get("method", ""), status, time.perf_counter() - t0)
+            observe_phases(timer.records)
+            if channel is not None:
+                outcome = "done" if status < 400 else "cancelled" if status == 409 else "error"
+                await progress.in_order(
+                    progress.get_store().end, channel, outcome, None if status < 400 else f"HTTP {status}"
+                )
@@ -0,0 +1,161 @@
+"""
+Streaming, size-bounded uploads.
+
+- BodySizeLimitMiddleware rejects oversized requests with 413 as soon as the
+  Content-Length header (or the streamed byte count) exceeds UPLOAD_MAX_BYTES
+  (BATCH_MAX_BYTES for the multi-file batch route), before the body is fully received.
+- spool_upload() copies an UploadFile to a temp file on disk in chunks while
+  hashing it, in a thread (starlette has already received the body into its own
+  spooled file), so the parsers can open it by path instead of holding it in memory.
+  The file is also kept in the upload store (services.upload_store) under its hash.
+- upload_or_hash() is the same for routes that accept either a file or the SHA-256
+  of an earlier upload (`als_hash` / `ssd_hash`).
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+from fastapi import HTTPException, UploadFile
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..config import BATCH_MAX_BYTES, UPLOAD_MAX_BYTES, UPLOAD_SPOOL_DIR
+from ..services import upload_store
+from ..services.metrics import observe_upload
+from ..services.timing import phase
+
+log = logging.getLogger("als.uploads")
+
+CHUNK_SIZE = 1024 * 1024
+# request body limits of routes that take many files (path -> bytes)
+ROUTE_BODY_LIMITS = {"/ssd/compare/batch": BATCH_MAX_BYTES}
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds the {limit} byte limit")
+
+
+class BodySizeLimitMiddleware:
+    def __init__(
+        self, app: ASGIApp, max_bytes: int = UPLOAD_MAX_BYTES, route_limits: Optional[Dict[str, int]] = None
+    ):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.route_limits = ROUTE_BODY_LIMITS if route_limits is None else route_limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.route_limits.get(scope.get("path", ""), self.max_bytes)
+        if scope["type"] != "http" or limit <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            await _send_413(send, limit)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def _send_413(send: Send, limit: int) -> None:
+    body = ('{"detail":"Upload exceeds the %d byte limit"}' % limit).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+@dataclass
+class SpooledUpload:
+    """An upload copied to disk; `sha256` is computed while streaming."""
+    path: str
+    size: int
+    sha256: str
+    filename: str
+
+    def close(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _copy_hashed(src: BinaryIO, fd: int, max_bytes: int) -> Tuple[int, str]:
+    """Copy `src` from its start into the open file `fd` in CHUNK_SIZE pieces; (size, SHA-256 hex)."""
+    digest = hashlib.sha256()
+    size = 0
+    src.seek(0)
+    with os.fdopen(fd, "wb") as out:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_bytes > 0 and size > max_bytes:
+                raise _too_large(max_bytes)
+            digest.update(chunk)
+            out.write(chunk)
+    return size, digest.hexdigest()
+
+
+async def spool_upload(upload: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> SpooledUpload:
+    """Copy `upload` to a temp file in CHUNK_SIZE pieces, hashing as we go (413 if too large)."""
+    name = upload.filename or ""
+    suffix = os.path.splitext(name)[1].lower()
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=UPLOAD_SPOOL_DIR)
+    with phase("upload") as p:
+        try:
+            # blocking reads and writes of whole files: off the event loop
+            size, sha256 = await asyncio.to_thread(_copy_hashed, upload.file, fd, max_bytes)
+        except BaseException:
+            os.unlink(path)
+            raise
+        p["bytes"] = size
+    observe_upload(size)
+    spooled = SpooledUpload(path=path, size=size, sha256=sha256, filename=name)
+    store = upload_store.get_store()
+    if store is not None and size:
+        try:
+            await asyncio.to_thread(store.put, path, spooled.sha256, name, size)
+        except (OSError, sqlite3.Error) as e:
+            log.warning("Could not keep upload %s: %s", spooled.sha256, e)
+    return spooled
+
+
+async def upload_or_hash(upload: Optional[UploadFile], file_hash: Optional[str], field: str) -> SpooledUpload:
+    """
+    The spooled `upload`, or a private copy of the stored upload whose SHA-256 is
+    `file_hash`. Exactly one must be given (400); an unknown hash is a 404, after which
+    the client sends the file itself. `field` names the pair in errors ("als" / "ssd").
+    """
+    if (upload is None) == (file_hash is None):
+        raise HTTPException(status_code=400, detail=f"Send either {field}_file or {field}_hash")
+    if upload is not None:
+        return await spool_upload(upload)
+    sha256 = upload_store.normalize_hash(file_hash)
+    if sha256 is None:
+        raise HTTPException(status_code=400, detail=f"{field}_hash must be a hex SHA-256")
+    store = upload_store.get_store()
+    with phase("upload", cached=True) as p:
+        held = await asyncio.to_thread(store.check_out, sha256) if store is not None else None
+        if held is None:
+            raise HTTPException(status_code=404, detail=f"Unknown {field}_hash; upload the file")
+        p["bytes"] = held["size"]
+    return SpooledUpload(path=held["path"], size=held["size"], sha256=sha256, filename=held["file_name"])
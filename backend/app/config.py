@@ -0,0 +1,70 @@
+"""
+Service settings.
+All values can be overridden through environment variables of the same name.
+"""
+import os
+import tempfile
+from typing import Literal
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+# Byte budget of the in-process parsed-ALS cache (LRU eviction above this)
+ALS_CACHE_MAX_BYTES = _env_int("ALS_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+
+# Process pool for CPU-bound ALS parsing (0 = parse in a thread of the API process)
+ALS_PARSE_WORKERS = _env_int("ALS_PARSE_WORKERS", os.cpu_count() or 1)
+# Parses admitted at once (running + waiting); beyond this requests get 503
+ALS_PARSE_QUEUE_MAX = _env_int("ALS_PARSE_QUEUE_MAX", max(ALS_PARSE_WORKERS, 1) * 4)
+# Per-request parse timeout in seconds; the worker running it is killed on expiry
+ALS_PARSE_TIMEOUT_S = _env_int("ALS_PARSE_TIMEOUT_S", 120)
+# Retry-After value (seconds) sent with 503 when the parse queue is full
+ALS_PARSE_RETRY_AFTER_S = _env_int("ALS_PARSE_RETRY_AFTER_S", 5)
+# 1 = warm up in the background at startup: import pandas / openpyxl and the parse
+# modules, and start the parse worker processes, before the first parse needs them
+ALS_WARMUP = _env_int("ALS_WARMUP", 0)
+
+# Largest accepted request body / single upload, in bytes (413 above this)
+UPLOAD_MAX_BYTES = _env_int("UPLOAD_MAX_BYTES", 200 * 1024 * 1024)
+# POST /ssd/compare/batch: most ALS files per request, and the largest request body
+# (default: four times UPLOAD_MAX_BYTES, 800 MB; every file is still held to
+# UPLOAD_MAX_BYTES, so raise this for batches of many large exports)
+BATCH_MAX_FILES = _env_int("BATCH_MAX_FILES", 50)
+BATCH_MAX_BYTES = _env_int("BATCH_MAX_BYTES", UPLOAD_MAX_BYTES * 4)
+# Directory uploads are spooled to while a request is parsed (default: system temp dir)
+UPLOAD_SPOOL_DIR = os.environ.get("UPLOAD_SPOOL_DIR", "").strip() or None
+# Recent uploads kept by content hash (routes accept als_hash / ssd_hash instead of a
+# file): directory, byte budget (LRU eviction above it; 0 disables) and how long an
+# unused upload is kept, in seconds
+UPLOAD_STORE_DIR = os.environ.get("UPLOAD_STORE_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "als-uploads")
+UPLOAD_STORE_MAX_BYTES = _env_int("UPLOAD_STORE_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+UPLOAD_STORE_TTL_S = _env_int("UPLOAD_STORE_TTL_S", 24 * 3600)
+
+# Byte budget of the in-process parsed-SSD cache (keyed by SSD content hash)
+SSD_CACHE_MAX_BYTES = _env_int("SSD_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+# Rows per chunk when streaming CSV / XLSX SSD exports
+SSD_CHUNK_ROWS = _env_int("SSD_CHUNK_ROWS", 50_000)
+
+# Workbook reader backend: "fast" (streams the xlsx XML) or "openpyxl" (pd.read_excel)
+READERS = ("fast", "openpyxl")
+ReaderName = Literal["fast", "openpyxl"]
+WORKBOOK_READER = os.environ.get("WORKBOOK_READER", "").strip().lower() or "fast"
+
+# Parse jobs (POST /jobs/*): SQLite job/result store directory, result lifetime in
+# seconds (0 = keep), and how many jobs parse at once per API process
+JOB_STORE_DIR = os.environ.get("JOB_STORE_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "als-jobs")
+JOB_TTL_S = _env_int("JOB_TTL_S", 24 * 3600)
+JOB_MAX_RUNNING = _env_int("JOB_MAX_RUNNING", max(ALS_PARSE_WORKERS, 1))
+
+# Persistent parse results shared by all processes and kept across restarts: SQLite
+# store directory and byte budget (LRU eviction above it; 0 disables the store)
+RESULT_STORE_DIR = os.environ.get("RESULT_STORE_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "als-results")
+RESULT_STORE_MAX_BYTES = _env_int("RESULT_STORE_MAX_BYTES", 1024 * 1024 * 1024)
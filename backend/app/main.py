@@ -1,15 +1,45 @@
 # file path: /backend/app/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from .api.routes_als import router as als_router
+from .api.routes_jobs import router as jobs_router
+from .api.routes_progress import router as progress_router
 from .api.routes_ssd import router as ssd_router
+from .api.routes_uploads import router as uploads_router
+from .api.telemetry import TimingMiddleware
+from .api.uploads import BodySizeLimitMiddleware
+from .config import ALS_WARMUP
+from .services import jobs, metrics
+from .services.parse_pool import shutdown_pool, warm_up
+import asyncio
 import logging
 
-app = FastAPI(title="ALS Matrix Service")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # opt-in: load the parsers and start the parse workers in the background, so the
+    # app answers right away and the first parse does not pay for the imports
+    warming = asyncio.create_task(warm_up()) if ALS_WARMUP else None
+    yield
+    if warming is not None:
+        warming.cancel()
+    await jobs.cancel_all()
+    shutdown_pool()
+
+
+app = FastAPI(title="ALS Matrix Service", lifespan=lifespan)
 
 # Simple logging baseline
 logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
 
+# reject oversized uploads with 413 before the body is fully received
+app.add_middleware(BodySizeLimitMiddleware)
+
+# per-phase Server-Timing headers and request latency histograms
+app.add_middleware(TimingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # tighten in prod
@@ -20,3 +50,12 @@ app.add_middleware(
 
 app.include_router(als_router)
 app.include_router(ssd_router)
+app.include_router(jobs_router)
+app.include_router(uploads_router)
+app.include_router(progress_router)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics() -> PlainTextResponse:
+    """Prometheus text exposition: route/phase latency histograms, cache and pool gauges."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
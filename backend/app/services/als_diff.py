@@ -0,0 +1,181 @@
+"""
+ALS-to-ALS version diff (amendments).
+
+Reports, between an old and a new ALS export:
+  - matrices added / removed
+  - FolderName and DraftFormName changes for OIDs present in both versions
+  - per matrix: forms added to / removed from each folder
+
+Each worksheet XML part inside the two xlsx archives is fingerprinted first, and only
+sheets whose fingerprints differ are parsed; unchanged sheets cannot contribute to the
+diff. Inputs that are not xlsx archives are parsed in full.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import zipfile
+from xml.etree import ElementTree
+from .als_matrix import discover_workbook, fill_all_parsed, find_sheet_name
+from .incidence import Incidence, Vocabulary
+from .parse_cache import ParsedWorkbook
+from .workbook_reader import Source, _as_file, _local, _text_content, shared_strings, sheet_parts
+
+
+def _resolved_digest(zf: zipfile.ZipFile, part: str, strings: List[str]) -> str:
+    """Digest of a sheet's cell values with shared-string indices resolved to their text."""
+    digest = hashlib.sha256()
+    with zf.open(part) as fh:
+        for _, el in ElementTree.iterparse(fh):
+            if _local(el.tag) != "c":
+                continue
+            kind = el.get("t") or ""
+            value = ""
+            for child in el:
+                tag = _local(child.tag)
+                if tag == "v":
+                    value = child.text or ""
+                elif tag == "is":
+                    value = _text_content(child)
+            if kind == "s" and value.isdigit() and int(value) < len(strings):
+                value = strings[int(value)]
+            if value == "":
+                el.clear()
+                continue
+            digest.update(f"{el.get('r', '')}\x1f{kind}\x1f{value}\x1e".encode("utf-8"))
+            el.clear()
+    return digest.hexdigest()
+
+
+def changed_sheets(old: Source, new: Source, sheet_pairs: List[Tuple[str, str]]) -> Optional[List[bool]]:
+    """
+    For each (old sheet, new sheet) pair, whether the two worksheets differ.
+    Part bytes are fingerprinted first; only when those differ (or the shared-strings
+    tables differ, which shifts string indices) are cell values compared, with shared
+    strings resolved and empty cells ignored, so re-save noise is not reported.
+    Returns None if either input is not an xlsx archive.
+    """
+    try:
+        with zipfile.ZipFile(_as_file(old)) as zo, zipfile.ZipFile(_as_file(new)) as zn:
+            parts_o, parts_n = sheet_parts(zo), sheet_parts(zn)
+            same_strings = _raw_digest(zo, "xl/sharedStrings.xml") == _raw_digest(zn, "xl/sharedStrings.xml")
+            strings: Dict[int, List[str]] = {}
+
+            def resolved(zf: zipfile.ZipFile, part: str) -> str:
+                if id(zf) not in strings:
+                    strings[id(zf)] = shared_strings(zf)
+                return _resolved_digest(zf, part, strings[id(zf)])
+
+            out: List[bool] = []
+            for old_sheet, new_sheet in sheet_pairs:
+                po, pn = parts_o.get(old_sheet), parts_n.get(new_sheet)
+                if po is None or pn is None:
+                    out.append(True)
+                elif same_strings and _raw_digest(zo, po) == _raw_digest(zn, pn):
+                    out.append(False)
+                else:
+                    out.append(resolved(zo, po) != resolved(zn, pn))
+            return out
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+        return None
+
+
+def _raw_digest(zf: zipfile.ZipFile, name: str) -> str:
+    try:
+        with zf.open(name) as fh:
+            digest = hashlib.sha256()
+            for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                digest.update(chunk)
+            return digest.hexdigest()
+    except KeyError:
+        return ""
+
+
+def _nonempty(pairs: List[Tuple[str, str]]) -> Iterable[Tuple[str, str]]:
+    return ((fo, fm) for fo, fm in pairs if fo and fm)
+
+
+def _renames(old: Dict[str, Optional[str]], new: Dict[str, Optional[str]], key: str) -> List[Dict[str, Any]]:
+    return [
+        {key: oid, "old": old[oid], "new": new[oid]}
+        for oid in sorted(set(old) & set(new))
+        if old[oid] != new[oid]
+    ]
+
+
+def diff_als_versions(
+    old: Source,
+    new: Source,
+    old_entry: Optional[ParsedWorkbook] = None,
+    new_entry: Optional[ParsedWorkbook] = None,
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+    reader: Optional[str] = None,
+) -> Tuple[Dict[str, Any], ParsedWorkbook, ParsedWorkbook]:
+    """
+    Diff two ALS versions. `old_entry` / `new_entry` are cached parses, if any; the
+    (possibly extended) entries are returned alongside the diff so callers can cache them.
+    `reader` picks the workbook reader backend for the sheets that need parsing.
+    """
+    old_entry = old_entry or discover_workbook(old)
+    new_entry = new_entry or discover_workbook(new)
+    old_mats = {m["matrixOID"]: m["sheet"] for m in old_entry.available}
+    new_mats = {m["matrixOID"]: m["sheet"] for m in new_entry.available}
+    common = [oid for oid in new_mats if oid in old_mats]
+    folder_new = find_sheet_name(new_entry.sheet_names, folder_sheet)
+    form_new = find_sheet_name(new_entry.sheet_names, form_sheet)
+
+    sheet_pairs = [
+        (find_sheet_name(old_entry.sheet_names, folder_sheet), folder_new),
+        (find_sheet_name(old_entry.sheet_names, form_sheet), form_new),
+    ] + [(old_mats[oid], new_mats[oid]) for oid in common]
+    flags = changed_sheets(old, new, sheet_pairs)
+    if flags is None:
+        flags = [True] * len(sheet_pairs)
+    folders_changed, forms_changed = flags[0], flags[1]
+    changed_mats = [oid for oid, flag in zip(common, flags[2:]) if flag]
+    meta_changed = folders_changed or forms_changed
+
+    for src, entry, mats in ((old, old_entry, old_mats), (new, new_entry, new_mats)):
+        fill_all_parsed(
+            src, entry, folder_sheet, form_sheet,
+            sheets=[mats[oid] for oid in changed_mats], include_meta=meta_changed, reader=reader,
+        )
+
+    folder_renames: List[Dict[str, Any]] = []
+    form_renames: List[Dict[str, Any]] = []
+    if meta_changed:
+        fo_old, fm_old = old_entry.meta[(folder_sheet, form_sheet)]
+        fo_new, fm_new = new_entry.meta[(folder_sheet, form_sheet)]
+        if folders_changed:
+            folder_renames = _renames(fo_old, fo_new, "folderOID")
+        if forms_changed:
+            form_renames = _renames(fm_old, fm_new, "formOID")
+
+    matrix_changes: Dict[str, Any] = {}
+    for oid in changed_mats:
+        folder_codes, form_codes = Vocabulary(), Vocabulary()
+        before = Incidence.from_pairs(_nonempty(old_entry.pairs[old_mats[oid]]), folder_codes, form_codes)
+        after = Incidence.from_pairs(_nonempty(new_entry.pairs[new_mats[oid]]), folder_codes, form_codes)
+        added = after.difference(before).to_folder_map()
+        removed = before.difference(after).to_folder_map()
+        if added or removed:
+            matrix_changes[oid] = {"formsAdded": added, "formsRemoved": removed}
+
+    diff = {
+        "meta": {
+            "sheetsCompared": len(sheet_pairs),
+            "changedSheets": sorted(
+                [new_mats[oid] for oid in changed_mats]
+                + ([folder_new] if folders_changed else [])
+                + ([form_new] if forms_changed else [])
+            ),
+        },
+        "matrices": {
+            "added": [oid for oid in new_mats if oid not in old_mats],
+            "removed": [oid for oid in old_mats if oid not in new_mats],
+        },
+        "folderRenames": folder_renames,
+        "formRenames": form_renames,
+        "matrixChanges": matrix_changes,
+    }
+    return diff, old_entry, new_entry
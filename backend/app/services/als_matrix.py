@@ -1,26 +1,33 @@
 from __future__ import annotations
-from typing import BinaryIO, Dict, List, Any, Optional, Tuple
-import io
+from bisect import bisect_right
+from itertools import islice
+from typing import BinaryIO, Callable, Dict, Iterator, List, Any, Optional, Tuple
+import os
 import re
-import warnings
+import numpy as np
 import pandas as pd
-
-# Silence noisy but harmless openpyxl UserWarnings in some RAVE ALS files
-warnings.filterwarnings(
-    "ignore",
-    message=r"File contains an invalid specification for",
-    module=r"openpyxl\.reader\.workbook"
-)
-warnings.filterwarnings(
-    "ignore",
-    message=r"Defined names for sheet index .* cannot be located",
-    module=r"openpyxl\.reader\.workbook"
-)
+from .incidence import Incidence, Vocabulary
+from .parse_cache import ParsedWorkbook, Want, source_hash, workbook_cache
+from .timing import phase, report, reporting
+from .workbook_reader import Source, WorkbookReader, _as_file, open_workbook, promote_header, read_sheet_names
 
 MATRIX_SHEET_DEFAULT = "MASTERDASHBOARD"  # preferred default when present
 
+def _as_source(file: BinaryIO | Source) -> Source:
+    if isinstance(file, (bytes, bytearray, str, os.PathLike)):
+        return file
+    return file.read()
+
+
+def _open_workbook(source: Source, reader: Optional[str] = None) -> WorkbookReader:
+    with phase("workbook_load") as p:
+        xl = open_workbook(source, reader)
+        p["sheets"], p["reader"] = len(xl.sheet_names), xl.name
+    return xl
+
+
 # ---------- Matrix sheet discovery ----------
-def discover_matrix_sheets(xl: pd.ExcelFile) -> List[Dict[str, str]]:
+def discover_matrix_sheets(xl: WorkbookReader) -> List[Dict[str, str]]:
     """
     Return list of available matrix definitions in the workbook.
 
@@ -36,10 +43,17 @@ def discover_matrix_sheets(xl: pd.ExcelFile) -> List[Dict[str, str]]:
       - Matrix (if present)
       - Then by the numeric N in 'MatrixN#OID' (ascending)
     """
+    with phase("discover") as p:
+        matrices = _matrix_sheets_from_names(xl.sheet_names)
+        p["matrices"] = len(matrices)
+    return matrices
+
+
+def _matrix_sheets_from_names(sheet_names: List[str]) -> List[Dict[str, str]]:
     items: List[Dict[str, str]] = []
     numbered: List[Tuple[int, str, str]] = []  # (N, OID, sheet)
 
-    for s in xl.sheet_names:
+    for s in sheet_names:
         s_trim = s.strip()
         sl = s_trim.lower()
         if sl == "masterdashboard":
@@ -69,7 +83,21 @@ def discover_matrix_sheets(xl: pd.ExcelFile) -> List[Dict[str, str]]:
     return deduped
 
 
-def choose_matrix_sheet(xl: pd.ExcelFile, matrix_oid: Optional[str]) -> str:
+def discover_workbook(source: Source) -> ParsedWorkbook:
+    """
+    Fast discovery for POST /als/matrices: only xl/workbook.xml is read for xlsx;
+    other formats fall back to a full pd.ExcelFile load.
+    """
+    with phase("discover") as p:
+        names = read_sheet_names(source)
+        if names is None:
+            names = list(pd.ExcelFile(_as_file(source)).sheet_names)
+        available = _matrix_sheets_from_names(names)
+        p["sheets"], p["matrices"] = len(names), len(available)
+    return ParsedWorkbook(sheet_names=names, available=available)
+
+
+def choose_matrix_sheet(xl: WorkbookReader, matrix_oid: Optional[str]) -> str:
     """
     Resolve the worksheet name to parse based on requested matrix_oid.
     Preference order:
@@ -78,7 +106,10 @@ def choose_matrix_sheet(xl: pd.ExcelFile, matrix_oid: Optional[str]) -> str:
       3) Matrix
       4) else raise
     """
-    matrices = discover_matrix_sheets(xl)
+    return _choose_from(discover_matrix_sheets(xl), matrix_oid)
+
+
+def _choose_from(matrices: List[Dict[str, str]], matrix_oid: Optional[str]) -> str:
     if matrix_oid:
         for m in matrices:
             if m["matrixOID"].lower() == matrix_oid.strip().lower():
@@ -90,16 +121,20 @@ def choose_matrix_sheet(xl: pd.ExcelFile, matrix_oid: Optional[str]) -> str:
     raise ValueError(f"No usable Matrix sheet found. Available matrixOIDs: {[m['matrixOID'] for m in matrices]}")
 
 
-def _find_sheet_fuzzy(xl: pd.ExcelFile, name: str) -> str:
+def _find_sheet_fuzzy(xl: WorkbookReader, name: str) -> str:
+    return find_sheet_name(xl.sheet_names, name)
+
+
+def find_sheet_name(sheet_names: List[str], name: str) -> str:
     # exact
-    for s in xl.sheet_names:
+    for s in sheet_names:
         if s.strip().lower() == name.strip().lower():
             return s
     # contains
-    for s in xl.sheet_names:
+    for s in sheet_names:
         if name.strip().lower() in s.strip().lower():
             return s
-    raise ValueError(f"Required sheet '{name}' not found in ALS. Available: {xl.sheet_names}")
+    raise ValueError(f"Required sheet '{name}' not found in ALS. Available: {sheet_names}")
 
 
 def _get_col(df: pd.DataFrame, options: List[str]) -> Optional[str]:
@@ -138,18 +173,225 @@ def _first_header_row(df_raw: pd.DataFrame, probe_rows: int = 30) -> int:
     return 0
 
 
+def _stripped_column(df: pd.DataFrame, col: str) -> pd.Series:
+    """Column `col` as stripped text; blank / error cells (and a missing column) become ""."""
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].fillna("").astype(str).str.strip()
+
+
+def _meta_map(df: pd.DataFrame, oid_col: Optional[str], name_col: Optional[str]) -> Dict[str, Optional[str]]:
+    """
+    {OID: name} over the rows with a non-blank OID (name None without a name column).
+    dict(zip()) keeps the first position and the last value of a repeated OID, like
+    assigning row by row.
+    """
+    if not oid_col:
+        return {}
+    oids = _stripped_column(df, oid_col)
+    keep = (oids != "").to_numpy()
+    oid_list = oids[keep].tolist()
+    if not name_col:
+        return dict.fromkeys(oid_list)
+    return dict(zip(oid_list, _stripped_column(df, name_col)[keep].tolist()))
+
+
+def _read_meta(
+    xl: WorkbookReader, folder_sheet: str, form_sheet: str
+) -> Tuple[Dict[str, Optional[str]], Dict[str, Optional[str]]]:
+    """Read Folder/Form sheets into {FolderOID: FolderName} and {FormOID: DraftFormName}."""
+    with phase("meta_read") as p:
+        # load meta sheets (all cells as strings to avoid 1/True confusion; no NA casting)
+        df_folder_raw = xl.read_table(_find_sheet_fuzzy(xl, folder_sheet))
+        df_form_raw   = xl.read_table(_find_sheet_fuzzy(xl, form_sheet))
+
+        # Folder meta
+        folderOID_col  = _get_col(df_folder_raw, ["FolderOID", "Folder OID", "OID"])
+        folderName_col = _get_col(df_folder_raw, ["FolderName", "Folder Name", "Name"])
+        folder_meta = _meta_map(df_folder_raw, folderOID_col, folderName_col)
+
+        # Form meta  —— prefer DraftFormName, then FormName
+        formOID_col   = _get_col(df_form_raw, ["FormOID", "Form OID", "OID"])
+        formName_col  = _get_col(df_form_raw, ["DraftFormName", "Draft Form Name", "FormName", "Form Name", "Name"])
+        form_meta = _meta_map(df_form_raw, formOID_col, formName_col)
+        p["folders"], p["forms"] = len(folder_meta), len(form_meta)
+    return folder_meta, form_meta
+
+
+_MARKERS = {"x", "1", "yes", "y", "true"}
+
+
+def _strip_cell(val: Any) -> str:
+    return (val or "").strip()
+
+
+def _is_marked(val: Any) -> bool:
+    return _strip_cell(val).lower() in _MARKERS
+
+
+def _form_token(val: Any) -> str:
+    token = re.sub(r"[^A-Za-z0-9_]+", "_", _strip_cell(val)).strip("_").upper()
+    return token or "FORM_UNKNOWN"
+
+
+def _map_unique(values: np.ndarray, fn: Callable[[Any], Any]) -> np.ndarray:
+    """Apply `fn` once per distinct value and broadcast back (matrix cells repeat heavily)."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    mapped = np.empty(len(uniques), dtype=object)
+    mapped[:] = [fn(u) for u in uniques]
+    return mapped[codes]
+
+
+def _extract_pairs(xl: WorkbookReader, matrix_ws: str) -> List[Tuple[str, str]]:
+    """Read one matrix sheet (long or crosstab layout) into (FolderOID, FormOID) pairs."""
+    # Parse Matrix sheet (robust) — one pass over the sheet, header promoted in memory
+    with phase("matrix_read", sheet=matrix_ws) as p:
+        df_matrix_raw = xl.read_grid(matrix_ws)
+        p["rows"] = len(df_matrix_raw)
+
+    with phase("header_detect") as p:
+        header_row_idx = _first_header_row(df_matrix_raw, probe_rows=40)
+        p["row"] = header_row_idx
+
+        df_matrix = promote_header(df_matrix_raw, header_row_idx)
+        # strip whitespace in headers
+        df_matrix.columns = [str(c).strip() for c in df_matrix.columns]
+        # drop fully empty rows/cols after trimming
+        df_matrix = df_matrix.dropna(how="all").dropna(axis=1, how="all")
+
+    with phase("pair_extract") as p:
+        pairs = _pairs_from_matrix(df_matrix)
+        p["pairs"] = len(pairs)
+    return pairs
+
+
+def _pairs_from_matrix(df_matrix: pd.DataFrame) -> List[Tuple[str, str]]:
+    """(FolderOID, FormOID) pairs of a matrix sheet whose header row is already promoted."""
+    # Identify columns in Matrix sheet (long-format if both FolderOID & FormOID exist)
+    m_form_oid_col   = _get_col(df_matrix, ["FormOID", "Form OID", "FORM OID", "Form", "Form Oid"])
+    m_form_name_col  = _get_col(df_matrix, ["DraftFormName", "Draft Form Name", "FormName", "Form Name", "FORM NAME", "Name"])
+    m_folder_oid_col = _get_col(df_matrix, ["FolderOID", "Folder OID", "FOLDER OID", "Folder", "Folder Oid"])
+
+    matrix_pairs: List[Tuple[str, str]] = []  # (FolderOID, FormOID)
+    columns = list(df_matrix.columns)
+
+    def col_values(name: str) -> np.ndarray:
+        return df_matrix.iloc[:, columns.index(name)].to_numpy(dtype=object)
+
+    if m_folder_oid_col and m_form_oid_col:
+        # Long format: one row per relationship
+        foids = _map_unique(col_values(m_folder_oid_col), _strip_cell)
+        frmids = _map_unique(col_values(m_form_oid_col), _strip_cell)
+        keep = (foids != "") & (frmids != "")
+        matrix_pairs = list(zip(foids[keep].tolist(), frmids[keep].tolist()))
+    else:
+        # Crosstab: forms in rows, folders in columns with X/1/Yes/True markers
+        id_cols = [c for c in [m_form_oid_col, m_form_name_col] if c] or [columns[0]]
+        folder_pos = [i for i, c in enumerate(columns) if c not in id_cols]
+        if not folder_pos or not len(df_matrix):
+            return matrix_pairs
+
+        # FormOID per row; falls back to a token built from the form name
+        frmids = _map_unique(col_values(m_form_name_col or id_cols[0]), _form_token)
+        if m_form_oid_col:
+            cand = _map_unique(col_values(m_form_oid_col), _strip_cell)
+            frmids = np.where(cand != "", cand, frmids)
+
+        # header -> FolderOID once per column, marker test once per distinct cell value
+        folder_oids = np.array([re.sub(r"\s+", "", str(columns[i]).strip()) for i in folder_pos], dtype=object)
+        cells = df_matrix.iloc[:, folder_pos].to_numpy(dtype=object)
+        marked = _map_unique(cells.ravel(), _is_marked).astype(bool).reshape(cells.shape)
+
+        rows, cols = np.nonzero(marked)  # row-major, same order as a row-by-row scan
+        matrix_pairs = list(zip(folder_oids[cols].tolist(), frmids[rows].tolist()))
+    return matrix_pairs
+
+
+def fill_parsed(
+    source: Source,
+    entry: Optional[ParsedWorkbook],
+    matrix_oid: Optional[str],
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+    reader: Optional[str] = None,
+) -> Tuple[ParsedWorkbook, str]:
+    """
+    Complete `entry` (or start a new one) with whatever this request needs that is
+    not parsed yet: the meta sheets and the chosen matrix sheet.
+    The workbook is only opened (with the `reader` backend) when something is missing.
+    Does not touch the cache, so it can run inside a worker process.
+    """
+    xl: Optional[WorkbookReader] = None
+    try:
+        if entry is None:
+            xl = _open_workbook(source, reader)
+            entry = ParsedWorkbook(sheet_names=list(xl.sheet_names), available=discover_matrix_sheets(xl))
+
+        # which matrix
+        matrix_ws = _choose_from(entry.available, matrix_oid)
+        meta_key = (folder_sheet, form_sheet)
+        if meta_key in entry.meta and matrix_ws in entry.pairs:
+            return entry, matrix_ws
+
+        if xl is None:
+            xl = _open_workbook(source, reader)
+        if meta_key not in entry.meta:
+            entry.meta[meta_key] = _read_meta(xl, folder_sheet, form_sheet)
+        if matrix_ws not in entry.pairs:
+            entry.pairs[matrix_ws] = _extract_pairs(xl, matrix_ws)
+        return entry, matrix_ws
+    finally:
+        if xl is not None:
+            xl.close()
+
+
+def is_parsed(
+    entry: Optional[ParsedWorkbook],
+    matrix_oid: Optional[str],
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+) -> bool:
+    """True if `entry` already holds everything extract_matrix needs for this request."""
+    if entry is None:
+        return False
+    try:
+        matrix_ws = _choose_from(entry.available, matrix_oid)
+    except ValueError:
+        return True  # no usable matrix; build_matrix_result raises the same error
+    return (folder_sheet, form_sheet) in entry.meta and matrix_ws in entry.pairs
+
+
+def matrix_parts(matrix_oid: Optional[str], folder_sheet: str = "Folder", form_sheet: str = "Form") -> Want:
+    """What extract_matrix() reads of a cached workbook: the meta pair and the chosen matrix sheet."""
+    def want(entry: ParsedWorkbook) -> Tuple[List[Tuple[str, str]], List[str]]:
+        try:
+            return [(folder_sheet, form_sheet)], [_choose_from(entry.available, matrix_oid)]
+        except ValueError:
+            return [(folder_sheet, form_sheet)], []
+    return want
+
+
+def all_parts(folder_sheet: str = "Folder", form_sheet: str = "Form") -> Want:
+    """What extract_all_matrices() reads of a cached workbook: the meta pair and every matrix sheet."""
+    return lambda entry: ([(folder_sheet, form_sheet)], [m["sheet"] for m in entry.available])
+
+
 # --- Public: single entry point ---
 def extract_matrix(
-    file: BinaryIO | bytes,
+    file: BinaryIO | Source,
     matrix_oid: Optional[str] = None,
     folder_sheet: str = "Folder",
     form_sheet: str = "Form",
     ssd_matrix: Optional[Dict[str, List[str]]] = None,
+    file_hash: Optional[str] = None,
+    reader: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Extract a RAVE ALS visit-form matrix into a normalized structure (folder -> forms[]).
     - Honors DraftFormName as the canonical form name (exposed as 'formName').
     - Supports multiple matrix sheets; 'matrix_oid' chooses which to parse.
+    - Parsed sheets are cached by content hash (pass 'file_hash' if already known).
+    - 'reader' picks the workbook reader backend ("fast" / "openpyxl"; default WORKBOOK_READER).
 
     Returns:
     {
@@ -162,165 +404,297 @@ def extract_matrix(
       "diff": { ... }  # only if ssd_matrix provided
     }
     """
-    xls_bytes = file if isinstance(file, (bytes, bytearray)) else file.read()
-    xl = pd.ExcelFile(io.BytesIO(xls_bytes), engine="openpyxl")
+    source = _as_source(file)
+    key = file_hash or source_hash(source)
+    with phase("cache_lookup") as p:
+        entry = workbook_cache.get(key, matrix_parts(matrix_oid, folder_sheet, form_sheet))
+        p["hit"] = is_parsed(entry, matrix_oid, folder_sheet, form_sheet)
+    if not p["hit"]:
+        entry, _ = fill_parsed(source, entry, matrix_oid, folder_sheet, form_sheet, reader)
+        workbook_cache.put(key, entry)
+    return build_matrix_result(entry, matrix_oid, folder_sheet, form_sheet, ssd_matrix)
+
+
+def build_matrix_result(
+    entry: ParsedWorkbook,
+    matrix_oid: Optional[str] = None,
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+    ssd_matrix: Optional[Dict[str, List[str]]] = None,
+) -> Dict[str, Any]:
+    """Group the parsed pairs of one matrix into the extract_matrix() response shape."""
+    matrix_ws = _choose_from(entry.available, matrix_oid)
+    return _build_sheet_result(entry, matrix_ws, folder_sheet, form_sheet, ssd_matrix)
 
-    # which matrix
-    matrix_ws = choose_matrix_sheet(xl, matrix_oid)
-    available = discover_matrix_sheets(xl)
 
-    # load meta sheets (robust dtype=str to avoid 1/True confusion; no NA casting)
-    df_folder_raw = pd.read_excel(
-        xl, _find_sheet_fuzzy(xl, folder_sheet), engine="openpyxl",
-        dtype=str, keep_default_na=False
-    )
-    df_form_raw   = pd.read_excel(
-        xl, _find_sheet_fuzzy(xl, form_sheet), engine="openpyxl",
-        dtype=str, keep_default_na=False
-    )
+def matrix_page(
+    entry: ParsedWorkbook,
+    matrix_oid: Optional[str],
+    limit: int,
+    after: Optional[str] = None,
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+) -> Dict[str, Any]:
+    """
+    One page of the extract_matrix() response: at most `limit` folders after FolderOID
+    `after`. `page.after` is the FolderOID to continue behind (None on the last page).
+    """
+    matrix_ws = _choose_from(entry.available, matrix_oid)
+    folders = list(islice(iter_matrix_folders(entry, matrix_ws, folder_sheet, form_sheet, after), limit + 1))
+    more = len(folders) > limit
+    folders = folders[:limit]
+    return {
+        "meta": matrix_meta(entry, matrix_ws),
+        "folders": folders,
+        "page": {"limit": limit, "after": folders[-1]["folderOID"] if more else None},
+    }
 
-    # Folder meta
-    folderOID_col  = _get_col(df_folder_raw, ["FolderOID", "Folder OID", "OID"])
-    folderName_col = _get_col(df_folder_raw, ["FolderName", "Folder Name", "Name"])
-    folder_meta: Dict[str, Optional[str]] = {}
-    if folderOID_col:
-        for _, r in df_folder_raw.iterrows():
-            oid = (r.get(folderOID_col) or "").strip()
-            if not oid:
-                continue
-            folder_meta[oid] = ((r.get(folderName_col) or "").strip() if folderName_col else None)
-
-    # Form meta  —— prefer DraftFormName, then FormName
-    formOID_col   = _get_col(df_form_raw, ["FormOID", "Form OID", "OID"])
-    formName_col  = _get_col(df_form_raw, ["DraftFormName", "Draft Form Name", "FormName", "Form Name", "Name"])
-    form_meta: Dict[str, Optional[str]] = {}
-    if formOID_col:
-        for _, r in df_form_raw.iterrows():
-            oid = (r.get(formOID_col) or "").strip()
-            if not oid:
-                continue
-            form_meta[oid] = ((r.get(formName_col) or "").strip() if formName_col else None)
-
-    # Parse Matrix sheet (robust)
-    df_matrix_raw = pd.read_excel(
-        xl, matrix_ws, header=None, engine="openpyxl",
-        dtype=str, keep_default_na=False
-    )
 
-    header_row_idx = _first_header_row(df_matrix_raw, probe_rows=40)
+def iter_matrix_lines(
+    entry: ParsedWorkbook,
+    matrix_oid: Optional[str] = None,
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+    ssd_matrix: Optional[Dict[str, List[str]]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    The extract_matrix() response as a sequence of records, for NDJSON streaming:
+      {"type": "meta", "meta": {...}}, one {"type": "folder", "folder": {...}} per folder,
+      {"type": "diff", "diff": {...}} if ssd_matrix is given, then {"type": "end"}.
+    The matrix sheet is resolved and the meta record built on the call, so a missing
+    matrix raises here, before a streaming response has sent its status line.
+    """
+    matrix_ws = _choose_from(entry.available, matrix_oid)
+    n_folders, n_forms = matrix_counts(entry, matrix_ws)
+    head = {"type": "meta", "meta": {**matrix_meta(entry, matrix_ws), "folderCount": n_folders, "formCount": n_forms}}
+    return _matrix_lines(head, entry, matrix_ws, folder_sheet, form_sheet, ssd_matrix)
+
+
+def _matrix_lines(
+    head: Dict[str, Any],
+    entry: ParsedWorkbook,
+    matrix_ws: str,
+    folder_sheet: str,
+    form_sheet: str,
+    ssd_matrix: Optional[Dict[str, List[str]]],
+) -> Iterator[Dict[str, Any]]:
+    yield head
+    folders: List[Dict[str, Any]] = []
+    for folder in iter_matrix_folders(entry, matrix_ws, folder_sheet, form_sheet):
+        if ssd_matrix is not None:
+            folders.append(folder)
+        yield {"type": "folder", "folder": folder}
+    if ssd_matrix is not None:
+        yield {"type": "diff", "diff": _ssd_diff(folders, ssd_matrix)}
+    yield {"type": "end"}
 
-    df_matrix = pd.read_excel(
-        xl, matrix_ws, header=header_row_idx, engine="openpyxl",
-        dtype=str, keep_default_na=False
-    )
-    # strip whitespace in headers
-    df_matrix.columns = [str(c).strip() for c in df_matrix.columns]
-    # drop fully empty rows/cols after trimming
-    df_matrix = df_matrix.dropna(how="all").dropna(axis=1, how="all")
 
-    # Identify columns in Matrix sheet (long-format if both FolderOID & FormOID exist)
-    m_form_oid_col   = _get_col(df_matrix, ["FormOID", "Form OID", "FORM OID", "Form", "Form Oid"])
-    m_form_name_col  = _get_col(df_matrix, ["DraftFormName", "Draft Form Name", "FormName", "Form Name", "FORM NAME", "Name"])
-    m_folder_oid_col = _get_col(df_matrix, ["FolderOID", "Folder OID", "FOLDER OID", "Folder", "Folder Oid"])
-    # m_folder_name_col not required, but we’ll try to read if present
-    m_folder_name_col= _get_col(df_matrix, ["FolderName", "Folder Name", "FOLDER NAME"])
+def _build_sheet_result(
+    entry: ParsedWorkbook,
+    matrix_ws: str,
+    folder_sheet: str,
+    form_sheet: str,
+    ssd_matrix: Optional[Dict[str, List[str]]],
+) -> Dict[str, Any]:
+    with phase("build", sheet=matrix_ws):
+        result = _group_sheet(entry, matrix_ws, folder_sheet, form_sheet)
+    if ssd_matrix is not None:
+        with phase("ssd_diff") as p:
+            result["diff"] = _ssd_diff(result["folders"], ssd_matrix)
+            p["missing"] = sum(len(v) for v in result["diff"]["missing_in_db"].values())
+            p["extra"] = sum(len(v) for v in result["diff"]["extra_in_db"].values())
+        if reporting():
+            _report_diff(result["diff"])
+    return result
 
-    matrix_pairs: List[Tuple[str, str]] = []  # (FolderOID, FormOID)
 
-    if m_folder_oid_col and m_form_oid_col:
-        # Long format: one row per relationship
-        for _, r in df_matrix.iterrows():
-            foid = (r.get(m_folder_oid_col) or "").strip()
-            frmid = (r.get(m_form_oid_col) or "").strip()
-            if foid and frmid:
-                matrix_pairs.append((foid, frmid))
-    else:
-        # Crosstab: forms in rows, folders in columns with X/1/Yes/True markers
-        id_cols = [c for c in [m_form_oid_col, m_form_name_col] if c] or [df_matrix.columns[0]]
-        folder_cols = [c for c in df_matrix.columns if c not in id_cols]
-
-        def is_marked(val: Any) -> bool:
-            s = (val or "").strip().lower()
-            return s in {"x", "1", "yes", "y", "true"}
-
-        def ensure_form_oid(row: pd.Series) -> str:
-            if m_form_oid_col:
-                cand = (row.get(m_form_oid_col) or "").strip()
-                if cand:
-                    return cand
-            base = (row.get(m_form_name_col or id_cols[0]) or "").strip()
-            token = re.sub(r"[^A-Za-z0-9_]+", "_", base).strip("_").upper()
-            return token or "FORM_UNKNOWN"
-
-        for _, r in df_matrix.iterrows():
-            frmid = ensure_form_oid(r)
-            for fc in folder_cols:
-                if is_marked(r.get(fc)):
-                    foid_guess = str(fc).strip()
-                    foid = re.sub(r"\s+", "", foid_guess)
-                    matrix_pairs.append((foid, frmid))
-
-    # Group + enrich
-    by_folder: Dict[str, Dict[str, Any]] = {}
-    for foid, frmid in matrix_pairs:
+def _report_diff(diff: Dict[str, Any], chunk: int = 100) -> None:
+    """Stream a finished diff to the progress listener, `chunk` folders per event."""
+    for side in ("missing_in_db", "extra_in_db"):
+        items = list(diff[side].items())
+        for i in range(0, len(items), chunk):
+            report("diff", **{side: dict(items[i : i + chunk])})
+
+
+def _group_sheet(entry: ParsedWorkbook, matrix_ws: str, folder_sheet: str, form_sheet: str) -> Dict[str, Any]:
+    return {
+        "meta": matrix_meta(entry, matrix_ws),
+        "folders": list(iter_matrix_folders(entry, matrix_ws, folder_sheet, form_sheet)),
+    }
+
+
+def matrix_meta(entry: ParsedWorkbook, matrix_ws: str) -> Dict[str, Any]:
+    return {
+        "matrixOID": _resolve_matrix_oid_from_sheet(matrix_ws),
+        "sheet": matrix_ws,
+        "availableMatrices": [dict(m) for m in entry.available],
+    }
+
+
+def _forms_by_folder(entry: ParsedWorkbook, matrix_ws: str) -> Dict[str, Dict[str, None]]:
+    """FolderOID -> its distinct FormOIDs (an insertion-ordered dict), first occurrence wins."""
+    by_folder: Dict[str, Dict[str, None]] = {}
+    for foid, frmid in entry.pairs[matrix_ws]:
         if not foid or not frmid:
             continue
-        if foid not in by_folder:
-            by_folder[foid] = {
-                "folderOID": foid,
-                "folderName": folder_meta.get(foid),
-                "forms": []
-            }
-        if not any(f.get("formOID") == frmid for f in by_folder[foid]["forms"]):
-            by_folder[foid]["forms"].append({
-                "formOID": frmid,
-                # Expose as 'formName' but source from DraftFormName when available
-                "formName": form_meta.get(frmid)
-            })
-
-    folders_sorted = sorted(by_folder.values(), key=lambda x: x["folderOID"])
-    for f in folders_sorted:
-        f["forms"] = sorted(f["forms"], key=lambda x: x["formOID"])
-
-    result = {
+        forms = by_folder.get(foid)
+        if forms is None:
+            forms = by_folder[foid] = {}
+        forms[frmid] = None
+    return by_folder
+
+
+def matrix_counts(entry: ParsedWorkbook, matrix_ws: str) -> Tuple[int, int]:
+    """(folders, folder/form pairs) of one parsed matrix sheet."""
+    by_folder = _forms_by_folder(entry, matrix_ws)
+    return len(by_folder), sum(len(forms) for forms in by_folder.values())
+
+
+def iter_matrix_folders(
+    entry: ParsedWorkbook,
+    matrix_ws: str,
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+    after: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Folders of one parsed matrix sheet in response order (by FolderOID, forms by FormOID),
+    built one at a time; `after` starts behind that FolderOID (cursor pagination).
+    """
+    folder_meta, form_meta = entry.meta[(folder_sheet, form_sheet)]
+    by_folder = _forms_by_folder(entry, matrix_ws)
+    folder_oids = sorted(by_folder)
+    start = 0 if after is None else bisect_right(folder_oids, after)
+    for foid in folder_oids[start:]:
+        yield {
+            "folderOID": foid,
+            "folderName": folder_meta.get(foid),
+            # Expose as 'formName' but source from DraftFormName when available
+            "forms": [{"formOID": frmid, "formName": form_meta.get(frmid)} for frmid in sorted(by_folder[foid])],
+        }
+
+
+def _ssd_diff(folders_sorted: List[Dict[str, Any]], ssd_matrix: Dict[str, List[str]]) -> Dict[str, Any]:
+    """SSD diff — set algebra on integer-coded folder/form incidence."""
+    folder_codes, form_codes = Vocabulary(), Vocabulary()
+    # Normalize forms to uppercase for case-insensitive compare
+    als = Incidence.from_pairs(
+        ((f["folderOID"], x["formOID"]) for f in folders_sorted for x in f["forms"]),
+        folder_codes, form_codes, upper_forms=True,
+    )
+    # ssd_matrix values may already be normalized by caller; ensure uppercase
+    ssd = Incidence.from_folder_map(ssd_matrix, folder_codes, form_codes, upper_forms=True)
+
+    # Missing: present in SSD but not in ALS (folders in SSD order)
+    missing_in_db = ssd.difference(als).to_folder_map(ssd_matrix.keys())
+    # Extra: present in ALS but not in SSD (folders in ALS order)
+    extra_in_db = als.difference(ssd).to_folder_map(f["folderOID"] for f in folders_sorted)
+
+    return {"missing_in_db": missing_in_db, "extra_in_db": extra_in_db}
+
+
+def fill_all_parsed(
+    source: Source,
+    entry: Optional[ParsedWorkbook],
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+    sheets: Optional[List[str]] = None,
+    include_meta: bool = True,
+    reader: Optional[str] = None,
+) -> ParsedWorkbook:
+    """
+    Like fill_parsed(), but for every discovered matrix sheet (or only `sheets`),
+    opening the workbook at most once. Does not touch the cache.
+    """
+    xl: Optional[WorkbookReader] = None
+    try:
+        if entry is None:
+            xl = _open_workbook(source, reader)
+            entry = ParsedWorkbook(sheet_names=list(xl.sheet_names), available=discover_matrix_sheets(xl))
+
+        wanted = [m["sheet"] for m in entry.available] if sheets is None else sheets
+        missing = [ws for ws in wanted if ws not in entry.pairs]
+        meta_key = (folder_sheet, form_sheet)
+        need_meta = include_meta and meta_key not in entry.meta
+        if not missing and not need_meta:
+            return entry
+
+        if xl is None:
+            xl = _open_workbook(source, reader)
+        if need_meta:
+            entry.meta[meta_key] = _read_meta(xl, folder_sheet, form_sheet)
+        for ws in missing:
+            entry.pairs[ws] = _extract_pairs(xl, ws)
+        return entry
+    finally:
+        if xl is not None:
+            xl.close()
+
+
+def parse_sheets(
+    source: Source,
+    entry: ParsedWorkbook,
+    sheets: List[str],
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+    include_meta: bool = False,
+    reader: Optional[str] = None,
+) -> ParsedWorkbook:
+    """
+    Parse `sheets` (and optionally the meta sheets) on a fresh workbook handle into a new,
+    partial ParsedWorkbook; used to fan sheets out over threads or worker processes.
+    """
+    part = ParsedWorkbook(sheet_names=list(entry.sheet_names), available=[dict(m) for m in entry.available])
+    return fill_all_parsed(source, part, folder_sheet, form_sheet, sheets=sheets, include_meta=include_meta, reader=reader)
+
+
+def extract_all_matrices(
+    file: BinaryIO | Source,
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+    ssd_matrix: Optional[Dict[str, List[str]]] = None,
+    file_hash: Optional[str] = None,
+    reader: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Parse every matrix sheet found by discover_matrix_sheets() in one pass over the workbook
+    (Folder/Form sheets are read once and shared). Parsing the sheets in parallel takes
+    processes (extract_all_matrices_pooled(concurrent=True)); threads would share the GIL.
+
+    Returns:
+    {
+      "meta": { "availableMatrices": [...], "matrixCount": int },
+      "matrices": { matrixOID: <extract_matrix() result for that sheet>, ... }
+    }
+    """
+    source = _as_source(file)
+    key = file_hash or source_hash(source)
+    entry = workbook_cache.get(key, all_parts(folder_sheet, form_sheet))
+    if entry is None:
+        entry = discover_workbook(source)
+    entry = fill_all_parsed(source, entry, folder_sheet, form_sheet, reader=reader)
+    workbook_cache.put(key, entry)
+    return build_all_results(entry, folder_sheet, form_sheet, ssd_matrix)
+
+
+def build_all_results(
+    entry: ParsedWorkbook,
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+    ssd_matrix: Optional[Dict[str, List[str]]] = None,
+) -> Dict[str, Any]:
+    """Group every parsed matrix sheet into the extract_all_matrices() response shape."""
+    matrices: Dict[str, Any] = {}
+    for m in entry.available:
+        matrices[m["matrixOID"]] = _build_sheet_result(entry, m["sheet"], folder_sheet, form_sheet, ssd_matrix)
+    return {
         "meta": {
-            "matrixOID": _resolve_matrix_oid_from_sheet(matrix_ws),
-            "sheet": matrix_ws,
-            "availableMatrices": discover_matrix_sheets(xl),
+            "availableMatrices": [dict(m) for m in entry.available],
+            "matrixCount": len(matrices),
         },
-        "folders": folders_sorted
+        "matrices": matrices,
     }
 
-    # SSD diff (optional)
-    if ssd_matrix is not None:
-        # Normalize ALS forms to uppercase for case-insensitive compare
-        als_map_raw = {f["folderOID"]: [x["formOID"] for x in f["forms"]] for f in folders_sorted}
-        als_map_norm: Dict[str, set] = {fo: {str(frm).upper() for frm in frms} for fo, frms in als_map_raw.items()}
-        missing_in_db: Dict[str, List[str]] = {}
-        extra_in_db: Dict[str, List[str]] = {}
-
-        # ssd_matrix values may already be normalized by caller; ensure uppercase
-        ssd_norm: Dict[str, set] = {fo: {str(frm).upper() for frm in frms} for fo, frms in ssd_matrix.items()}
-
-        # Missing: present in SSD but not in ALS
-        for foid, ssd_forms in ssd_norm.items():
-            als_forms = als_map_norm.get(foid, set())
-            miss_norm = sorted([frm for frm in ssd_forms if frm not in als_forms])
-            if miss_norm:
-                # Return missing using the original (upper) tokens
-                missing_in_db[foid] = miss_norm
-
-        # Extra: present in ALS but not in SSD
-        for foid, als_forms in als_map_norm.items():
-            ssd_forms = ssd_norm.get(foid, set())
-            extra_norm = sorted([frm for frm in als_forms if frm not in ssd_forms])
-            if extra_norm:
-                extra_in_db[foid] = extra_norm
-
-        result["diff"] = {"missing_in_db": missing_in_db, "extra_in_db": extra_in_db}
-
-    return result
-
 
 def _resolve_matrix_oid_from_sheet(sheet_name: str) -> str:
     s = sheet_name.strip()
@@ -0,0 +1,119 @@
+"""
+Compact folder x form incidence.
+
+FolderOID and FormOID strings are interned to integer codes (Vocabulary); a set of
+(folder, form) pairs is stored as one sorted, unique int64 array of packed keys
+(folder_code << 32 | form_code). Missing / extra / intersection / union between ALS,
+SSD and other ALS versions are then NumPy set operations on those arrays instead of
+per-folder Python sets.
+
+Converters from pairs or {FolderOID: [FormOID]} maps, and back to the JSON shape the
+API returns, keep the response format unchanged.
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+_SHIFT = np.int64(32)
+_MASK = np.int64(0xFFFFFFFF)
+
+
+class Vocabulary:
+    """Interns strings to dense integer codes; share one instance across compared incidences."""
+
+    def __init__(self) -> None:
+        self._codes: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def code(self, value: str) -> int:
+        c = self._codes.get(value)
+        if c is None:
+            c = self._codes[value] = len(self.strings)
+            self.strings.append(value)
+        return c
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class Incidence:
+    """An immutable set of (FolderOID, FormOID) pairs over shared vocabularies."""
+
+    __slots__ = ("keys", "folders", "forms")
+
+    def __init__(self, keys: np.ndarray, folders: Vocabulary, forms: Vocabulary):
+        self.keys = keys
+        self.folders = folders
+        self.forms = forms
+
+    @classmethod
+    def from_pairs(
+        cls,
+        pairs: Iterable[Tuple[str, str]],
+        folders: Optional[Vocabulary] = None,
+        forms: Optional[Vocabulary] = None,
+        upper_forms: bool = False,
+    ) -> "Incidence":
+        """Build from (FolderOID, FormOID) pairs; duplicates collapse, values are taken as-is."""
+        folders = folders if folders is not None else Vocabulary()
+        forms = forms if forms is not None else Vocabulary()
+        fo_codes: List[int] = []
+        fm_codes: List[int] = []
+        for fo, fm in pairs:
+            fm = str(fm)
+            fo_codes.append(folders.code(fo))
+            fm_codes.append(forms.code(fm.upper() if upper_forms else fm))
+        keys = (np.asarray(fo_codes, dtype=np.int64) << _SHIFT) | np.asarray(fm_codes, dtype=np.int64)
+        return cls(np.unique(keys), folders, forms)
+
+    @classmethod
+    def from_folder_map(
+        cls,
+        mapping: Dict[str, List[str]],
+        folders: Optional[Vocabulary] = None,
+        forms: Optional[Vocabulary] = None,
+        upper_forms: bool = False,
+    ) -> "Incidence":
+        """Build from {FolderOID: [FormOID, ...]} (the SSD map / diff shape)."""
+        return cls.from_pairs(
+            ((fo, fm) for fo, frms in mapping.items() for fm in frms), folders, forms, upper_forms
+        )
+
+    def _check(self, other: "Incidence") -> None:
+        if other.folders is not self.folders or other.forms is not self.forms:
+            raise ValueError("Incidence set operations need shared vocabularies")
+
+    def difference(self, other: "Incidence") -> "Incidence":
+        self._check(other)
+        return Incidence(np.setdiff1d(self.keys, other.keys, assume_unique=True), self.folders, self.forms)
+
+    def intersection(self, other: "Incidence") -> "Incidence":
+        self._check(other)
+        return Incidence(np.intersect1d(self.keys, other.keys, assume_unique=True), self.folders, self.forms)
+
+    def union(self, other: "Incidence") -> "Incidence":
+        self._check(other)
+        return Incidence(np.union1d(self.keys, other.keys), self.folders, self.forms)
+
+    def __len__(self) -> int:
+        return int(self.keys.size)
+
+    def to_folder_map(self, folder_order: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """
+        Back to {FolderOID: sorted [FormOID]} for folders that have pairs.
+        Folders come in `folder_order` if given (others are dropped), else sorted.
+        """
+        if not self.keys.size:
+            return {}
+        fo_codes = (self.keys >> _SHIFT).astype(np.int64)
+        fm_codes = (self.keys & _MASK).astype(np.int64)
+        # keys are sorted, so each folder's forms form one contiguous run
+        starts = np.flatnonzero(np.r_[True, fo_codes[1:] != fo_codes[:-1]])
+        ends = np.r_[starts[1:], fo_codes.size]
+        form_strings = self.forms.strings
+        grouped: Dict[str, List[str]] = {}
+        for s, e in zip(starts.tolist(), ends.tolist()):
+            fo = self.folders.strings[int(fo_codes[s])]
+            grouped[fo] = sorted(form_strings[c] for c in fm_codes[s:e].tolist())
+        order = sorted(grouped) if folder_order is None else folder_order
+        return {fo: grouped[fo] for fo in order if fo in grouped}
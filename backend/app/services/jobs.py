@@ -0,0 +1,270 @@
+"""
+Asynchronous parse jobs with a local SQLite result store (stand-in for S3).
+
+submit() records a job and runs its work as a background task of the API process;
+the parsing itself still goes through the parse pool. Job rows and results live in
+JOB_STORE_DIR/jobs.sqlite, so any uvicorn worker can answer GET /jobs/{id}.
+
+Submissions are de-duplicated on a key built from the content hashes and parameters:
+while a job with the same key is pending, running or done (and not expired), its id
+is returned instead of starting a second parse. Jobs whose owning process is gone
+(restart, crash) are reported as failed and can be resubmitted.
+
+Each job publishes its steps and parse phases to the progress channel named by its
+id (WS /progress/{id}); cancelling the channel stops the job.
+"""
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from ..config import JOB_MAX_RUNNING, JOB_STORE_DIR, JOB_TTL_S
+from .metrics import observe_phases
+from . import progress as channels
+from .parse_pool import ParseQueueFull
+from .progress import ChannelListener, ParseCancelled
+from .timing import PhaseTimer, activate, deactivate
+
+log = logging.getLogger("als.jobs")
+
+PENDING, RUNNING, DONE, ERROR = "pending", "running", "done", "error"
+
+# work(progress) -> serialized JSON result; progress(step, fraction) reports where it is
+Progress = Callable[[str, float], None]
+Work = Callable[[Progress], Awaitable[bytes]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id        TEXT PRIMARY KEY,
+    kind      TEXT NOT NULL,
+    dedupe    TEXT NOT NULL,
+    status    TEXT NOT NULL,
+    step      TEXT,
+    progress  REAL NOT NULL DEFAULT 0,
+    error     TEXT,
+    params    TEXT NOT NULL,
+    owner     INTEGER NOT NULL,
+    created   REAL NOT NULL,
+    updated   REAL NOT NULL,
+    result    BLOB
+);
+CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe);
+CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated);
+"""
+
+
+def dedupe_key(kind: str, **parts: Any) -> str:
+    """Stable key of a submission: job kind plus content hashes and parameters."""
+    raw = json.dumps({"kind": kind, **parts}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """Job rows and results in one SQLite file; safe to share between processes."""
+
+    def __init__(self, path: str, ttl_s: int = JOB_TTL_S):
+        self.path = path
+        self.ttl_s = ttl_s
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create_or_get(self, kind: str, key: str, params: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """(job, created): the live job for `key` if there is one, else a new pending job."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._expire(conn, now)
+            for row in conn.execute(
+                "SELECT * FROM jobs WHERE dedupe = ? AND status != ? ORDER BY created DESC", (key, ERROR)
+            ):
+                if row["status"] in (PENDING, RUNNING) and not _alive(row["owner"]):
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?",
+                        (ERROR, "The worker running this job exited", now, row["id"]),
+                    )
+                    continue
+                conn.execute("COMMIT")
+                return _job(row), False
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, dedupe, status, params, owner, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, key, PENDING, json.dumps(params), os.getpid(), now, now),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(job_id), True
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        fields["updated"] = time.time()
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        self._conn().execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = _job(row)
+        if job["status"] in (PENDING, RUNNING) and not _alive(row["owner"]):
+            self.update(job_id, status=ERROR, error="The worker running this job exited")
+            job.update(status=ERROR, error="The worker running this job exited")
+        return job
+
+    def result(self, job_id: str) -> Optional[bytes]:
+        row = self._conn().execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else row["result"]
+
+    def _expire(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_s > 0:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?", (DONE, ERROR, now - self.ttl_s)
+            )
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._conn().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+def _job(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "step": row["step"],
+        "progress": row["progress"],
+        "error": row["error"],
+        "params": json.loads(row["params"]),
+        "created": row["created"],
+        "updated": row["updated"],
+    }
+
+
+_store: Optional[JobStore] = None
+_gate: Optional[asyncio.Semaphore] = None
+_tasks: Dict[str, asyncio.Task] = {}
+
+
+def get_store() -> JobStore:
+    global _store
+    if _store is None:
+        _store = JobStore(os.path.join(JOB_STORE_DIR, "jobs.sqlite"))
+    return _store
+
+
+async def submit(
+    kind: str,
+    key: str,
+    params: Dict[str, Any],
+    work: Work,
+    cleanup: Callable[[], None] = lambda: None,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    (job, created). A new job runs `work` in the background and calls `cleanup` when it
+    ends; for a de-duplicated submission `cleanup` runs right away.
+    """
+    global _gate
+    store = get_store()
+    try:
+        job, created = await asyncio.to_thread(store.create_or_get, kind, key, params)
+    except BaseException:
+        cleanup()
+        raise
+    if not created:
+        cleanup()
+        return job, False
+    if _gate is None:
+        _gate = asyncio.Semaphore(max(JOB_MAX_RUNNING, 1))
+    # a fresh context: the job must not record into the submitting request's PhaseTimer
+    task = asyncio.get_running_loop().create_task(
+        _run(store, job["id"], work, cleanup), context=contextvars.Context()
+    )
+    _tasks[job["id"]] = task
+    task.add_done_callback(lambda _t, job_id=job["id"]: _tasks.pop(job_id, None))
+    return job, True
+
+
+async def _run(store: JobStore, job_id: str, work: Work, cleanup: Callable[[], None]) -> None:
+    events = channels.get_store()
+    listener = ChannelListener(job_id, queued=True)
+
+    # job rows are written on the progress writer thread: off the event loop, and in
+    # order, so a late step update cannot overwrite the final status
+    def progress(step: str, fraction: float) -> None:
+        channels.later(store.update, job_id, step=step, progress=round(fraction, 3))
+        listener("step", {"step": step, "progress": round(fraction, 3)})
+
+    await channels.in_order(events.open, job_id)
+    timer = PhaseTimer(listener)
+    token = activate(timer)
+    try:
+        async with _gate:
+            await channels.in_order(store.update, job_id, status=RUNNING)
+            while True:
+                if await asyncio.to_thread(events.cancel_requested, job_id):
+                    raise ParseCancelled("Job cancelled by the client")
+                try:
+                    result = await work(progress)
+                    break
+                except ParseQueueFull as e:
+                    # synchronous requests hold the pool; wait for room instead of failing
+                    progress("waiting", 0.0)
+                    await asyncio.sleep(e.retry_after)
+        await channels.in_order(store.update, job_id, status=DONE, step="done", progress=1.0, result=result)
+        await channels.in_order(events.end, job_id, "done")
+    except asyncio.CancelledError:
+        # shutting down: queue the final writes (the writer thread finishes them at exit)
+        channels.later(store.update, job_id, status=ERROR, error="Job cancelled (server shutting down)")
+        channels.later(events.end, job_id, "cancelled", "Server shutting down")
+        raise
+    except Exception as e:
+        log.warning("Job %s failed: %s", job_id, e)
+        error = str(getattr(e, "detail", None) or e) or type(e).__name__
+        await channels.in_order(store.update, job_id, status=ERROR, error=error)
+        await channels.in_order(events.end, job_id, "cancelled" if isinstance(e, ParseCancelled) else "error", error)
+    finally:
+        deactivate(token)
+        observe_phases(timer.records)
+        cleanup()
+
+
+async def cancel_all() -> None:
+    """Cancel running job tasks (on shutdown); their rows end up as failed."""
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
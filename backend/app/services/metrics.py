@@ -0,0 +1,127 @@
+"""
+Prometheus text-format metrics (exposition format 0.0.4), kept in process.
+
+  - als_http_request_duration_seconds{route,method,status}   histogram
+  - als_parse_phase_duration_seconds{phase}                  histogram (PhaseTimer records)
+  - als_upload_size_bytes                                    histogram
+  - als_cache_* {cache="workbook"|"ssd"|"store"}             gauges / counters from ParseCache.stats()
+                                                             and ResultStore.stats()
+  - als_parse_pool_*                                         gauges from pool_stats()
+
+Values are per API process; with several uvicorn workers each one reports its own.
+"""
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+import threading
+
+from .timing import Record
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = tuple(float(1024 * 4 ** i) for i in range(11))  # 1 KiB .. 1 GiB
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}  # labels -> (counts, [sum])
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key: Labels = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(k, list(c), t[0]) for k, (c, t) in sorted(self._series.items())]
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="%s"' % _fmt_value(bound)
+                lines.append(f"{self.name}_bucket{_fmt_labels(labels, le)} {cumulative}")
+            cumulative += counts[-1]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_fmt_labels(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(labels)} {cumulative}")
+        return lines
+
+
+request_duration = Histogram(
+    "als_http_request_duration_seconds", "HTTP request latency by route template.", LATENCY_BUCKETS
+)
+phase_duration = Histogram(
+    "als_parse_phase_duration_seconds", "Duration of instrumented parse phases.", LATENCY_BUCKETS
+)
+upload_size = Histogram("als_upload_size_bytes", "Size of spooled uploads.", SIZE_BUCKETS)
+
+
+def observe_request(route: str, method: str, status: int, seconds: float) -> None:
+    request_duration.observe(seconds, route=route, method=method, status=str(status))
+
+
+def observe_phases(records: List[Record]) -> None:
+    for name, dur_ms, _ in records:
+        phase_duration.observe(dur_ms / 1000, phase=name)
+
+
+def observe_upload(size: int) -> None:
+    upload_size.observe(float(size))
+
+
+def _metric(name: str, help_text: str, kind: str, samples: List[Tuple[Labels, float]]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{_fmt_labels(labels)} {_fmt_value(v)}" for labels, v in samples]
+    return lines
+
+
+def render() -> str:
+    """All metrics in Prometheus text format."""
+    from .parse_cache import result_store, ssd_cache, workbook_cache
+    from .parse_pool import pool_stats
+
+    caches = {"workbook": workbook_cache.stats(), "ssd": ssd_cache.stats()}
+    if result_store is not None:
+        caches["store"] = result_store.stats()
+    pool = pool_stats()
+
+    def per_cache(field: str) -> List[Tuple[Labels, float]]:
+        return [((("cache", name),), stats[field]) for name, stats in caches.items()]
+
+    lines: List[str] = []
+    for hist in (request_duration, phase_duration, upload_size):
+        lines += hist.render()
+    lines += _metric("als_cache_entries", "Entries held by the parse caches.", "gauge", per_cache("entries"))
+    lines += _metric("als_cache_bytes", "Approximate bytes held by the parse caches.", "gauge", per_cache("bytes"))
+    lines += _metric("als_cache_max_bytes", "Byte budget of the parse caches.", "gauge", per_cache("maxBytes"))
+    lines += _metric("als_cache_hits_total", "Parse cache hits.", "counter", per_cache("hits"))
+    lines += _metric("als_cache_misses_total", "Parse cache misses.", "counter", per_cache("misses"))
+    lines += _metric("als_cache_evictions_total", "Parse cache evictions.", "counter", per_cache("evictions"))
+    lines += _metric("als_parse_pool_workers", "Parse worker processes (0 = thread mode).", "gauge", [((), pool["workers"])])
+    lines += _metric("als_parse_pool_in_flight", "Parses admitted (running or waiting).", "gauge", [((), pool["inFlight"])])
+    lines += _metric("als_parse_pool_queue_max", "Admission limit of the parse pool.", "gauge", [((), pool["queueMax"])])
+    return "\n".join(lines) + "\n"
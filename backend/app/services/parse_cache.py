@@ -0,0 +1,217 @@
+"""
+In-process caches of parsed ALS workbooks and SSD maps.
+
+Entries are keyed by the SHA-256 of the upload bytes, so the same ALS uploaded to
+/als/matrices, /als/matrix and /ssd/compare is only read through openpyxl once, and
+the same SSD is parsed once across compares.
+Eviction is LRU under a byte budget (ALS_CACHE_MAX_BYTES, SSD_CACHE_MAX_BYTES).
+
+Both caches write through to the persistent result store (result_store) and fall
+back to it on a miss, so parses survive restarts and are shared between processes.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Protocol, Set, Tuple, Union
+import hashlib
+import os
+import sys
+import threading
+
+from ..config import ALS_CACHE_MAX_BYTES, SSD_CACHE_MAX_BYTES
+from .result_store import ResultStore, ValueRows, WorkbookRows, open_store
+
+Pair = Tuple[str, str]  # (FolderOID, FormOID)
+Meta = Tuple[Dict[str, Optional[str]], Dict[str, Optional[str]]]  # (folder_meta, form_meta)
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def source_hash(source: Union[bytes, bytearray, str, os.PathLike]) -> str:
+    """SHA-256 of raw bytes, or of a file on disk read in chunks."""
+    if isinstance(source, (bytes, bytearray)):
+        return content_hash(bytes(source))
+    digest = hashlib.sha256()
+    with open(source, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class ParsedWorkbook:
+    """
+    Reusable parse results of one ALS workbook.
+      - available: discover_matrix_sheets() output
+      - meta:      (folder_sheet, form_sheet) -> (folder_meta, form_meta)
+      - pairs:     matrix sheet name -> [(FolderOID, FormOID), ...]
+      - stored:    result-store rows of this workbook known to be written (or queued),
+                   so a put only writes the sheets parsed since (see WorkbookRows)
+    """
+    sheet_names: List[str]
+    available: List[Dict[str, str]]
+    meta: Dict[Tuple[str, str], Meta] = field(default_factory=dict)
+    pairs: Dict[str, List[Pair]] = field(default_factory=dict)
+    stored: Set[str] = field(default_factory=set, repr=False, compare=False)
+
+
+# The parts of a cached workbook a request reads: entry -> (meta keys, matrix sheets)
+Want = Callable[[ParsedWorkbook], Tuple[List[Tuple[str, str]], List[str]]]
+
+
+def sheet_list_only(entry: ParsedWorkbook) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """Want of a request that only lists the matrices."""
+    return [], []
+
+
+def _approx_size(obj: Any) -> int:
+    """Rough deep size in bytes of a cached value (ParsedWorkbook or plain containers)."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += _approx_size(k) + _approx_size(v)
+    elif isinstance(obj, (list, tuple, set)):
+        for x in obj:
+            size += _approx_size(x)
+    elif isinstance(obj, ParsedWorkbook):
+        size += sum(_approx_size(x) for x in (obj.sheet_names, obj.available, obj.meta, obj.pairs))
+    return size
+
+
+class Persistence(Protocol):
+    def load(self, key: str) -> Optional[Any]: ...
+    def save(self, key: str, entry: Any) -> None: ...
+
+
+class WorkbookPersistence(Persistence, Protocol):
+    def load_parts(self, key: str, want: Want, have: Optional[ParsedWorkbook] = None) -> Optional[ParsedWorkbook]: ...
+
+
+class ParseCache:
+    """
+    Thread-safe LRU keyed by content hash, bounded by an approximate byte budget.
+    Values are ParsedWorkbook entries (merge() applies only to those) or SSD maps.
+    With `persist`, entries are written through to it and misses are looked up there.
+    """
+
+    def __init__(self, max_bytes: int, persist: Optional[Persistence] = None):
+        self.max_bytes = max_bytes
+        self.persist = persist
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, want: Optional[Want] = None) -> Optional[Any]:
+        """
+        The cached value, read from `persist` on a miss. Workbook caches only: with
+        `want`, only the sheet list and the parts `want` names are read from the store,
+        and a cached entry lacking some of those parts is completed from it.
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if self.persist is None:
+            return item and item[0]
+        if item is not None:
+            if want is None:
+                return item[0]
+            part = self.persist.load_parts(key, want, have=item[0])
+            return item[0] if part is None else self.merge(key, part)
+        entry = self.persist.load(key) if want is None else self.persist.load_parts(key, want)
+        if entry is not None:
+            self._insert(key, entry, _approx_size(entry))
+        return entry
+
+    def put(self, key: str, entry: Any) -> None:
+        """Insert or refresh an entry (call again after mutating it so its size is re-counted)."""
+        if self.persist is not None:
+            self.persist.save(key, entry)
+        self._insert(key, entry, _approx_size(entry))
+
+    def _insert(self, key: str, entry: Any, size: int) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return  # would never fit; keep the cache intact
+            self._entries[key] = (entry, size)
+            self._bytes += size
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+            self.evictions += 1
+
+    def merge(self, key: str, entry: ParsedWorkbook) -> ParsedWorkbook:
+        """
+        Store a parse produced elsewhere (e.g. a worker process), keeping sheets that
+        other requests cached for the same workbook in the meantime. Only the sheets new
+        to the cached entry are sized (a deep walk of a large workbook takes a second),
+        but that is still too long for the event loop: call it through asyncio.to_thread.
+        """
+        with self._lock:
+            item = self._entries.get(key)
+        if item is None or item[0] is entry:  # nothing cached, or parsed in place (thread mode)
+            self.put(key, entry)
+            return entry
+        current = item[0]
+        # sized outside the lock; sheets another merge added first are skipped below
+        meta = {k: (v, _approx_size(k) + _approx_size(v)) for k, v in entry.meta.items() if k not in current.meta}
+        pairs = {k: (v, _approx_size(k) + _approx_size(v)) for k, v in entry.pairs.items() if k not in current.pairs}
+        if not meta and not pairs:
+            return current
+        with self._lock:
+            current.stored.update(entry.stored)
+            item = self._entries.get(key)
+            if item is None or item[0] is not current:
+                current, added = None, 0
+            else:
+                added = 0
+                for k, (v, size) in meta.items():
+                    if current.meta.setdefault(k, v) is v:
+                        added += size
+                for k, (v, size) in pairs.items():
+                    if current.pairs.setdefault(k, v) is v:
+                        added += size
+                self._entries[key] = (current, item[1] + added)
+                self._entries.move_to_end(key)
+                self._bytes += added
+                self._evict_locked()
+        if current is None:  # evicted or replaced meanwhile; start over
+            return self.merge(key, entry)
+        if self.persist is not None:
+            self.persist.save(key, current)
+        return current
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+result_store: Optional[ResultStore] = open_store()
+workbook_cache = ParseCache(ALS_CACHE_MAX_BYTES, result_store and WorkbookRows(result_store))
+ssd_cache = ParseCache(SSD_CACHE_MAX_BYTES, result_store and ValueRows(result_store, "ssd"))
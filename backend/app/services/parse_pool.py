@@ -0,0 +1,474 @@
+"""
+Process-pool execution of CPU-bound ALS parsing.
+
+Async routes hand parses to a ProcessPoolExecutor so a large workbook no longer
+blocks the event loop (and every other request on the worker, /als/ping included).
+  - admission is bounded (ALS_PARSE_QUEUE_MAX); when full, ParseQueueFull is raised
+    and routes answer 503 with Retry-After
+  - each parse has a timeout (ALS_PARSE_TIMEOUT_S); on expiry ParseTimeout is raised
+    and the worker running it is told to stop (see _stop_task), so other parses in
+    the pool are left alone; only a worker that does not stop gets the pool recycled
+  - a parse whose progress channel is cancelled raises ParseCancelled and is stopped
+    the same way, even in the middle of a long phase
+  - ALS_PARSE_WORKERS=0 parses in a thread of the API process instead (no kill on timeout)
+
+The parse modules (pandas, openpyxl) are imported on first use, not with this module,
+so the API process starts without them; warm_up() loads them ahead of time.
+"""
+from __future__ import annotations
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from itertools import count
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+from ..config import (
+    ALS_PARSE_QUEUE_MAX,
+    ALS_PARSE_RETRY_AFTER_S,
+    ALS_PARSE_TIMEOUT_S,
+    ALS_PARSE_WORKERS,
+)
+from .parse_cache import ParsedWorkbook, source_hash, workbook_cache
+from .progress import ChannelListener, ParseCancelled, wait_cancelled
+from .timing import current_timer, phase, timed_call
+
+if TYPE_CHECKING:
+    from .workbook_reader import Source
+
+log = logging.getLogger("als.pool")
+
+
+class ParseQueueFull(Exception):
+    """Too many parses admitted; the caller should retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int = ALS_PARSE_RETRY_AFTER_S):
+        super().__init__("ALS parse queue is full")
+        self.retry_after = retry_after
+
+
+class ParseTimeout(Exception):
+    """The parse exceeded ALS_PARSE_TIMEOUT_S and its worker was stopped."""
+
+
+# Stopping one timed-out task: every pool task gets an id, and a shared array holds
+# three slots per id (mod _SLOTS): the id of the task a worker is running, that
+# worker's pid, and the id of a task asked to stop. The API process marks the task
+# and sends _STOP_SIGNAL to its worker, whose handler raises ParseTimeout in the
+# task only if the mark is for the task it is running (the worker may have moved on).
+_SLOTS = 256
+_STOP_SIGNAL = getattr(signal, "SIGUSR1", None)  # None on Windows: recycle the pool instead
+# how long a timed-out task gets to stop before its whole pool is recycled (seconds)
+_STOP_GRACE_S = 5.0
+
+_task_ids = count(1)
+_stopping: "set[asyncio.Task[None]]" = set()  # running _stop_task()s (strong references)
+# worker process state
+_worker_slots: Any = None
+_current_task: Optional[int] = None
+
+
+def _import_parsers() -> None:
+    # the heavy modules: pandas, openpyxl (and the openpyxl warning filters) and the parsers
+    import openpyxl  # noqa: F401
+    import pandas  # noqa: F401
+    from . import als_diff, als_matrix, ssd_reader  # noqa: F401
+
+
+def _init_worker(slots: Any = None) -> None:
+    global _worker_slots
+    _worker_slots = slots
+    if slots is not None and _STOP_SIGNAL is not None:
+        signal.signal(_STOP_SIGNAL, _on_stop)
+    # pre-import the heavy modules so the first parse in each worker does not pay for them
+    _import_parsers()
+
+
+def _stop_requested(task: Optional[int]) -> bool:
+    return task is not None and _worker_slots is not None and _worker_slots[3 * (task % _SLOTS) + 2] == task
+
+
+def _on_stop(signum: int, frame: Any) -> None:
+    # the caller has already answered (timeout or cancel); this only ends the task
+    if _stop_requested(_current_task):
+        raise ParseTimeout("ALS parse stopped")
+
+
+def _run_task(task: int, call: Callable[..., Any], fn: Callable[..., Any], *args: Any) -> Any:
+    """Pool-side wrapper of one task: publishes (task, pid) so the task can be stopped alone."""
+    global _current_task
+    slots = _worker_slots
+    try:
+        if slots is not None:
+            i = 3 * (task % _SLOTS)
+            slots[i + 1] = os.getpid()
+            slots[i] = task
+        _current_task = task
+        if _stop_requested(task):
+            raise ParseTimeout("ALS parse stopped")
+        return call(fn, *args)
+    finally:
+        _current_task = None
+
+
+def _ready() -> None:
+    """No-op pool task; returns once a worker has started (and run _init_worker)."""
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_slots: Any = None
+_in_flight = 0
+
+
+def get_executor() -> Optional[ProcessPoolExecutor]:
+    """The shared pool, created on first use; None when ALS_PARSE_WORKERS=0."""
+    global _executor, _executor_slots
+    if ALS_PARSE_WORKERS <= 0:
+        return None
+    if _executor is None:
+        ctx = multiprocessing.get_context("spawn")
+        _executor_slots = ctx.RawArray("q", 3 * _SLOTS)
+        _executor = ProcessPoolExecutor(
+            max_workers=ALS_PARSE_WORKERS,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(_executor_slots,),
+        )
+    return _executor
+
+
+def _recycle_executor() -> None:
+    """
+    Kill the current pool's processes and start fresh on next use; the last resort for
+    a task that ignores _stop_task (stuck in C code). Every parse still running in the
+    pool fails with BrokenProcessPool. ProcessPoolExecutor has no public way to kill
+    its workers, so this reaches into CPython's `_processes`; if that attribute goes
+    away, the workers are only shut down once idle.
+    """
+    global _executor
+    ex, _executor = _executor, None
+    if ex is None:
+        return
+    for proc in list((getattr(ex, "_processes", None) or {}).values()):
+        proc.terminate()
+    ex.shutdown(wait=False, cancel_futures=True)
+
+
+def _discard_outcome(fut: "asyncio.Future[Any]") -> None:
+    # nobody waits for an abandoned task any more; retrieve its error so it is not logged
+    if not fut.cancelled():
+        fut.exception()
+
+
+async def _stop_task(
+    executor: ProcessPoolExecutor, task: int, pool_fut: "Future[Any]", fut: "asyncio.Future[Any]"
+) -> None:
+    """Stop a timed-out, cancelled or abandoned pool task without touching the other tasks in the pool."""
+    fut.add_done_callback(_discard_outcome)
+    if pool_fut.cancel():
+        return  # not handed to a worker yet: it never starts
+    if _STOP_SIGNAL is not None and executor is _executor:
+        i = 3 * (task % _SLOTS)
+        _executor_slots[i + 2] = task
+        if _executor_slots[i] == task:
+            try:
+                os.kill(_executor_slots[i + 1], _STOP_SIGNAL)
+            except ProcessLookupError:
+                pass
+        # a task that has not reached the slots yet sees the mark when it starts
+        await asyncio.wait({fut}, timeout=_STOP_GRACE_S)
+    if not fut.done() and executor is _executor:
+        log.warning("Abandoned parse did not stop; recycling the worker pool")
+        _recycle_executor()
+
+
+def shutdown_pool() -> None:
+    global _executor
+    ex, _executor = _executor, None
+    if ex is not None:
+        ex.shutdown(wait=False, cancel_futures=True)
+
+
+async def warm_up() -> None:
+    """
+    Import the parse modules in this process and start every pool worker, so the first
+    parses pay for neither (ALS_WARMUP=1 runs this at startup).
+    """
+    started = time.perf_counter()
+    await asyncio.to_thread(_import_parsers)
+    executor = get_executor()
+    if executor is not None:
+        # as many concurrent tasks as workers: the pool spawns a process for each
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(executor, _ready) for _ in range(ALS_PARSE_WORKERS)))
+    log.info("Warm-up done in %.2fs (%d parse workers)", time.perf_counter() - started, max(ALS_PARSE_WORKERS, 0))
+
+
+class Reservation:
+    """Admission slots taken together (see reserve()); run_parse(reservation=...) uses one each."""
+
+    def __init__(self, slots: int):
+        self.left = slots
+
+    def release(self) -> None:
+        """Give back the slots no parse has used."""
+        global _in_flight
+        _in_flight -= self.left
+        self.left = 0
+
+
+def reserve(wanted: int, least: int = 1) -> Reservation:
+    """
+    Take up to `wanted` admission slots at once (at least `least`, else ParseQueueFull),
+    so a fan-out of several parses is admitted whole and cannot overshoot
+    ALS_PARSE_QUEUE_MAX. Release it once the parses have returned.
+    """
+    global _in_flight
+    slots = min(wanted, ALS_PARSE_QUEUE_MAX - _in_flight)
+    if slots < least:
+        raise ParseQueueFull()
+    _in_flight += slots
+    return Reservation(slots)
+
+
+def pool_stats() -> Dict[str, int]:
+    return {
+        "workers": max(ALS_PARSE_WORKERS, 0),
+        "inFlight": _in_flight,
+        "queueMax": ALS_PARSE_QUEUE_MAX,
+    }
+
+
+def _stop_in_background(
+    executor: ProcessPoolExecutor, task: int, pool_fut: "Future[Any]", fut: "asyncio.Future[Any]"
+) -> None:
+    stopping = asyncio.create_task(_stop_task(executor, task, pool_fut, fut))
+    _stopping.add(stopping)
+    stopping.add_done_callback(_stopping.discard)
+
+
+async def run_parse(
+    fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, reservation: Optional[Reservation] = None
+) -> Any:
+    """
+    Run `fn(*args)` in the parse pool under admission control and a timeout.
+    `fn` and its arguments must be picklable (module-level function, plain data).
+    With `reservation`, one of its slots is used instead of admitting the parse here.
+    Phases `fn` records in the worker are added to the request's PhaseTimer. If that
+    timer publishes to a progress channel, the parse does too, as it runs, and stops
+    with ParseCancelled when the channel is cancelled. Cancelling the call drops or
+    stops its pool task.
+    """
+    global _in_flight
+    if reservation is not None and reservation.left > 0:
+        reservation.left -= 1
+    elif _in_flight >= ALS_PARSE_QUEUE_MAX:
+        raise ParseQueueFull()
+    else:
+        _in_flight += 1
+    try:
+        limit = ALS_PARSE_TIMEOUT_S if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + limit if limit else None
+        timer = current_timer()
+        listener = None
+        if timer is not None and isinstance(timer.listener, ChannelListener):
+            listener = ChannelListener(timer.listener.channel, cancellable=True)
+            await asyncio.to_thread(listener.check)  # cancelled while queued: do not start
+        call = partial(timed_call, listener=listener)
+        for attempt in range(2):
+            executor = get_executor()
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                raise ParseTimeout(f"ALS parse exceeded {limit}s")
+            task = next(_task_ids)
+            if executor is None:
+                pool_fut = None
+                fut = loop.run_in_executor(None, call, fn, *args)
+            else:
+                pool_fut = executor.submit(_run_task, task, call, fn, *args)
+                fut = asyncio.wrap_future(pool_fut)
+            # a cancelled channel is watched from here too: a long phase sends no events,
+            # so the listener in the worker would only notice the cancel once it ends
+            watch = asyncio.ensure_future(wait_cancelled(listener.channel)) if listener is not None else None
+            try:
+                # the pool future is not cancelled on timeout: the task is stopped by _stop_task
+                done, _ = await asyncio.wait(
+                    [fut] if watch is None else [fut, watch], timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                if fut in done:
+                    result, records = fut.result()
+                    if timer is not None:
+                        timer.extend(records)
+                    return result
+                if executor is not None:
+                    # in the background: the caller gets its answer now, not after the grace period
+                    _stop_in_background(executor, task, pool_fut, fut)
+                else:
+                    fut.add_done_callback(_discard_outcome)
+                if watch is not None and watch in done:
+                    raise ParseCancelled("Parse cancelled by the client")
+                log.warning("Parse exceeded %ss; stopping it", limit)
+                raise ParseTimeout(f"ALS parse exceeded {limit}s")
+            except asyncio.CancelledError:
+                # the caller went away (or a sibling of a fan-out failed): free the worker
+                if executor is not None:
+                    _stop_in_background(executor, task, pool_fut, fut)
+                else:
+                    fut.add_done_callback(_discard_outcome)
+                raise
+            except BrokenProcessPool:
+                # the pool was recycled under us (another parse would not stop); retry
+                # once, within what is left of this parse's own time limit
+                if attempt or executor is None:
+                    raise
+                if executor is _executor:
+                    _recycle_executor()
+            finally:
+                if watch is not None:
+                    watch.cancel()
+    finally:
+        _in_flight -= 1
+
+
+async def parse_matrix_pooled(
+    source: Source,
+    matrix_oid: Optional[str] = None,
+    file_hash: Optional[str] = None,
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+    reader: Optional[str] = None,
+) -> ParsedWorkbook:
+    """
+    The cached parse holding everything extract_matrix() needs for `matrix_oid`:
+    the cache is consulted in the API process, only the missing sheets are parsed
+    in a worker, and the result is cached here.
+    """
+    from .als_matrix import fill_parsed, is_parsed, matrix_parts
+
+    key = file_hash or source_hash(source)
+    with phase("cache_lookup") as p:
+        # a miss in memory reads the persistent result store; keep that off the event loop
+        want = matrix_parts(matrix_oid, folder_sheet, form_sheet)
+        entry = await asyncio.to_thread(workbook_cache.get, key, want)
+        p["hit"] = is_parsed(entry, matrix_oid, folder_sheet, form_sheet)
+    if not p["hit"]:
+        entry, _ = await run_parse(fill_parsed, source, entry, matrix_oid, folder_sheet, form_sheet, reader)
+        entry = await asyncio.to_thread(workbook_cache.merge, key, entry)
+    return entry
+
+
+async def extract_matrix_pooled(
+    source: Source,
+    matrix_oid: Optional[str] = None,
+    ssd_matrix: Optional[Dict[str, List[str]]] = None,
+    file_hash: Optional[str] = None,
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+    reader: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Async equivalent of extract_matrix() (see parse_matrix_pooled)."""
+    from .als_matrix import build_matrix_result
+
+    entry = await parse_matrix_pooled(source, matrix_oid, file_hash, folder_sheet, form_sheet, reader)
+    return build_matrix_result(entry, matrix_oid, folder_sheet, form_sheet, ssd_matrix)
+
+
+async def _gather_or_cancel(aws: List[Any]) -> List[Any]:
+    """asyncio.gather(), except that the first failure cancels the others (freeing their workers) and is then raised."""
+    tasks = [asyncio.ensure_future(a) for a in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def extract_all_matrices_pooled(
+    source: Source,
+    ssd_matrix: Optional[Dict[str, List[str]]] = None,
+    file_hash: Optional[str] = None,
+    concurrent: bool = False,
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+    reader: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Async equivalent of extract_all_matrices(). With concurrent=True the missing matrix
+    sheets are spread over up to ALS_PARSE_WORKERS pool tasks (the meta sheets get their
+    own); otherwise one task parses everything on a single workbook handle.
+    """
+    from .als_matrix import all_parts, build_all_results, discover_workbook, fill_all_parsed, parse_sheets
+
+    key = file_hash or source_hash(source)
+    entry = (
+        await asyncio.to_thread(workbook_cache.get, key, all_parts(folder_sheet, form_sheet))
+        or await asyncio.to_thread(discover_workbook, source)
+    )
+    missing = [m["sheet"] for m in entry.available if m["sheet"] not in entry.pairs]
+    need_meta = (folder_sheet, form_sheet) not in entry.meta
+
+    # the fan-out is admitted whole: one task per worker plus one for the meta sheets,
+    # or as many as the admission limit leaves room for (one task does it all)
+    held = None
+    if concurrent and len(missing) > 1:
+        held = reserve(min(len(missing), max(ALS_PARSE_WORKERS, 1)) + int(need_meta))
+    try:
+        if held is not None and held.left > 1:
+            n = held.left - int(need_meta)
+            tasks = [
+                run_parse(
+                    parse_sheets, source, entry, missing[i::n], folder_sheet, form_sheet, False, reader,
+                    reservation=held,
+                )
+                for i in range(n)
+            ]
+            if need_meta:
+                tasks.append(
+                    run_parse(parse_sheets, source, entry, [], folder_sheet, form_sheet, True, reader, reservation=held)
+                )
+            for part in await _gather_or_cancel(tasks):
+                for k, v in part.meta.items():
+                    entry.meta.setdefault(k, v)
+                for k, v in part.pairs.items():
+                    entry.pairs.setdefault(k, v)
+        elif missing or need_meta:
+            entry = await run_parse(
+                fill_all_parsed, source, entry, folder_sheet, form_sheet, None, True, reader, reservation=held
+            )
+    finally:
+        if held is not None:
+            held.release()
+    # merging and building walk every pair of every matrix; keep both off the event loop
+    entry = await asyncio.to_thread(workbook_cache.merge, key, entry)
+    return await asyncio.to_thread(build_all_results, entry, folder_sheet, form_sheet, ssd_matrix)
+
+
+async def diff_als_pooled(
+    old: Source,
+    new: Source,
+    old_hash: Optional[str] = None,
+    new_hash: Optional[str] = None,
+    reader: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Async ALS-to-ALS diff; cached parses are reused and whatever was parsed is cached."""
+    from .als_diff import diff_als_versions
+
+    old_key = old_hash or source_hash(old)
+    new_key = new_hash or source_hash(new)
+    old_entry, new_entry = await asyncio.gather(
+        asyncio.to_thread(workbook_cache.get, old_key), asyncio.to_thread(workbook_cache.get, new_key)
+    )
+    diff, old_entry, new_entry = await run_parse(
+        diff_als_versions, old, new, old_entry, new_entry, "Folder", "Form", reader
+    )
+    await asyncio.to_thread(workbook_cache.merge, old_key, old_entry)
+    await asyncio.to_thread(workbook_cache.merge, new_key, new_entry)
+    return diff
@@ -0,0 +1,182 @@
+"""
+Progress channels: live events of one parse, for WS /progress/{channel}.
+
+A channel is named by a job id, or by the `progress_id` a client passes to a
+synchronous route. Its events are rows in JOB_STORE_DIR/progress.sqlite, so they
+reach the subscriber whichever process produced them (API process, pool worker,
+another uvicorn worker) and whichever serves the WebSocket:
+  {"type": "phase", "name": "workbook_load", "ms": 812.0, "attrs": {"sheets": 14}}
+  {"type": "rows", "sheet": "MASTERDASHBOARD", "rows": 20000}
+  {"type": "diff", "missing_in_db": {...}, "extra_in_db": {...}}   (in folder chunks)
+  {"type": "step", "step": "parse", "progress": 0.1}                (jobs)
+  {"type": "end", "status": "done" | "error" | "cancelled", "error": ...}
+
+Cancelling sets a flag on the channel. ChannelListener checks the flag between
+events inside the parse and raises ParseCancelled; run_parse also watches it from
+the API process (wait_cancelled) and stops the pool worker of a parse that is in
+the middle of a long phase and sends no events.
+
+Writes made from the event loop (events of the request's own timer, channel open
+and end, job rows) go through one background thread (later / in_order), which
+keeps them off the loop and in order.
+"""
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from ..config import JOB_STORE_DIR
+
+# events and cancel flags older than this are dropped (seconds)
+_RETAIN_S = 3600
+# a parse looks at its cancel flag at most this often (seconds)
+_CANCEL_CHECK_S = 0.2
+
+_CHANNEL_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq      INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel  TEXT NOT NULL,
+    ts       REAL NOT NULL,
+    body     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_channel ON events (channel, seq);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE TABLE IF NOT EXISTS cancels (
+    channel  TEXT PRIMARY KEY,
+    ts       REAL NOT NULL
+);
+"""
+
+
+def is_channel_id(value: str) -> bool:
+    """Channel names are 1-64 letters, digits, '-' or '_' (job ids and client progress ids)."""
+    return bool(_CHANNEL_ID.match(value))
+
+
+class ParseCancelled(Exception):
+    """The client cancelled the parse through its progress channel."""
+
+
+class ProgressStore:
+    """Channel events and cancel flags in one SQLite file; safe to share between processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def open(self, channel: str) -> None:
+        """
+        Start `channel` afresh (a reused id loses its old events and a cancel left over
+        from an earlier parse) and prune old channels.
+        """
+        conn = self._conn()
+        cutoff = time.time() - _RETAIN_S
+        conn.execute("DELETE FROM events WHERE channel = ? OR ts < ?", (channel, cutoff))
+        conn.execute("DELETE FROM cancels WHERE channel = ? OR ts < ?", (channel, cutoff))
+
+    def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        self._conn().execute(
+            "INSERT INTO events (channel, ts, body) VALUES (?, ?, ?)",
+            (channel, time.time(), json.dumps(event, default=str, separators=(",", ":"))),
+        )
+
+    def events(self, channel: str, after: int = 0, limit: int = 500) -> List[Tuple[int, Dict[str, Any]]]:
+        """(seq, event) of `channel` after sequence number `after`, oldest first."""
+        rows = self._conn().execute(
+            "SELECT seq, body FROM events WHERE channel = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (channel, after, limit),
+        ).fetchall()
+        return [(seq, json.loads(body)) for seq, body in rows]
+
+    def request_cancel(self, channel: str) -> None:
+        self._conn().execute("INSERT OR REPLACE INTO cancels VALUES (?, ?)", (channel, time.time()))
+
+    def cancel_requested(self, channel: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM cancels WHERE channel = ?", (channel,)).fetchone() is not None
+
+    def end(self, channel: str, status: str, error: Optional[str] = None) -> None:
+        self.publish(channel, {"type": "end", "status": status, "error": error})
+        self._conn().execute("DELETE FROM cancels WHERE channel = ?", (channel,))
+
+
+_store: Optional[ProgressStore] = None
+_writer: Optional[ThreadPoolExecutor] = None
+
+
+def get_store() -> ProgressStore:
+    global _store
+    if _store is None:
+        _store = ProgressStore(os.path.join(JOB_STORE_DIR, "progress.sqlite"))
+    return _store
+
+
+def later(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> "Future[Any]":
+    """Run a blocking store write on the writer thread, after those queued before it."""
+    global _writer
+    if _writer is None:
+        _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="progress")
+    return _writer.submit(fn, *args, **kwargs)
+
+
+async def in_order(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """later(), awaited."""
+    return await asyncio.wrap_future(later(fn, *args, **kwargs))
+
+
+async def wait_cancelled(channel: str) -> None:
+    """Return once `channel` is cancelled (its flag is polled off the event loop)."""
+    store = get_store()
+    while not await asyncio.to_thread(store.cancel_requested, channel):
+        await asyncio.sleep(_CANCEL_CHECK_S)
+
+
+class ChannelListener:
+    """
+    PhaseTimer listener publishing to a channel. With `cancellable` (the copy run_parse
+    hands to the parse) it raises ParseCancelled once the channel is cancelled. With
+    `queued` (request and job timers, which run on the event loop) events are
+    published through later() instead of in the calling thread.
+    Picklable, so it travels to pool workers with the parse.
+    """
+
+    def __init__(self, channel: str, cancellable: bool = False, queued: bool = False):
+        self.channel = channel
+        self.cancellable = cancellable
+        self.queued = queued
+        self._checked = 0.0
+
+    def __call__(self, event: str, data: Dict[str, Any]) -> None:
+        if self.queued:
+            later(get_store().publish, self.channel, {"type": event, **data})
+        else:
+            get_store().publish(self.channel, {"type": event, **data})
+        if self.cancellable:
+            self.check()
+
+    def check(self) -> None:
+        """Raise ParseCancelled if the channel was cancelled (looked up at most every 0.2 s)."""
+        now = time.monotonic()
+        if now - self._checked < _CANCEL_CHECK_S:
+            return
+        self._checked = now
+        if get_store().cancel_requested(self.channel):
+            raise ParseCancelled("Parse cancelled by the client")
@@ -0,0 +1,375 @@
+"""
+Persistent parse results, shared by every API process and kept across restarts.
+
+A second tier below the in-process caches (parse_cache): a SQLite file in
+RESULT_STORE_DIR holding parse results, as JSON, under
+  als:{hash}:sheets                  sheet names + discovered matrices
+  als:{hash}:meta:{folder}|{form}    Folder / Form meta maps
+  als:{hash}:matrix:{sheet}          FolderOIDs and FormOIDs of one matrix sheet's pairs
+  ssd:{hash}:{format}                parsed SSD map
+Every row carries PARSER_VERSION; rows written by another version are never read
+and are deleted when the store is opened. Rows are evicted least-recently-used
+once the store exceeds RESULT_STORE_MAX_BYTES (0 disables the store).
+
+Values are plain strings, lists and dicts, stored as JSON rather than pickled: the
+default directory is under the shared temp dir, and a planted file must not be able
+to run code in the API or its workers. The directory is created private (storage).
+
+Lookups read only the rows a request needs: the sheet list plus the meta and matrix
+rows it asks for. Each ParsedWorkbook remembers which of its rows are stored, so a
+put writes only the sheets parsed since. Writes (and last-access updates) go through
+one background thread, so requests never wait for them, and a row is only written if
+its key is missing from the file. Rows evicted, cleared or lost to a failed write are
+written again by the next parse of the same workbook once its entry has left memory.
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from ..config import RESULT_STORE_DIR, RESULT_STORE_MAX_BYTES
+from .storage import private_dir
+
+if TYPE_CHECKING:  # parse_cache imports this module
+    from .parse_cache import ParsedWorkbook, Want
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib codec is used without it
+    orjson = None
+
+log = logging.getLogger("als.store")
+
+# Bump whenever parsing produces different output for the same file (als_matrix,
+# ssd_reader, workbook_reader) or the stored format changes; results persisted by
+# other versions are dropped unread. (2: JSON values instead of pickles)
+PARSER_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key       TEXT PRIMARY KEY,
+    version   INTEGER NOT NULL,
+    size      INTEGER NOT NULL,
+    accessed  REAL NOT NULL,
+    value     BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+"""
+
+# last-access times are refreshed at most this often per row (seconds)
+_TOUCH_INTERVAL = 60.0
+# rows whose last refresh is remembered; the memo is dropped when it grows past this
+_TOUCH_MEMO_MAX = 10_000
+# keys per "which of these are stored" query (below SQLite's variable limit)
+_LOOKUP_BATCH = 500
+
+
+def _encode(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decode(blob: bytes) -> Any:
+    return orjson.loads(blob) if orjson is not None else json.loads(blob)
+
+
+class ResultStore:
+    """JSON values in one SQLite file (WAL), LRU-evicted under a byte budget."""
+
+    def __init__(self, path: str, max_bytes: int, version: int = PARSER_VERSION):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._touched: Dict[str, float] = {}
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-store")
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._init_lock:
+                if not self._initialized:
+                    # the file is created on first use, not at import (parse workers import this too)
+                    conn.executescript(_SCHEMA)
+                    conn.execute("DELETE FROM results WHERE version != ?", (self.version,))
+                    self._initialized = True
+        return conn
+
+    # -- reads (calling thread) --
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT value FROM results WHERE key = ? AND version = ?", (key, self.version)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch([key])
+        return _decode(row[0])
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """The stored ones of `keys`."""
+        conn = self._conn()
+        rows = []
+        for i in range(0, len(keys), _LOOKUP_BATCH):
+            batch = keys[i : i + _LOOKUP_BATCH]
+            rows += conn.execute(
+                f"SELECT key, value FROM results WHERE version = ? AND key IN ({','.join('?' * len(batch))})",
+                (self.version, *batch),
+            ).fetchall()
+        if not rows:
+            self.misses += 1
+            return {}
+        self.hits += 1
+        self._touch([k for k, _ in rows])
+        return {k: _decode(v) for k, v in rows}
+
+    def get_prefix(self, prefix: str) -> Dict[str, Any]:
+        """All rows whose key starts with `prefix` (one primary-key range scan)."""
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        rows = self._conn().execute(
+            "SELECT key, value FROM results WHERE key >= ? AND key < ? AND version = ?",
+            (prefix, upper, self.version),
+        ).fetchall()
+        if not rows:
+            self.misses += 1
+            return {}
+        self.hits += 1
+        self._touch([k for k, _ in rows])
+        return {k: _decode(v) for k, v in rows}
+
+    # -- writes (background thread) --
+    def put_many(self, items: Dict[str, Any]) -> None:
+        """
+        Queue `items` for writing. Keys already stored are left as they are (a key
+        always names the same result), and only missing ones are encoded, on the
+        writer thread.
+        """
+        if items:
+            self._writer.submit(self._write, dict(items))
+
+    def _stored(self, conn: sqlite3.Connection, keys: List[str]) -> set:
+        found = set()
+        for i in range(0, len(keys), _LOOKUP_BATCH):
+            batch = keys[i : i + _LOOKUP_BATCH]
+            found.update(k for (k,) in conn.execute(
+                f"SELECT key FROM results WHERE version = ? AND key IN ({','.join('?' * len(batch))})",
+                (self.version, *batch),
+            ))
+        return found
+
+    def _write(self, items: Dict[str, Any]) -> None:
+        try:
+            conn = self._conn()
+            stored = self._stored(conn, list(items))
+            now = time.time()
+            rows = []
+            for key, value in items.items():
+                if key not in stored:
+                    blob = _encode(value)
+                    rows.append((key, self.version, len(blob), now, blob))
+            if not rows:
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?)", rows)
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except Exception:
+            log.exception("Could not persist %d parse results", len(items))
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY accessed").fetchall():
+            if total <= target:
+                break
+            conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def _touch(self, keys: list) -> None:
+        now = time.time()
+        stale = [k for k in keys if now - self._touched.get(k, 0.0) > _TOUCH_INTERVAL]
+        if stale:
+            if len(self._touched) + len(stale) > _TOUCH_MEMO_MAX:
+                self._touched.clear()
+            for k in stale:
+                self._touched[k] = now
+            self._writer.submit(self._write_touch, stale, now)
+
+    def _write_touch(self, keys: list, now: float) -> None:
+        try:
+            self._conn().executemany("UPDATE results SET accessed = ? WHERE key = ?", [(now, k) for k in keys])
+        except sqlite3.Error:
+            log.debug("Could not refresh access times", exc_info=True)
+
+    def flush(self) -> None:
+        """Wait for queued writes (tests, benchmarks, shutdown)."""
+        self._writer.submit(lambda: None).result()
+
+    def clear(self) -> None:
+        self.flush()
+        self._conn().execute("DELETE FROM results")
+        self._touched.clear()
+
+    def stats(self) -> Dict[str, int]:
+        entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class WorkbookRows:
+    """
+    Persistence of ParsedWorkbook entries for workbook_cache: one row per sheet list,
+    meta pair and matrix sheet, so sheets parsed later are added without rewriting
+    the others, and a lookup reads only the sheets it needs.
+    """
+
+    def __init__(self, store: ResultStore):
+        self.store = store
+
+    def load(self, file_hash: str) -> Optional[ParsedWorkbook]:
+        """Every stored sheet of the workbook."""
+        prefix = f"als:{file_hash}:"
+        try:
+            rows = self.store.get_prefix(prefix)
+        except (sqlite3.Error, ValueError):
+            log.warning("Could not read stored results of %s", file_hash, exc_info=True)
+            return None
+        sheets = rows.pop(prefix + "sheets", None)
+        if sheets is None:
+            return None
+        return _add_rows(_sheet_list(sheets), prefix, rows)
+
+    def load_parts(self, file_hash: str, want: Want, have: Optional[ParsedWorkbook] = None) -> Optional[ParsedWorkbook]:
+        """
+        The sheet list and the parts `want(entry)` names. With `have` (the entry cached
+        in memory), only the parts it lacks are read, into a new partial entry; None if
+        none of them are stored.
+        """
+        from .parse_cache import ParsedWorkbook
+
+        prefix = f"als:{file_hash}:"
+        try:
+            if have is None:
+                sheets = self.store.get(prefix + "sheets")
+                if sheets is None:
+                    return None
+                entry = _sheet_list(sheets)
+            else:
+                entry = ParsedWorkbook(sheet_names=list(have.sheet_names), available=list(have.available))
+            metas, matrices = want(have or entry)
+            keys = [prefix + _meta_row(k) for k in metas if have is None or k not in have.meta]
+            keys += [prefix + _matrix_row(ws) for ws in matrices if have is None or ws not in have.pairs]
+            rows = self.store.get_many(keys) if keys else {}
+        except (sqlite3.Error, ValueError):
+            log.warning("Could not read stored results of %s", file_hash, exc_info=True)
+            return None
+        if have is not None and not rows:
+            return None
+        return _add_rows(entry, prefix, rows)
+
+    def save(self, file_hash: str, entry: ParsedWorkbook) -> None:
+        """Queue the rows of `entry` not stored yet (normally just the sheets parsed since the last save)."""
+        prefix = f"als:{file_hash}:"
+        items: Dict[str, Any] = {}
+        if "sheets" not in entry.stored:
+            items["sheets"] = (list(entry.sheet_names), [dict(m) for m in entry.available])
+        for meta_key, meta in list(entry.meta.items()):
+            row = _meta_row(meta_key)
+            if row not in entry.stored:
+                items[row] = meta
+        for sheet, pairs in list(entry.pairs.items()):
+            row = _matrix_row(sheet)
+            if row not in entry.stored:
+                items[row] = ([f for f, _ in pairs], [f for _, f in pairs])
+        if items:
+            entry.stored.update(items)
+            self.store.put_many({prefix + row: value for row, value in items.items()})
+
+
+def _meta_row(meta_key: Tuple[str, str]) -> str:
+    return f"meta:{meta_key[0]}|{meta_key[1]}"
+
+
+def _matrix_row(sheet: str) -> str:
+    return f"matrix:{sheet}"
+
+
+def _sheet_list(sheets: Any) -> ParsedWorkbook:
+    from .parse_cache import ParsedWorkbook
+
+    entry = ParsedWorkbook(sheet_names=list(sheets[0]), available=list(sheets[1]))
+    entry.stored.add("sheets")
+    return entry
+
+
+def _add_rows(entry: ParsedWorkbook, prefix: str, rows: Dict[str, Any]) -> ParsedWorkbook:
+    # JSON has no tuples: meta comes back as a list, pairs are stored as two columns
+    for key, value in rows.items():
+        row = key[len(prefix):]
+        kind, _, name = row.partition(":")
+        if kind == "meta":
+            folder_sheet, _, form_sheet = name.partition("|")
+            entry.meta[(folder_sheet, form_sheet)] = (value[0], value[1])
+        elif kind == "matrix":
+            entry.pairs[name] = list(zip(value[0], value[1]))
+        entry.stored.add(row)
+    return entry
+
+
+class ValueRows:
+    """Persistence of whole values (SSD maps) under `{namespace}:{key}`."""
+
+    def __init__(self, store: ResultStore, namespace: str):
+        self.store = store
+        self.namespace = namespace
+
+    def load(self, key: str) -> Optional[Any]:
+        try:
+            return self.store.get(f"{self.namespace}:{key}")
+        except (sqlite3.Error, ValueError):
+            log.warning("Could not read stored result %s:%s", self.namespace, key, exc_info=True)
+            return None
+
+    def save(self, key: str, value: Any) -> None:
+        self.store.put_many({f"{self.namespace}:{key}": value})
+
+
+def open_store() -> Optional[ResultStore]:
+    """The configured store, or None when disabled or the directory is unusable."""
+    if RESULT_STORE_MAX_BYTES <= 0:
+        return None
+    try:
+        private_dir(RESULT_STORE_DIR)
+    except OSError as e:
+        log.warning("Persistent result store disabled: %s", e)
+        return None
+    return ResultStore(os.path.join(RESULT_STORE_DIR, "results.sqlite"), RESULT_STORE_MAX_BYTES)
@@ -0,0 +1,326 @@
+"""
+Streaming SSD (study design specification) reader.
+
+Builds the normalized {FolderOID: sorted [FormOID]} map from a JSON, CSV or XLSX
+export without loading the whole file into a DataFrame:
+  - CSV:  only the FolderOID and OID/FormOID columns are read, in chunks
+  - XLSX: rows are streamed from the first worksheet through the workbook reader
+  - JSON: row arrays are decoded one element at a time; {FolderOID: [FormOID]}
+          objects are loaded as before
+Output matches the DataFrame + iterrows parser this replaced, except for JSON rows:
+a null or missing FolderOID / OID now skips the row (it used to give a "NAN" OID),
+and numbers are read as JSON gives them, so 1 stays "1" (pandas made it "1.0" when
+the whole column was numeric with gaps or floats).
+Strip/upper-case runs once per distinct value (folder and form OIDs repeat heavily)
+and pairs are grouped per chunk with pandas.
+
+Parsed maps are cached by content hash (ssd_cache), so repeat compares against the
+same SSD skip parsing.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from ..config import SSD_CHUNK_ROWS
+from .als_matrix import _map_unique
+from .parse_cache import source_hash, ssd_cache
+from .timing import phase
+from .workbook_reader import Source, _as_file, open_workbook
+
+SSDMap = Dict[str, List[str]]
+
+_FOLDER_COLUMNS = ["FolderOID", "Folder OID"]
+# Form OID may be labeled just "OID" in SSD exports
+_FORM_COLUMNS = ["OID", "FormOID", "Form OID"]
+_CANDIDATES = {c.strip().lower() for c in _FOLDER_COLUMNS + _FORM_COLUMNS}
+
+
+class SSDFormatError(ValueError):
+    """The SSD upload could not be read; the message is suitable for the API response."""
+
+
+def _pick_columns(names: Sequence[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Positions of the FolderOID and FormOID columns among `names`, or None.
+    Names are matched case-insensitively; if several normalize alike, the last wins.
+    """
+    cols = {str(c).strip().lower(): i for i, c in enumerate(names)}
+
+    def pick(options: List[str]) -> Optional[int]:
+        for opt in options:
+            k = opt.strip().lower()
+            if k in cols:
+                return cols[k]
+        return None
+
+    return pick(_FOLDER_COLUMNS), pick(_FORM_COLUMNS)
+
+
+def _norm(value: str) -> str:
+    return value.strip().upper()
+
+
+def _add_pairs(seen: Dict[str, set], folders: np.ndarray, forms: np.ndarray) -> None:
+    """Fold one chunk of raw (text) FolderOID / FormOID values into `seen`, keeping folder order."""
+    if not len(folders):
+        return
+    fo = _map_unique(folders, _norm)
+    fm = _map_unique(forms, _norm)
+    keep = (fo != "") & (fm != "")
+    if not keep.any():
+        return
+    pairs = pd.DataFrame({"fo": fo[keep], "fm": fm[keep]}).drop_duplicates()
+    for folder, group in pairs.groupby("fo", sort=False)["fm"]:
+        seen.setdefault(folder, set()).update(group.tolist())
+
+
+def _finish(seen: Dict[str, set]) -> SSDMap:
+    return {k: sorted(v) for k, v in seen.items()}
+
+
+# ---------------------------------------------------------------------------
+# CSV
+# ---------------------------------------------------------------------------
+def _read_csv(source: Source) -> Tuple[SSDMap, int]:
+    header = pd.read_csv(_as_file(source), dtype=str, keep_default_na=False, nrows=0)
+    names = [str(c) for c in header.columns]
+    fo_idx, fm_idx = _pick_columns(names)
+    if fo_idx is None or fm_idx is None:
+        return {}, 0
+    fo_col, fm_col = names[fo_idx], names[fm_idx]
+    seen: Dict[str, set] = {}
+    n_rows = 0
+    reader = pd.read_csv(
+        _as_file(source), dtype=str, keep_default_na=False,
+        usecols=[fo_idx, fm_idx], chunksize=SSD_CHUNK_ROWS,
+    )
+    with reader:
+        for chunk in reader:
+            n_rows += len(chunk)
+            _add_pairs(seen, chunk[fo_col].to_numpy(dtype=object), chunk[fm_col].to_numpy(dtype=object))
+    return _finish(seen), n_rows
+
+
+# ---------------------------------------------------------------------------
+# XLSX
+# ---------------------------------------------------------------------------
+def _excel_text(value: Any) -> str:
+    # reader cells are already pandas' dtype=str text; error cells (NaN) count as blank
+    return value if isinstance(value, str) else ""
+
+
+def _read_xlsx(source: Source, reader: Optional[str] = None) -> Tuple[SSDMap, int]:
+    wb = open_workbook(source, reader)
+    try:
+        if not wb.sheet_names:
+            return {}, 0
+        rows = wb.iter_rows(wb.sheet_names[0])
+        header = next(rows, None)
+        if header is None:
+            return {}, 0
+        names: List[str] = []
+        for i, t in enumerate(_excel_text(v) for v in header):
+            # repeated headers get a ".N" suffix from pandas and so never match
+            names.append(f"{t}.dup{i}" if t in names else t)
+        fo_idx, fm_idx = _pick_columns(names)
+        if fo_idx is None or fm_idx is None:
+            return {}, 0
+
+        seen: Dict[str, set] = {}
+        folders: List[str] = []
+        forms: List[str] = []
+        n_rows = 0
+        for row in rows:
+            n_rows += 1
+            folders.append(_excel_text(row[fo_idx]) if fo_idx < len(row) else "")
+            forms.append(_excel_text(row[fm_idx]) if fm_idx < len(row) else "")
+            if len(folders) >= SSD_CHUNK_ROWS:
+                _add_pairs(seen, np.array(folders, dtype=object), np.array(forms, dtype=object))
+                folders, forms = [], []
+        _add_pairs(seen, np.array(folders, dtype=object), np.array(forms, dtype=object))
+        return _finish(seen), n_rows
+    finally:
+        wb.close()
+
+
+# ---------------------------------------------------------------------------
+# JSON
+# ---------------------------------------------------------------------------
+_JSON_READ = 1024 * 1024
+_WS = " \t\n\r"
+
+
+def _open_text(source: Source) -> TextIO:
+    if isinstance(source, (bytes, bytearray)):
+        return io.TextIOWrapper(io.BytesIO(bytes(source)), encoding="utf-8")
+    return open(source, "r", encoding="utf-8")
+
+
+def _iter_json_array(fh: TextIO, buf: str) -> Iterator[Any]:
+    """
+    Yield the elements of the top-level JSON array whose text starts in `buf` and
+    continues in `fh`, decoding one element at a time.
+    """
+    decoder = json.JSONDecoder()
+    pos = len(buf) - len(buf.lstrip(_WS)) + 1  # just past "["
+    eof = False
+
+    def refill() -> None:
+        nonlocal buf, pos, eof
+        more = fh.read(_JSON_READ)
+        eof = not more
+        buf, pos = buf[pos:] + more, 0
+
+    def next_token() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WS:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if eof:
+                raise json.JSONDecodeError("Unterminated array", buf, pos)
+            refill()
+
+    if next_token() == "]":
+        pos += 1
+    else:
+        while True:
+            # decode one element; a value that runs to the end of the buffer may be cut short
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                    if end < len(buf) or eof:
+                        break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                refill()
+            yield obj
+            pos = end
+            token = next_token()
+            pos += 1
+            if token == "]":
+                break
+            if token != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos - 1)
+            next_token()
+
+    rest = buf[pos:] + fh.read()
+    if rest.strip(_WS):
+        raise json.JSONDecodeError("Extra data", rest, len(rest) - len(rest.lstrip(_WS)))
+
+
+def _map_from_json_rows(rows: Iterator[Any]) -> Tuple[SSDMap, int]:
+    """
+    {FolderOID: [FormOID]} from an array of row objects. Column matching follows the
+    CSV/XLSX rules over all keys seen, so only candidate keys are kept per row.
+    Values are str() of the decoded JSON value; null, a missing key, 0, false and ""
+    all count as blank, and a row with a blank FolderOID or OID is skipped.
+    """
+    values: Dict[str, List[str]] = {}  # candidate key -> text per row ("" if absent)
+    n_rows = 0
+    for row in rows:
+        if isinstance(row, dict):
+            for k, v in row.items():
+                key = str(k)
+                if key.strip().lower() not in _CANDIDATES:
+                    continue
+                col = values.get(key)
+                if col is None:
+                    col = values[key] = [""] * n_rows
+                col.append(str(v or ""))
+        for col in values.values():
+            if len(col) == n_rows:
+                col.append("")
+        n_rows += 1
+
+    names = list(values)
+    fo_idx, fm_idx = _pick_columns(names)
+    if fo_idx is None or fm_idx is None:
+        return {}, n_rows
+    seen: Dict[str, set] = {}
+    _add_pairs(
+        seen,
+        np.array(values[names[fo_idx]], dtype=object),
+        np.array(values[names[fm_idx]], dtype=object),
+    )
+    return _finish(seen), n_rows
+
+
+def _read_json(source: Source) -> Tuple[SSDMap, int]:
+    with _open_text(source) as fh:
+        buf = fh.read(_JSON_READ)
+        if buf.lstrip(_WS).startswith("["):
+            return _map_from_json_rows(_iter_json_array(fh, buf))
+        obj = json.loads(buf + fh.read())
+    if isinstance(obj, dict):
+        out: SSDMap = {}
+        for k, v in obj.items():
+            if isinstance(v, list):
+                out[str(k)] = sorted({str(x).upper() for x in v})
+        return out, len(obj)
+    raise SSDFormatError("Unsupported JSON structure for SSD")
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+def _kind(filename: str) -> Optional[str]:
+    name = filename.lower()
+    if name.endswith(".json"):
+        return "json"
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith(".xlsx") or name.endswith(".xls"):
+        return "xlsx"
+    return None
+
+
+def read_ssd(
+    source: Source, filename: str, file_hash: Optional[str] = None, reader: Optional[str] = None
+) -> SSDMap:
+    """
+    Parse an SSD upload (bytes or a path on disk) into {FolderOID: sorted [FormOID]}.
+    The format is taken from the file extension; `reader` picks the workbook reader
+    backend for XLSX exports. Raises SSDFormatError.
+    """
+    kind = _kind(filename)
+    if kind is None:
+        raise SSDFormatError("Unsupported SSD file format; use JSON, CSV, or XLSX")
+    key = f"{file_hash or source_hash(source)}:{kind}"
+    with phase("ssd_parse", format=kind) as p:
+        result = ssd_cache.get(key)
+        p["cached"] = result is not None
+        if result is None:
+            result, p["rows"] = _read_ssd(source, kind, reader)
+            ssd_cache.put(key, result)
+        p["folders"] = len(result)
+        p["pairs"] = sum(len(v) for v in result.values())
+    return result
+
+
+def _read_ssd(source: Source, kind: str, reader: Optional[str] = None) -> Tuple[SSDMap, int]:
+    """(map, rows read) for one format, with read errors turned into SSDFormatError."""
+    if kind == "json":
+        try:
+            result = _read_json(source)
+        except SSDFormatError:
+            raise
+        except Exception as e:
+            raise SSDFormatError(f"Invalid JSON: {e}")
+    elif kind == "csv":
+        try:
+            result = _read_csv(source)
+        except Exception as e:
+            raise SSDFormatError(f"Invalid CSV: {e}")
+    else:
+        try:
+            result = _read_xlsx(source, reader)
+        except Exception as e:
+            raise SSDFormatError(f"Invalid Excel file: {e}")
+    return result
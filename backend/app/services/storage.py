@@ -0,0 +1,25 @@
+"""
+Private on-disk directories for the stores that default to the shared temp dir.
+
+The result and upload stores live under tempfile.gettempdir() unless configured, a
+directory any local user can create entries in. private_dir() creates theirs 0o700
+and refuses one that already exists but belongs to another user (or is a symlink),
+so nobody else can plant or read the files the API trusts.
+"""
+from __future__ import annotations
+import os
+import stat
+
+
+def private_dir(path: str) -> str:
+    """Create `path` (mode 0o700) or check an existing one; raises PermissionError if not ours."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        raise PermissionError(f"{path} is not a directory")
+    if hasattr(os, "getuid"):
+        if st.st_uid != os.getuid():
+            raise PermissionError(f"{path} belongs to another user")
+        if st.st_mode & 0o077:
+            os.chmod(path, 0o700)
+    return path
@@ -0,0 +1,106 @@
+"""
+Per-request phase timings.
+
+A PhaseTimer is bound to the current request (TimingMiddleware) through a context
+variable; parsing code wraps its steps in `with phase("matrix_read") as p:` and may
+attach counts (`p["rows"] = n`). Without an active timer, phase() only yields.
+
+Parses that run in the process pool record into a timer of their own in the
+worker (timed_call); run_parse() copies those records back into the request's timer.
+
+A timer may carry a listener (a progress channel, see services.progress) that is told
+about every completed phase as it happens, and about progress events that are not
+timed, sent with report() (rows read so far, diff chunks).
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import time
+
+# (phase name, duration in ms, attributes such as row counts)
+Record = Tuple[str, float, Dict[str, Any]]
+# listener(event type, data): "phase" events carry {name, ms, attrs}
+Listener = Callable[[str, Dict[str, Any]], None]
+
+_current: ContextVar[Optional["PhaseTimer"]] = ContextVar("phase_timer", default=None)
+
+
+class PhaseTimer:
+    def __init__(self, listener: Optional[Listener] = None) -> None:
+        self.records: List[Record] = []
+        self.listener = listener
+
+    def add(self, name: str, dur_ms: float, attrs: Optional[Dict[str, Any]] = None) -> None:
+        record = (name, dur_ms, dict(attrs or {}))
+        self.records.append(record)
+        if self.listener is not None:
+            self.listener("phase", {"name": name, "ms": round(dur_ms, 1), "attrs": record[2]})
+
+    def extend(self, records: List[Record]) -> None:
+        self.records.extend(records)
+
+    def server_timing(self, total_ms: Optional[float] = None) -> str:
+        """Server-Timing header value; attributes go into `desc`."""
+        parts = []
+        for name, dur, attrs in self.records:
+            entry = f"{name};dur={dur:.1f}"
+            if attrs:
+                desc = " ".join(f"{k}={v}" for k, v in attrs.items()).replace('"', "'")
+                entry += f';desc="{desc}"'
+            parts.append(entry)
+        if total_ms is not None:
+            parts.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(parts)
+
+
+def current_timer() -> Optional[PhaseTimer]:
+    return _current.get()
+
+
+def activate(timer: Optional[PhaseTimer]) -> Token:
+    return _current.set(timer)
+
+
+def deactivate(token: Token) -> None:
+    _current.reset(token)
+
+
+@contextmanager
+def phase(name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """Time the enclosed block as `name` on the active timer; yields its attribute dict."""
+    timer = _current.get()
+    if timer is None:
+        yield attrs
+        return
+    t0 = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        timer.add(name, (time.perf_counter() - t0) * 1000, attrs)
+
+
+def reporting() -> bool:
+    """Whether report() reaches a listener (skip building event data otherwise)."""
+    timer = _current.get()
+    return timer is not None and timer.listener is not None
+
+
+def report(event: str, **data: Any) -> None:
+    """Send a progress event that is not a timed phase to the active timer's listener."""
+    timer = _current.get()
+    if timer is not None and timer.listener is not None:
+        timer.listener(event, data)
+
+
+def timed_call(fn: Callable[..., Any], *args: Any, listener: Optional[Listener] = None) -> Tuple[Any, List[Record]]:
+    """
+    Run `fn(*args)` under a fresh timer (e.g. in a pool worker); returns (result, records).
+    `listener` must be picklable when this runs in another process.
+    """
+    timer = PhaseTimer(listener)
+    token = activate(timer)
+    try:
+        return fn(*args), timer.records
+    finally:
+        deactivate(token)
@@ -0,0 +1,199 @@
+"""
+Recently uploaded files, kept by content hash so clients can skip re-sending them.
+
+Every spooled upload is hard-linked (copied across filesystems) into UPLOAD_STORE_DIR
+as `<sha256>`; an SQLite index next to the files records the original file name, size
+and last use, and is shared by all API processes. Routes accept `als_hash` / `ssd_hash`
+in place of a file and check_out() a private link to the stored copy, so eviction
+never pulls a file from under a running parse.
+
+Files unused for UPLOAD_STORE_TTL_S are dropped (on the next upload or lookup, at most
+once a minute otherwise; an expired upload is never served), and the least recently
+used go once the directory exceeds UPLOAD_STORE_MAX_BYTES (0 disables the store).
+The directory is private to the API's user (0o700, files 0o600).
+"""
+from __future__ import annotations
+from typing import Any, Dict, Optional
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+from ..config import UPLOAD_SPOOL_DIR, UPLOAD_STORE_DIR, UPLOAD_STORE_MAX_BYTES, UPLOAD_STORE_TTL_S
+from .storage import private_dir
+
+log = logging.getLogger("als.uploads")
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+# lookups sweep out expired uploads at most this often (seconds)
+_SWEEP_INTERVAL_S = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    sha256     TEXT PRIMARY KEY,
+    file_name  TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    stored     REAL NOT NULL,
+    accessed   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS uploads_accessed ON uploads (accessed);
+"""
+
+
+def normalize_hash(value: str) -> Optional[str]:
+    """Lower-case hex SHA-256, or None if `value` is not one."""
+    value = value.strip().lower()
+    return value if _SHA256.match(value) else None
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """Make `dst` (which must not exist) the same content as `src`, readable by us only."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+    os.chmod(dst, 0o600)
+
+
+class UploadStore:
+    """Upload files named by SHA-256 in one directory, indexed in SQLite."""
+
+    def __init__(self, root: str, max_bytes: int = UPLOAD_STORE_MAX_BYTES, ttl_s: int = UPLOAD_STORE_TTL_S):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._local = threading.local()
+        self._swept = 0.0
+        private_dir(root)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.root, "uploads.sqlite"), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256)
+
+    def put(self, path: str, sha256: str, file_name: str, size: int) -> None:
+        """Keep the file at `path` (left in place) as upload `sha256`."""
+        now = time.time()
+        target = self._path(sha256)
+        if not os.path.exists(target):
+            tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+            _link_or_copy(path, tmp)
+            os.replace(tmp, target)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO uploads VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (sha256) DO UPDATE SET file_name = excluded.file_name, accessed = excluded.accessed",
+                (sha256, file_name, size, now, now),
+            )
+            self._expire(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def info(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Name, size and expiry of a held upload (and mark it used), or None."""
+        conn = self._conn()
+        now = time.time()
+        if now - self._swept > _SWEEP_INTERVAL_S:
+            self.sweep(now)
+        row = conn.execute("SELECT * FROM uploads WHERE sha256 = ?", (sha256,)).fetchone()
+        if row is None:
+            return None
+        if self.ttl_s > 0 and row["accessed"] < now - self.ttl_s:
+            self.sweep(now)  # expired since the last sweep
+            return None
+        if not os.path.exists(self._path(sha256)):
+            conn.execute("DELETE FROM uploads WHERE sha256 = ?", (sha256,))
+            return None
+        conn.execute("UPDATE uploads SET accessed = ? WHERE sha256 = ?", (now, sha256))
+        return {
+            "sha256": sha256,
+            "file_name": row["file_name"],
+            "size": row["size"],
+            "stored": row["stored"],
+            "expires": now + self.ttl_s if self.ttl_s > 0 else None,
+        }
+
+    def check_out(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """info() plus `path`: a private link to the stored file that the caller deletes."""
+        info = self.info(sha256)
+        if info is None:
+            return None
+        suffix = os.path.splitext(info["file_name"])[1].lower()
+        fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=UPLOAD_SPOOL_DIR)
+        os.close(fd)
+        os.unlink(path)
+        try:
+            _link_or_copy(self._path(sha256), path)
+        except FileNotFoundError:
+            return None  # evicted by another process just now
+        return {**info, "path": path}
+
+    def sweep(self, now: Optional[float] = None) -> None:
+        """Drop expired uploads (and the least recently used above the byte budget)."""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._expire(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _expire(self, conn: sqlite3.Connection, now: float) -> None:
+        self._swept = now
+        doomed = []
+        if self.ttl_s > 0:
+            doomed += [r["sha256"] for r in conn.execute(
+                "SELECT sha256 FROM uploads WHERE accessed < ?", (now - self.ttl_s,)
+            )]
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM uploads").fetchone()[0]
+        if total > self.max_bytes:
+            for r in conn.execute("SELECT sha256, size FROM uploads ORDER BY accessed").fetchall():
+                if total <= self.max_bytes:
+                    break
+                if r["sha256"] not in doomed:
+                    doomed.append(r["sha256"])
+                total -= r["size"]
+        for sha256 in doomed:
+            conn.execute("DELETE FROM uploads WHERE sha256 = ?", (sha256,))
+            try:
+                os.unlink(self._path(sha256))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM uploads").fetchone()
+        return {"entries": entries, "bytes": size, "maxBytes": self.max_bytes}
+
+
+_store: Optional[UploadStore] = None
+
+
+def get_store() -> Optional[UploadStore]:
+    """The shared store, opened on first use; None when disabled or unusable."""
+    global _store
+    if _store is None and UPLOAD_STORE_MAX_BYTES > 0:
+        try:
+            _store = UploadStore(UPLOAD_STORE_DIR)
+        except (OSError, sqlite3.Error) as e:
+            log.warning("Upload store disabled: %s", e)
+    return _store
@@ -0,0 +1,452 @@
+"""
+Workbook readers: sheets as string grids.
+
+The parsers only need each sheet as a grid of strings, exactly what
+pd.read_excel(..., engine="openpyxl", dtype=str, keep_default_na=False) returns.
+Two backends produce that:
+  - "fast":     streams the sheet XML part and the shared-strings table straight out
+                of the xlsx zip (no cell objects, no styles beyond date detection)
+  - "openpyxl": pd.read_excel through openpyxl, as before; the fallback for odd files
+
+open_workbook() picks the backend per call, defaulting to WORKBOOK_READER. The fast
+reader falls back to openpyxl for inputs that are not xlsx archives, and per sheet
+for sheets holding date cells (openpyxl's date conversion is not replicated).
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import io
+import logging
+import os
+import posixpath
+import warnings
+import zipfile
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+
+from ..config import READERS, WORKBOOK_READER, ReaderName  # noqa: F401  (re-exported)
+from .timing import report
+
+log = logging.getLogger("als.reader")
+
+# Workbook input: raw bytes or a path to a file on disk (spooled uploads are parsed by path)
+Source = Union[bytes, bytearray, str, os.PathLike]
+
+# Silence noisy but harmless openpyxl UserWarnings in some RAVE ALS files
+warnings.filterwarnings(
+    "ignore",
+    message=r"File contains an invalid specification for",
+    module=r"openpyxl\.reader\.workbook"
+)
+warnings.filterwarnings(
+    "ignore",
+    message=r"Defined names for sheet index .* cannot be located",
+    module=r"openpyxl\.reader\.workbook"
+)
+
+# the streaming reader reports progress (and lets a cancel through) every this many rows
+_REPORT_ROWS = 5000
+
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+
+def _as_file(source: Source) -> Any:
+    """What pd.ExcelFile / zipfile accept: the path itself, or an in-memory buffer for bytes."""
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def sheet_parts(zf: zipfile.ZipFile, worksheets_only: bool = False) -> Dict[str, str]:
+    """Sheet name -> part path inside the archive (e.g. 'xl/worksheets/sheet3.xml'), in workbook order."""
+    targets: Dict[str, Tuple[str, str]] = {}
+    with zf.open("xl/_rels/workbook.xml.rels") as fh:
+        for _, el in ElementTree.iterparse(fh):
+            if _local(el.tag) == "Relationship":
+                target = el.get("Target", "")
+                if target.startswith("/"):
+                    path = target.lstrip("/")
+                else:
+                    path = posixpath.normpath(posixpath.join("xl", target))
+                targets[el.get("Id", "")] = (path, el.get("Type", ""))
+    parts: Dict[str, str] = {}
+    for name, rid in _workbook_sheets(zf):
+        if rid not in targets:
+            continue
+        path, kind = targets[rid]
+        if worksheets_only and not kind.endswith("/worksheet"):
+            continue
+        parts[name] = path
+    return parts
+
+
+def _workbook_sheets(zf: zipfile.ZipFile) -> List[Tuple[str, str]]:
+    """(sheet name, relationship id) of each <sheet> in xl/workbook.xml, in workbook order."""
+    sheets: List[Tuple[str, str]] = []
+    with zf.open("xl/workbook.xml") as fh:
+        for _, el in ElementTree.iterparse(fh):
+            tag = _local(el.tag)
+            if tag == "sheet":
+                sheets.append((el.get("name", ""), el.get(_REL_NS + "id") or el.get("id") or ""))
+            elif tag == "sheets":
+                break  # nothing we need after the <sheets> block
+    return sheets
+
+
+def read_sheet_names(source: Source) -> Optional[List[str]]:
+    """
+    Worksheet names read straight from xl/workbook.xml inside the xlsx zip,
+    without building the workbook; chartsheets are left out, as the readers'
+    sheet_names do. Returns None if the input is not an xlsx.
+    """
+    try:
+        with zipfile.ZipFile(_as_file(source)) as zf:
+            return list(sheet_parts(zf, worksheets_only=True))
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+        return None
+
+
+def _text_content(el: ElementTree.Element) -> str:
+    """Plain text of an <si> / <is> element: its <t> plus the <t> of each rich-text run (no phonetics)."""
+    snippets = []
+    for child in el:
+        tag = _local(child.tag)
+        if tag == "t":
+            snippets.append(child.text or "")
+        elif tag == "r":
+            for t in child:
+                if _local(t.tag) == "t":
+                    snippets.append(t.text or "")
+    return "".join(snippets)
+
+
+def shared_strings(zf: zipfile.ZipFile) -> List[str]:
+    """The shared-strings table, with the same text openpyxl reads."""
+    try:
+        fh = zf.open("xl/sharedStrings.xml")
+    except KeyError:
+        return []
+    out: List[str] = []
+    with fh:
+        for _, el in ElementTree.iterparse(fh):
+            if _local(el.tag) == "si":
+                out.append(_text_content(el).replace("x005F_", ""))
+                el.clear()
+    return out
+
+
+def header_names(values: List[Any]) -> List[Any]:
+    """
+    Column labels pandas gives a header row: blank cells become 'Unnamed: i' and
+    duplicates are mangled to 'X.1', 'X.2', ...
+    """
+    cols: List[Any] = []
+    unnamed: List[int] = []
+    for i, c in enumerate(values):
+        if c == "":
+            cols.append(f"Unnamed: {i}")
+            unnamed.append(i)
+        else:
+            cols.append(c)
+
+    # same mangling order as pandas' python parser: named columns first, then unnamed
+    counts: Dict[Any, int] = {}
+    unnamed_set = set(unnamed)
+    for i in [i for i in range(len(cols)) if i not in unnamed_set] + unnamed:
+        col = old_col = cols[i]
+        cur = counts.get(col, 0)
+        while cur > 0:
+            counts[old_col] = cur + 1
+            col = f"{old_col}.{cur}"
+            cur = cur + 1 if col in cols else counts.get(col, 0)
+        cols[i] = col
+        counts[col] = cur + 1
+    return cols
+
+
+def promote_header(df_raw: pd.DataFrame, header_row_idx: int) -> pd.DataFrame:
+    """
+    Turn row `header_row_idx` of a header=None frame into the column header,
+    naming columns exactly as pd.read_excel(header=header_row_idx) would.
+    """
+    if len(df_raw) == 0:
+        return df_raw
+    body = df_raw.iloc[header_row_idx + 1:].reset_index(drop=True)
+    body.columns = header_names(df_raw.iloc[header_row_idx].tolist())
+    return body
+
+
+def _cell_text(value: Any) -> Any:
+    """pandas' dtype=str conversion of one converted cell value (NaN stays NaN)."""
+    if isinstance(value, str) or value is np.nan:
+        return value
+    return str(value)
+
+
+class OpenpyxlReader:
+    """pd.read_excel through openpyxl (read-only, cached values)."""
+
+    name = "openpyxl"
+
+    def __init__(self, source: Source):
+        self._xl = pd.ExcelFile(_as_file(source), engine="openpyxl")
+        self.sheet_names: List[str] = list(self._xl.sheet_names)
+
+    def read_grid(self, sheet: str) -> pd.DataFrame:
+        """The sheet without a header row: pd.read_excel(header=None, dtype=str)."""
+        return pd.read_excel(self._xl, sheet, header=None, engine="openpyxl", dtype=str, keep_default_na=False)
+
+    def read_table(self, sheet: str) -> pd.DataFrame:
+        """The sheet with its first row as header: pd.read_excel(dtype=str)."""
+        return pd.read_excel(self._xl, sheet, engine="openpyxl", dtype=str, keep_default_na=False)
+
+    def iter_rows(self, sheet: str) -> Iterator[List[Any]]:
+        """Rows as lists of cell texts ("" for empty cells, NaN for error cells)."""
+        for row in self._xl.book[sheet].iter_rows():
+            yield [_cell_text(self._convert(cell)) for cell in row]
+
+    @staticmethod
+    def _convert(cell: Any) -> Any:
+        # mirrors pandas' openpyxl reader (_convert_cell)
+        if cell.value is None:
+            return ""
+        if cell.data_type == "e":
+            return np.nan
+        if cell.data_type == "n":
+            val = int(cell.value)
+            return val if val == cell.value else float(cell.value)
+        return cell.value
+
+    def close(self) -> None:
+        self._xl.close()
+
+
+class _NeedsOpenpyxl(Exception):
+    """The sheet holds something the fast reader does not convert (dates)."""
+
+
+class StreamingXlsxReader:
+    """
+    Reads sheet XML parts and the shared-strings table straight from the xlsx zip.
+    Grids match OpenpyxlReader's; a sheet holding date cells is read through
+    openpyxl instead.
+    """
+
+    name = "fast"
+
+    def __init__(self, source: Source):
+        self._source = source
+        self._zf = zipfile.ZipFile(_as_file(source))
+        try:
+            self._parts = sheet_parts(self._zf, worksheets_only=True)
+        except BaseException:
+            self._zf.close()
+            raise
+        self.sheet_names: List[str] = list(self._parts)
+        self._strings: Optional[List[str]] = None
+        self._date_styles: Optional[set] = None
+        self._fallback: Optional[OpenpyxlReader] = None
+
+    # -- workbook-level tables, read on first use --
+    def _shared(self) -> List[str]:
+        if self._strings is None:
+            self._strings = shared_strings(self._zf)
+        return self._strings
+
+    def _dates(self) -> set:
+        """Indices of cell formats (the `s` attribute) whose number format is a date/time."""
+        if self._date_styles is None:
+            from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+
+            custom: Dict[int, str] = {}
+            xf_formats: List[int] = []
+            try:
+                with self._zf.open("xl/styles.xml") as fh:
+                    in_xfs = False
+                    for event, el in ElementTree.iterparse(fh, events=("start", "end")):
+                        tag = _local(el.tag)
+                        if tag == "cellXfs":
+                            in_xfs = event == "start"
+                        elif event == "end" and tag == "numFmt":
+                            custom[int(el.get("numFmtId", "0"))] = el.get("formatCode", "")
+                        elif event == "end" and tag == "xf" and in_xfs:
+                            xf_formats.append(int(el.get("numFmtId", "0")))
+            except KeyError:
+                pass
+            self._date_styles = {
+                i for i, fid in enumerate(xf_formats)
+                if is_date_format(custom.get(fid) or BUILTIN_FORMATS.get(fid) or "")
+            }
+        return self._date_styles
+
+    def _openpyxl(self) -> OpenpyxlReader:
+        if self._fallback is None:
+            self._fallback = OpenpyxlReader(self._source)
+        return self._fallback
+
+    # -- cells --
+    def _raw_rows(self, sheet: str) -> Iterator[List[Any]]:
+        """
+        Rows as openpyxl (read-only, no dimensions) + pandas' _convert_cell produce them:
+        from row 1, missing rows as [], each row up to its last cell, blanks as "".
+        """
+        strings = self._shared()
+        dates = self._dates()
+        counter = 1
+        row_no = 0
+        with self._zf.open(self._parts[sheet]) as fh:
+            for _, el in ElementTree.iterparse(fh):
+                if _local(el.tag) != "row":
+                    continue
+                r = el.get("r")
+                row_no = int(float(r)) if r else row_no + 1
+                values: Dict[int, Any] = {}
+                col = 0
+                for c in el:
+                    if _local(c.tag) != "c":
+                        continue
+                    ref = c.get("r")
+                    col = _column_index(ref) if ref else col + 1
+                    values[col] = self._value(c, strings, dates)
+                el.clear()
+
+                while counter < row_no:
+                    counter += 1
+                    yield []
+                if counter > row_no:
+                    continue  # out-of-order row; openpyxl drops it too
+                counter += 1
+                if not values:
+                    yield []
+                    continue
+                row = [""] * max(values)
+                for i, v in values.items():
+                    row[i - 1] = v
+                yield row
+
+    @staticmethod
+    def _value(c: ElementTree.Element, strings: List[str], dates: set) -> Any:
+        kind = c.get("t") or "n"
+        if kind == "inlineStr":
+            for child in c:
+                if _local(child.tag) == "is":
+                    return _text_content(child)
+            return ""
+        text = None
+        for child in c:
+            if _local(child.tag) == "v":
+                text = child.text
+                break
+        if not text:
+            return ""
+        if kind == "n":
+            style = c.get("s")
+            if style and int(style) in dates:
+                raise _NeedsOpenpyxl()
+            if "." in text or "E" in text or "e" in text:
+                num = float(text)
+                return int(num) if num.is_integer() else num
+            return int(text)
+        if kind == "s":
+            return strings[int(text)]
+        if kind == "b":
+            return bool(int(text))
+        if kind == "e":
+            return np.nan
+        if kind == "d":
+            raise _NeedsOpenpyxl()
+        return text  # "str": cached formula result
+
+    def _grid_rows(self, sheet: str) -> List[List[Any]]:
+        """All rows, trimmed and padded the way pandas' openpyxl reader does."""
+        data: List[List[Any]] = []
+        last_with_data = -1
+        for i, row in enumerate(self._raw_rows(sheet)):
+            while row and row[-1] == "":
+                row.pop()
+            if row:
+                last_with_data = i
+            data.append(row)
+            if i % _REPORT_ROWS == 0 and i:
+                report("rows", sheet=sheet, rows=i)
+        data = data[: last_with_data + 1]
+        if data:
+            width = max(len(r) for r in data)
+            data = [r + [""] * (width - len(r)) for r in data]
+        return data
+
+    def read_grid(self, sheet: str) -> pd.DataFrame:
+        try:
+            data = self._grid_rows(sheet)
+        except _NeedsOpenpyxl:
+            log.debug("Sheet %r has date cells; reading it through openpyxl", sheet)
+            return self._openpyxl().read_grid(sheet)
+        if not data:
+            return pd.DataFrame()
+        return pd.DataFrame(data, dtype=str)
+
+    def read_table(self, sheet: str) -> pd.DataFrame:
+        try:
+            data = self._grid_rows(sheet)
+        except _NeedsOpenpyxl:
+            log.debug("Sheet %r has date cells; reading it through openpyxl", sheet)
+            return self._openpyxl().read_table(sheet)
+        if not data:
+            return pd.DataFrame()
+        columns = header_names(list(data[0]))
+        if len(data) == 1:
+            return pd.DataFrame(columns=columns, dtype=str)
+        return pd.DataFrame(data[1:], columns=columns, dtype=str)
+
+    def iter_rows(self, sheet: str) -> Iterator[List[Any]]:
+        done = 0
+        try:
+            for row in self._raw_rows(sheet):
+                yield [_cell_text(v) for v in row]
+                done += 1
+        except _NeedsOpenpyxl:
+            # rows up to here are identical in both readers; continue through openpyxl
+            log.debug("Sheet %r has date cells; reading it through openpyxl", sheet)
+            for i, row in enumerate(self._openpyxl().iter_rows(sheet)):
+                if i >= done:
+                    yield row
+
+    def close(self) -> None:
+        self._zf.close()
+        if self._fallback is not None:
+            self._fallback.close()
+
+
+WorkbookReader = Union[StreamingXlsxReader, OpenpyxlReader]
+
+
+def _column_index(ref: str) -> int:
+    """1-based column of an A1 reference ('C12' -> 3)."""
+    n = 0
+    for ch in ref:
+        if "A" <= ch <= "Z":
+            n = n * 26 + ord(ch) - 64
+        elif "a" <= ch <= "z":
+            n = n * 26 + ord(ch) - 96
+        else:
+            break
+    return n
+
+
+def open_workbook(source: Source, reader: Optional[str] = None) -> WorkbookReader:
+    """
+    Open `source` with the named backend ("fast" or "openpyxl"; default WORKBOOK_READER).
+    The fast backend falls back to openpyxl when the input is not a readable xlsx zip.
+    """
+    name = (reader or WORKBOOK_READER).lower()
+    if name not in READERS:
+        raise ValueError(f"Unknown workbook reader {name!r}; use one of {', '.join(READERS)}")
+    if name == "fast":
+        try:
+            return StreamingXlsxReader(source)
+        except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+            log.debug("Fast reader cannot open workbook (%s); using openpyxl", e)
+    return OpenpyxlReader(source)
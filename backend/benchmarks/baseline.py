@@ -0,0 +1,265 @@
+"""
+The matrix and SSD parsers as they were before the rewrites, kept as a reference.
+
+Each matrix sheet goes through pd.read_excel (openpyxl) twice, once headerless to
+find the header row and once with it, and the pairs are collected with iterrows.
+tests/test_parity.py checks extract_matrix against extract_matrix_baseline() and
+bench_parse times pairs_iterrows() next to the vectorised pair extraction.
+
+SSD exports were loaded whole into a DataFrame (pd.DataFrame for JSON rows) and
+walked with iterrows; tests/test_ssd_reader.py checks read_ssd against
+ssd_map_baseline().
+
+The SSD diff and the per-matrix form changes of the ALS version diff were per-folder
+Python sets; tests/test_incidence.py checks the Incidence versions against
+ssd_diff_baseline() and form_changes_baseline().
+
+Usage (from backend/):
+    from benchmarks.baseline import extract_matrix_baseline, ssd_map_baseline
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import re
+
+import pandas as pd
+
+from app.services.als_matrix import _choose_from, _matrix_sheets_from_names, _resolve_matrix_oid_from_sheet
+
+
+def _find_sheet_fuzzy(xl: pd.ExcelFile, name: str) -> str:
+    for s in xl.sheet_names:
+        if s.strip().lower() == name.strip().lower():
+            return s
+    for s in xl.sheet_names:
+        if name.strip().lower() in s.strip().lower():
+            return s
+    raise ValueError(f"Required sheet '{name}' not found in ALS. Available: {xl.sheet_names}")
+
+
+def _get_col(df: pd.DataFrame, options: List[str]) -> Optional[str]:
+    lowmap = {str(c).strip().lower(): str(c) for c in df.columns}
+    for opt in options:
+        if opt.strip().lower() in lowmap:
+            return lowmap[opt.strip().lower()]
+    return None
+
+
+def _first_header_row(df_raw: pd.DataFrame, probe_rows: int = 30) -> int:
+    header_tokens = {
+        "formoid", "form oid", "formname", "form name", "draftformname", "draft form name",
+        "folderoid", "folder oid", "foldername", "folder name"
+    }
+    n = min(probe_rows, len(df_raw))
+    for i in range(n):
+        row_vals = list(df_raw.iloc[i].values)
+        if all((str(x).strip() == "" or pd.isna(x)) for x in row_vals):
+            continue
+        row_strs = [str(x).strip().lower() for x in row_vals]
+        if any(tok in row_strs for tok in header_tokens):
+            return i
+    for i in range(n):
+        row_vals = list(df_raw.iloc[i].values)
+        if not all((str(x).strip() == "" or pd.isna(x)) for x in row_vals):
+            return i
+    return 0
+
+
+def read_meta(xl: pd.ExcelFile, folder_sheet: str, form_sheet: str) -> Tuple[Dict[str, Optional[str]], Dict[str, Optional[str]]]:
+    """{FolderOID: FolderName} and {FormOID: DraftFormName}, row by row."""
+    df_folder_raw = pd.read_excel(
+        xl, _find_sheet_fuzzy(xl, folder_sheet), engine="openpyxl", dtype=str, keep_default_na=False
+    )
+    df_form_raw = pd.read_excel(
+        xl, _find_sheet_fuzzy(xl, form_sheet), engine="openpyxl", dtype=str, keep_default_na=False
+    )
+
+    folderOID_col = _get_col(df_folder_raw, ["FolderOID", "Folder OID", "OID"])
+    folderName_col = _get_col(df_folder_raw, ["FolderName", "Folder Name", "Name"])
+    folder_meta: Dict[str, Optional[str]] = {}
+    if folderOID_col:
+        for _, r in df_folder_raw.iterrows():
+            oid = (r.get(folderOID_col) or "").strip()
+            if not oid:
+                continue
+            folder_meta[oid] = ((r.get(folderName_col) or "").strip() if folderName_col else None)
+
+    formOID_col = _get_col(df_form_raw, ["FormOID", "Form OID", "OID"])
+    formName_col = _get_col(df_form_raw, ["DraftFormName", "Draft Form Name", "FormName", "Form Name", "Name"])
+    form_meta: Dict[str, Optional[str]] = {}
+    if formOID_col:
+        for _, r in df_form_raw.iterrows():
+            oid = (r.get(formOID_col) or "").strip()
+            if not oid:
+                continue
+            form_meta[oid] = ((r.get(formName_col) or "").strip() if formName_col else None)
+    return folder_meta, form_meta
+
+
+def read_matrix_sheet(xl: pd.ExcelFile, matrix_ws: str) -> pd.DataFrame:
+    """The matrix sheet as a table: headerless read, header row detection, second read."""
+    df_matrix_raw = pd.read_excel(xl, matrix_ws, header=None, engine="openpyxl", dtype=str, keep_default_na=False)
+    header_row_idx = _first_header_row(df_matrix_raw, probe_rows=40)
+    df_matrix = pd.read_excel(
+        xl, matrix_ws, header=header_row_idx, engine="openpyxl", dtype=str, keep_default_na=False
+    )
+    df_matrix.columns = [str(c).strip() for c in df_matrix.columns]
+    return df_matrix.dropna(how="all").dropna(axis=1, how="all")
+
+
+def pairs_iterrows(df_matrix: pd.DataFrame) -> List[Tuple[str, str]]:
+    """(FolderOID, FormOID) pairs of a matrix table (long or crosstab layout), row by row."""
+    m_form_oid_col = _get_col(df_matrix, ["FormOID", "Form OID", "FORM OID", "Form", "Form Oid"])
+    m_form_name_col = _get_col(df_matrix, ["DraftFormName", "Draft Form Name", "FormName", "Form Name", "FORM NAME", "Name"])
+    m_folder_oid_col = _get_col(df_matrix, ["FolderOID", "Folder OID", "FOLDER OID", "Folder", "Folder Oid"])
+
+    matrix_pairs: List[Tuple[str, str]] = []
+    if m_folder_oid_col and m_form_oid_col:
+        for _, r in df_matrix.iterrows():
+            foid = (r.get(m_folder_oid_col) or "").strip()
+            frmid = (r.get(m_form_oid_col) or "").strip()
+            if foid and frmid:
+                matrix_pairs.append((foid, frmid))
+        return matrix_pairs
+
+    id_cols = [c for c in [m_form_oid_col, m_form_name_col] if c] or [df_matrix.columns[0]]
+    folder_cols = [c for c in df_matrix.columns if c not in id_cols]
+
+    def is_marked(val: Any) -> bool:
+        s = (val or "").strip().lower()
+        return s in {"x", "1", "yes", "y", "true"}
+
+    def ensure_form_oid(row: pd.Series) -> str:
+        if m_form_oid_col:
+            cand = (row.get(m_form_oid_col) or "").strip()
+            if cand:
+                return cand
+        base = (row.get(m_form_name_col or id_cols[0]) or "").strip()
+        token = re.sub(r"[^A-Za-z0-9_]+", "_", base).strip("_").upper()
+        return token or "FORM_UNKNOWN"
+
+    for _, r in df_matrix.iterrows():
+        frmid = ensure_form_oid(r)
+        for fc in folder_cols:
+            if is_marked(r.get(fc)):
+                matrix_pairs.append((re.sub(r"\s+", "", str(fc).strip()), frmid))
+    return matrix_pairs
+
+
+def extract_matrix_baseline(
+    path: str,
+    matrix_oid: Optional[str] = None,
+    folder_sheet: str = "Folder",
+    form_sheet: str = "Form",
+) -> Dict[str, Any]:
+    """extract_matrix() as it was: same result shape, no cache, no SSD diff."""
+    xl = pd.ExcelFile(path, engine="openpyxl")
+    available = _matrix_sheets_from_names(xl.sheet_names)
+    matrix_ws = _choose_from(available, matrix_oid)
+    folder_meta, form_meta = read_meta(xl, folder_sheet, form_sheet)
+    matrix_pairs = pairs_iterrows(read_matrix_sheet(xl, matrix_ws))
+
+    by_folder: Dict[str, Dict[str, Any]] = {}
+    for foid, frmid in matrix_pairs:
+        if not foid or not frmid:
+            continue
+        if foid not in by_folder:
+            by_folder[foid] = {"folderOID": foid, "folderName": folder_meta.get(foid), "forms": []}
+        if not any(f.get("formOID") == frmid for f in by_folder[foid]["forms"]):
+            by_folder[foid]["forms"].append({"formOID": frmid, "formName": form_meta.get(frmid)})
+
+    folders_sorted = sorted(by_folder.values(), key=lambda x: x["folderOID"])
+    for f in folders_sorted:
+        f["forms"] = sorted(f["forms"], key=lambda x: x["formOID"])
+    return {
+        "meta": {
+            "matrixOID": _resolve_matrix_oid_from_sheet(matrix_ws),
+            "sheet": matrix_ws,
+            "availableMatrices": [dict(m) for m in available],
+        },
+        "folders": folders_sorted,
+    }
+
+
+def _ssd_map_from_rows(df: pd.DataFrame) -> Dict[str, List[str]]:
+    cols = {str(c).strip().lower(): str(c) for c in df.columns}
+
+    def pick(options: List[str]) -> Optional[str]:
+        for opt in options:
+            k = opt.strip().lower()
+            if k in cols:
+                return cols[k]
+        return None
+
+    fo_col = pick(["FolderOID", "Folder OID"])
+    fm_col = pick(["OID", "FormOID", "Form OID"])
+    if not fo_col or not fm_col:
+        return {}
+    seen: Dict[str, set] = {}
+    for _, r in df.iterrows():
+        fo = str(r.get(fo_col) or "").strip()
+        fm = str(r.get(fm_col) or "").strip()
+        if not fo or not fm:
+            continue
+        seen.setdefault(fo.upper(), set()).add(fm.upper())
+    return {k: sorted(v) for k, v in seen.items()}
+
+
+def ssd_map_baseline(path: str, filename: str) -> Dict[str, List[str]]:
+    """read_ssd() as it was (routes_ssd._parse_ssd_upload): no cache, ValueError on bad input."""
+    name = filename.lower()
+    if name.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as fh:
+            obj = json.load(fh)
+        if isinstance(obj, dict):
+            return {str(k): sorted({str(x).upper() for x in v}) for k, v in obj.items() if isinstance(v, list)}
+        if isinstance(obj, list):
+            return _ssd_map_from_rows(pd.DataFrame(obj))
+        raise ValueError("Unsupported JSON structure for SSD")
+    if name.endswith(".csv"):
+        return _ssd_map_from_rows(pd.read_csv(path, dtype=str, keep_default_na=False))
+    if name.endswith(".xlsx") or name.endswith(".xls"):
+        return _ssd_map_from_rows(pd.read_excel(path, engine="openpyxl", dtype=str, keep_default_na=False))
+    raise ValueError("Unsupported SSD file format; use JSON, CSV, or XLSX")
+
+
+def ssd_diff_baseline(folders_sorted: List[Dict[str, Any]], ssd_matrix: Dict[str, List[str]]) -> Dict[str, Any]:
+    """The SSD diff of extract_matrix() as it was: upper-cased per-folder form sets."""
+    als_map_raw = {f["folderOID"]: [x["formOID"] for x in f["forms"]] for f in folders_sorted}
+    als_map_norm: Dict[str, set] = {fo: {str(frm).upper() for frm in frms} for fo, frms in als_map_raw.items()}
+    ssd_norm: Dict[str, set] = {fo: {str(frm).upper() for frm in frms} for fo, frms in ssd_matrix.items()}
+    missing_in_db: Dict[str, List[str]] = {}
+    extra_in_db: Dict[str, List[str]] = {}
+    for foid, ssd_forms in ssd_norm.items():
+        miss = sorted(frm for frm in ssd_forms if frm not in als_map_norm.get(foid, set()))
+        if miss:
+            missing_in_db[foid] = miss
+    for foid, als_forms in als_map_norm.items():
+        extra = sorted(frm for frm in als_forms if frm not in ssd_norm.get(foid, set()))
+        if extra:
+            extra_in_db[foid] = extra
+    return {"missing_in_db": missing_in_db, "extra_in_db": extra_in_db}
+
+
+def form_changes_baseline(
+    before_pairs: List[Tuple[str, str]], after_pairs: List[Tuple[str, str]]
+) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+    """(formsAdded, formsRemoved) of one matrix in the ALS version diff, as it was."""
+    def pair_sets(pairs: List[Tuple[str, str]]) -> Dict[str, set]:
+        out: Dict[str, set] = {}
+        for foid, frmid in pairs:
+            if foid and frmid:
+                out.setdefault(foid, set()).add(frmid)
+        return out
+
+    before, after = pair_sets(before_pairs), pair_sets(after_pairs)
+    added: Dict[str, List[str]] = {}
+    removed: Dict[str, List[str]] = {}
+    for foid in sorted(set(before) | set(after)):
+        plus = sorted(after.get(foid, set()) - before.get(foid, set()))
+        minus = sorted(before.get(foid, set()) - after.get(foid, set()))
+        if plus:
+            added[foid] = plus
+        if minus:
+            removed[foid] = minus
+    return added, removed
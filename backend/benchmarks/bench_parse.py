@@ -0,0 +1,152 @@
+"""
+Per-phase parse benchmarks on synthetic ALS workbooks and SSD exports.
+
+Each phase is timed `--repeat` times (min and median reported) and run once more
+under tracemalloc for its peak memory:
+  read_sheet_names, read_ssd_json / _csv, pairs_iterrows / pairs_vectorised (the
+  pre-rewrite row-by-row pair loop next to the current one, on the same table),
+  extract_matrix_baseline, and per workbook reader backend:
+  open_workbook, discover_matrix_sheets, read_meta, read_matrix_sheet,
+  first_header_row, extract_pairs, build_matrix_result,
+  extract_matrix_cold / extract_matrix_warm, read_ssd_xlsx
+
+Usage (from backend/):
+    python -m benchmarks.bench_parse --size medium --out bench.json
+    python -m benchmarks.bench_parse --size medium --baseline bench.json
+    python -m benchmarks.bench_parse --size large --reader fast
+    python -m benchmarks.bench_parse --size wide --layout crosstab
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List
+import argparse
+import gc
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+# "cold" phases measure parsing, not lookups in the persistent result store
+os.environ["RESULT_STORE_MAX_BYTES"] = "0"
+
+from app.services import als_matrix
+from app.services.parse_cache import ParsedWorkbook, ssd_cache, workbook_cache
+from app.services.ssd_reader import read_ssd
+from app.services.workbook_reader import READERS, open_workbook
+
+from . import baseline
+from .report import print_table, report_against, run_meta, write_results
+from .synthetic_als import LAYOUTS, SIZES, SSD_FORMATS, generate_set
+
+
+def measure(fn: Callable[[], Any], repeat: int, setup: Callable[[], None] = lambda: None) -> Dict[str, float]:
+    """min / median wall time of `fn` in ms, and its peak traced allocation in KiB."""
+    times: List[float] = []
+    for _ in range(repeat):
+        setup()
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def bench_layout(workdir: str, size: str, layout: str, readers: List[str], repeat: int) -> Dict[str, Dict[str, float]]:
+    spec, ssd_paths = generate_set(workdir, size, layout)
+    path = spec.path
+    with open(path, "rb") as fh:
+        content = fh.read()
+    sheet = "MASTERDASHBOARD"
+    ssd_map = read_ssd(ssd_paths["json"], "ssd.json")
+
+    phases: Dict[str, Dict[str, float]] = {}
+
+    def run(name: str, fn: Callable[[], Any], setup: Callable[[], None] = lambda: None) -> None:
+        phases[f"{size}/{layout}/{name}"] = measure(fn, repeat, setup)
+
+    run("read_sheet_names", lambda: als_matrix.read_sheet_names(path))
+    for fmt in SSD_FORMATS:
+        if fmt != "xlsx":
+            run(f"read_ssd_{fmt}", lambda fmt=fmt: read_ssd(ssd_paths[fmt], f"ssd.{fmt}"), setup=ssd_cache.clear)
+
+    table = baseline.read_matrix_sheet(pd.ExcelFile(path, engine="openpyxl"), sheet)
+    if baseline.pairs_iterrows(table) != als_matrix._pairs_from_matrix(table):
+        raise AssertionError(f"{size}/{layout}: vectorised pairs differ from the iterrows baseline")
+    run("pairs_iterrows", lambda: baseline.pairs_iterrows(table))
+    run("pairs_vectorised", lambda: als_matrix._pairs_from_matrix(table))
+    run("extract_matrix_baseline", lambda: baseline.extract_matrix_baseline(path, sheet))
+
+    for reader in readers:
+        xl = open_workbook(path, reader)
+        raw = xl.read_grid(sheet)
+        entry = ParsedWorkbook(sheet_names=list(xl.sheet_names), available=als_matrix.discover_matrix_sheets(xl))
+        als_matrix.fill_parsed(path, entry, sheet, reader=reader)
+
+        def run_r(name: str, fn: Callable[[], Any], setup: Callable[[], None] = lambda: None) -> None:
+            run(f"{reader}/{name}", fn, setup)
+
+        run_r("open_workbook", lambda: open_workbook(path, reader).close())
+        run_r("discover_matrix_sheets", lambda: als_matrix.discover_matrix_sheets(xl))
+        run_r("read_meta", lambda: als_matrix._read_meta(xl, "Folder", "Form"))
+        run_r("read_matrix_sheet", lambda: xl.read_grid(sheet))
+        run_r("first_header_row", lambda: als_matrix._first_header_row(raw, probe_rows=40))
+        run_r("extract_pairs", lambda: als_matrix._extract_pairs(xl, sheet))
+        run_r("build_matrix_result", lambda: als_matrix.build_matrix_result(entry, sheet, ssd_matrix=ssd_map))
+        run_r("extract_matrix_cold", lambda: als_matrix.extract_matrix(content, sheet, ssd_matrix=ssd_map, reader=reader),
+              setup=workbook_cache.clear)
+        als_matrix.extract_matrix(content, sheet, ssd_matrix=ssd_map, reader=reader)
+        run_r("extract_matrix_warm", lambda: als_matrix.extract_matrix(content, sheet, ssd_matrix=ssd_map, reader=reader))
+        run_r("read_ssd_xlsx", lambda: read_ssd(ssd_paths["xlsx"], "ssd.xlsx", reader=reader), setup=ssd_cache.clear)
+        xl.close()
+    return phases
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--size", choices=sorted(SIZES), action="append",
+                    help="workbook size (repeatable; default: small and medium)")
+    ap.add_argument("--layout", choices=LAYOUTS, action="append", help="matrix layout (repeatable; default: both)")
+    ap.add_argument("--reader", choices=READERS, action="append",
+                    help="workbook reader backend (repeatable; default: all)")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--out", help="write results JSON here (e.g. to save a new baseline)")
+    ap.add_argument("--baseline", help="compare against this results JSON")
+    ap.add_argument("--threshold", type=float, default=1.25, help="ratio above which a metric counts as slower")
+    ap.add_argument("--fail-on-regression", action="store_true", help="exit 1 if any metric exceeds --threshold")
+    args = ap.parse_args()
+    sizes = args.size or ["small", "medium"]
+    layouts = args.layout or list(LAYOUTS)
+    readers = args.reader or list(READERS)
+
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory(prefix="als-bench-") as workdir:
+        for size in sizes:
+            for layout in layouts:
+                results.update(bench_layout(workdir, size, layout, readers, args.repeat))
+
+    print_table(results, ["min_ms", "median_ms", "peak_kib"])
+    if args.out:
+        write_results(args.out, run_meta(
+            benchmark="parse", sizes=sizes, layouts=layouts, readers=readers, repeat=args.repeat,
+        ), results)
+    regressions = report_against(results, args.baseline, args.threshold)
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Cold-start benchmark: how fast a fresh API process imports and starts answering.
+
+  - import_app: `import app.main` in a fresh interpreter (`--repeat` times), and which
+    heavy modules (pandas, numpy, openpyxl, the parse modules) that pulled in; none
+    should be, they load on the first parse
+  - serve/warmup=0 and serve/warmup=1: uvicorn started with ALS_WARMUP off / on;
+    ready_ms is process start to the first /als/ping answer, first_ms the first
+    POST /als/matrix `--idle-s` seconds later (the persistent result store is disabled,
+    so it parses)
+
+Exits 1 when the import_app median exceeds `--budget-ms` or a heavy module is imported
+at startup.
+
+Usage (from backend/; needs uvicorn and httpx):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget-ms 800 --idle-s 10 --out startup.json
+    python -m benchmarks.bench_startup --baseline startup.json
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .load_test import BACKEND_DIR, _free_port, start_server, wait_ready
+from .report import print_table, report_against, run_meta, write_results
+from .synthetic_als import generate_set
+
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "app.services.als_matrix", "app.services.ssd_reader")
+
+_IMPORT_PROBE = (
+    "import json, sys, time\n"
+    "t0 = time.perf_counter()\n"
+    "import app.main\n"
+    "ms = (time.perf_counter() - t0) * 1000\n"
+    "print(json.dumps({'ms': ms, 'heavy': [m for m in %r if m in sys.modules]}))\n"
+) % (HEAVY_MODULES,)
+
+
+def bench_import(repeat: int) -> Dict[str, Any]:
+    times: List[float] = []
+    heavy: List[str] = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout
+        probe = json.loads(out.strip().splitlines()[-1])
+        times.append(probe["ms"])
+        heavy = sorted(set(heavy) | set(probe["heavy"]))
+    return {
+        "min_ms": round(min(times), 2),
+        "median_ms": round(statistics.median(times), 2),
+        "heavy_modules": len(heavy),
+        "heavy": heavy,
+    }
+
+
+def bench_serve(warmup: bool, als: tuple, idle_s: float) -> Dict[str, Any]:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "ALS_WARMUP": "1" if warmup else "0", "RESULT_STORE_MAX_BYTES": "0"}
+    t0 = time.perf_counter()
+    server = start_server(port, 1, env=env)
+    try:
+        wait_ready(url, poll=0.01)
+        ready = (time.perf_counter() - t0) * 1000
+        time.sleep(idle_s)
+        t1 = time.perf_counter()
+        res = httpx.post(f"{url}/als/matrix", files={"als_file": als}, timeout=600)
+        first = (time.perf_counter() - t1) * 1000
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return {"ready_ms": round(ready, 2), "first_ms": round(first, 2), "status": res.status_code}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=1000.0, help="largest acceptable import_app median")
+    ap.add_argument("--no-serve", action="store_true", help="only measure the import (no uvicorn)")
+    ap.add_argument("--idle-s", type=float, default=5.0, help="wait between ready and the first parse")
+    ap.add_argument("--out", help="write results JSON here (e.g. to save a new baseline)")
+    ap.add_argument("--baseline", help="compare against this results JSON")
+    ap.add_argument("--threshold", type=float, default=1.25, help="ratio above which a metric counts as slower")
+    ap.add_argument("--fail-on-regression", action="store_true", help="exit 1 if any metric exceeds --threshold")
+    args = ap.parse_args()
+
+    results: Dict[str, Dict[str, Any]] = {"import_app": bench_import(args.repeat)}
+    if not args.no_serve:
+        with tempfile.TemporaryDirectory(prefix="als-startup-") as workdir:
+            spec, _ = generate_set(workdir, "small", "crosstab")
+            with open(spec.path, "rb") as fh:
+                als = ("als.xlsx", fh.read())
+        for warmup in (False, True):
+            results[f"serve/warmup={int(warmup)}"] = bench_serve(warmup, als, args.idle_s)
+
+    print_table(results, ["min_ms", "median_ms", "heavy_modules", "ready_ms", "first_ms"])
+    if args.out:
+        write_results(args.out, run_meta(benchmark="startup", repeat=args.repeat, budgetMs=args.budget_ms), results)
+    regressions = report_against(results, args.baseline, args.threshold)
+
+    imported = results["import_app"]
+    failed = False
+    if imported["median_ms"] > args.budget_ms:
+        print(f"import app.main took {imported['median_ms']:.0f} ms (budget {args.budget_ms:.0f} ms)", file=sys.stderr)
+        failed = True
+    if imported["heavy"]:
+        print(f"imported at startup: {', '.join(imported['heavy'])}", file=sys.stderr)
+        failed = True
+    failed = failed or any(r.get("status", 200) != 200 for r in results.values())
+    return 1 if failed or (regressions and args.fail_on_regression) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
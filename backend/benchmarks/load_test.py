@@ -0,0 +1,178 @@
+"""
+HTTP load test of /als/matrix and /ssd/compare against a local uvicorn.
+
+Starts `uvicorn app.main:app` on a free port (or uses --url), uploads a synthetic ALS
+workbook (and SSD export) `--requests` times per endpoint with `--concurrency`
+requests in flight, and reports latency percentiles and throughput. The first
+request of each endpoint is reported separately (`first_ms`): it is the one that
+parses; later ones for the same upload are served from the parse caches.
+
+Usage (from backend/; needs uvicorn and httpx):
+    python -m benchmarks.load_test --size medium --requests 50 --concurrency 8 --out http.json
+    python -m benchmarks.load_test --size medium --baseline http.json
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .report import print_table, report_against, run_meta, write_results
+from .synthetic_als import LAYOUTS, SIZES, SSD_FORMATS, generate_set
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(
+    port: int, workers: int, verbose: bool = False, env: Optional[Dict[str, str]] = None
+) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+           "--port", str(port), "--log-level", "warning", "--workers", str(workers)]
+    sink = None if verbose else subprocess.DEVNULL
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, stdout=sink, stderr=sink, env=env)
+
+
+def wait_ready(url: str, timeout: float = 60.0, poll: float = 0.2) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/als/ping", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(poll)
+    raise RuntimeError(f"server at {url} did not come up within {timeout}s")
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+async def load(
+    url: str,
+    path: str,
+    files: Dict[str, tuple],
+    params: Dict[str, Any],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    statuses: Dict[str, int] = {}
+    latencies: List[float] = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=600) as client:
+        async def one() -> float:
+            async with gate:
+                t0 = time.perf_counter()
+                try:
+                    res = await client.post(path, files=files, params=params)
+                    status = str(res.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                ms = (time.perf_counter() - t0) * 1000
+                statuses[status] = statuses.get(status, 0) + 1
+                return ms
+
+        first = await one()
+        t0 = time.perf_counter()
+        latencies = list(await asyncio.gather(*(one() for _ in range(max(requests - 1, 0)))))
+        wall = time.perf_counter() - t0
+
+    out: Dict[str, Any] = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": sum(n for s, n in statuses.items() if s != "200"),
+        "statuses": statuses,
+        "first_ms": round(first, 2),
+    }
+    if latencies:
+        out.update({
+            "p50_ms": round(statistics.median(latencies), 2),
+            "p90_ms": round(_percentile(latencies, 90), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+            "max_ms": round(max(latencies), 2),
+            "rps": round(len(latencies) / wall, 2) if wall else None,
+        })
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--size", choices=sorted(SIZES), default="medium")
+    ap.add_argument("--layout", choices=LAYOUTS, default="crosstab")
+    ap.add_argument("--ssd-format", choices=SSD_FORMATS, default="csv")
+    ap.add_argument("--requests", type=int, default=30, help="requests per endpoint")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--server-workers", type=int, default=1, help="uvicorn --workers")
+    ap.add_argument("--url", help="use a running server instead of starting one")
+    ap.add_argument("--verbose", action="store_true", help="show the started server's log output")
+    ap.add_argument("--out", help="write results JSON here (e.g. to save a new baseline)")
+    ap.add_argument("--baseline", help="compare against this results JSON")
+    ap.add_argument("--threshold", type=float, default=1.25, help="ratio above which a metric counts as slower")
+    ap.add_argument("--fail-on-regression", action="store_true", help="exit 1 if any metric exceeds --threshold")
+    args = ap.parse_args()
+
+    server: Optional[subprocess.Popen] = None
+    url = args.url
+    if not url:
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = start_server(port, args.server_workers, args.verbose)
+    try:
+        wait_ready(url)
+        with tempfile.TemporaryDirectory(prefix="als-load-") as workdir:
+            spec, ssd_paths = generate_set(workdir, args.size, args.layout)
+            with open(spec.path, "rb") as fh:
+                als = ("als.xlsx", fh.read())
+            ssd_path = ssd_paths[args.ssd_format]
+            with open(ssd_path, "rb") as fh:
+                ssd = (os.path.basename(ssd_path), fh.read())
+
+        case = f"{args.size}/{args.layout}"
+        results = {
+            f"{case}/als_matrix": asyncio.run(load(
+                url, "/als/matrix", {"als_file": als}, {"matrix_oid": "MASTERDASHBOARD"},
+                args.requests, args.concurrency,
+            )),
+            f"{case}/ssd_compare_{args.ssd_format}": asyncio.run(load(
+                url, "/ssd/compare", {"als_file": als, "ssd_file": ssd}, {"matrix_oid": "MASTERDASHBOARD"},
+                args.requests, args.concurrency,
+            )),
+        }
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    print_table(results, ["errors", "first_ms", "p50_ms", "p90_ms", "p99_ms", "rps"])
+    if args.out:
+        write_results(args.out, run_meta(
+            benchmark="http", url=args.url or "local uvicorn", serverWorkers=args.server_workers,
+            size=args.size, layout=args.layout,
+        ), results)
+    regressions = report_against(results, args.baseline, args.threshold)
+    failed = any(r["errors"] for r in results.values())
+    return 1 if failed or (regressions and args.fail_on_regression) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
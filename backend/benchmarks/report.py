@@ -0,0 +1,104 @@
+"""
+Benchmark result files: writing, and comparing a run against a saved baseline.
+
+A result file is JSON of the form
+    {"meta": {...run environment...}, "results": {case: {metric: number, ...}}}
+Metrics ending in "_ms" are timings and "_kib" peak memory; both are compared as
+current / baseline ratios, so lower is better.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import platform
+import subprocess
+import sys
+
+
+def run_meta(**extra: Any) -> Dict[str, Any]:
+    """Environment of the current run, stored next to the numbers."""
+    import openpyxl
+    import pandas
+
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        rev = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pandas": pandas.__version__,
+        "openpyxl": openpyxl.__version__,
+        "gitRev": rev,
+        **extra,
+    }
+
+
+def write_results(path: str, meta: Dict[str, Any], results: Dict[str, Dict[str, Any]]) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"meta": meta, "results": results}, fh, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def compare(
+    current: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    threshold: float = 1.25,
+) -> Tuple[List[Tuple[str, str, float, float, float]], List[str]]:
+    """
+    Rows of (case, metric, baseline, current, ratio) for every timing / memory metric
+    present in both runs, and the "case metric" names whose ratio exceeds `threshold`.
+    """
+    rows: List[Tuple[str, str, float, float, float]] = []
+    regressions: List[str] = []
+    for case in sorted(set(current) & set(baseline)):
+        for metric in sorted(set(current[case]) & set(baseline[case])):
+            if not (metric.endswith("_ms") or metric.endswith("_kib")):
+                continue
+            old, new = baseline[case][metric], current[case][metric]
+            if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or old <= 0:
+                continue
+            ratio = new / old
+            rows.append((case, metric, old, new, ratio))
+            if ratio > threshold:
+                regressions.append(f"{case} {metric}")
+    return rows, regressions
+
+
+def print_table(results: Dict[str, Dict[str, Any]], metrics: List[str]) -> None:
+    width = max([len(c) for c in results] + [4])
+    print("case".ljust(width) + "".join(m.rjust(14) for m in metrics))
+    for case, values in results.items():
+        cells = []
+        for m in metrics:
+            v = values.get(m)
+            cells.append(("-" if v is None else f"{v:.2f}" if isinstance(v, float) else str(v)).rjust(14))
+        print(case.ljust(width) + "".join(cells))
+
+
+def report_against(
+    current: Dict[str, Dict[str, Any]],
+    baseline_path: Optional[str],
+    threshold: float,
+) -> int:
+    """Print the comparison with `baseline_path` (if given); returns the number of regressions."""
+    if not baseline_path:
+        return 0
+    base = load_results(baseline_path)
+    rows, regressions = compare(current, base["results"], threshold)
+    print(f"\nagainst {baseline_path} (rev {base['meta'].get('gitRev')}):")
+    width = max([len(f"{r[0]} {r[1]}") for r in rows] + [4])
+    for case, metric, old, new, ratio in rows:
+        flag = "  <-- slower" if ratio > threshold else ""
+        print(f"{case} {metric}".ljust(width) + f"{old:12.2f}{new:12.2f}{ratio:8.2f}x{flag}")
+    if regressions:
+        print(f"{len(regressions)} metric(s) above {threshold:.2f}x the baseline", file=sys.stderr)
+    return len(regressions)
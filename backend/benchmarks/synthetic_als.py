@@ -0,0 +1,183 @@
+"""
+Deterministic synthetic RAVE ALS workbooks (and matching SSD exports) for benchmarks.
+
+Real ALS files cannot leave the validated environment, so the benchmarks run on
+generated workbooks with the same shape the parser expects:
+  - CRFDraft, Folders (OID / Ordinal / FolderName), Forms (OID / Ordinal / DraftFormName)
+  - MASTERDASHBOARD, Matrix and MatrixN#OID sheets, each with a couple of note rows
+    above the header
+  - crosstab layout (forms in rows, folders in columns, X/1/Yes markers) or
+    long layout (one FolderOID / FormOID row per relationship)
+  - optionally messy matrix headers: a blank header cell (pandas' 'Unnamed: i') and
+    a repeated column label ('X.1'), with markers / values under both
+
+The same seed and sizes always give the same cell contents. SSD exports (JSON rows,
+CSV, XLSX) are derived from the MASTERDASHBOARD pairs with a few pairs dropped and
+added, so compares have both missing and extra entries.
+
+Usage (from backend/):
+    python -m benchmarks.synthetic_als --out /tmp/als --size medium --layout crosstab [--messy-headers]
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+import argparse
+import csv
+import json
+import os
+import random
+
+from openpyxl import Workbook
+
+# (folders, forms, extra matrices)
+SIZES: Dict[str, Tuple[int, int, int]] = {
+    "small": (15, 40, 3),
+    "medium": (60, 250, 6),
+    "large": (200, 800, 10),
+    "wide": (200, 500, 3),  # the 500-form x 200-folder matrix the pair extraction is tuned on
+}
+LAYOUTS = ("crosstab", "long")
+SSD_FORMATS = ("json", "csv", "xlsx")
+
+_MARKS = ["X", "x", "1", "Yes", "true", " X "]
+_BLANKS = ["", None, "n"]
+
+
+@dataclass
+class SyntheticALS:
+    """
+    What was generated: OIDs and the (FolderOID, FormOID) pairs of every matrix sheet
+    (pairs marked under messy header columns are not listed).
+    """
+    path: str
+    layout: str
+    folders: List[str]
+    forms: List[str]
+    matrices: Dict[str, List[Tuple[str, str]]] = field(default_factory=dict)  # sheet -> pairs
+
+
+def _matrix_pairs(rnd: random.Random, folders: List[str], forms: List[str], density: float) -> List[Tuple[str, str]]:
+    return [(fo, fm) for fm in forms for fo in folders if rnd.random() < density]
+
+
+def _write_matrix(wb: Workbook, title: str, layout: str, folders: List[str], forms: List[str],
+                  pairs: List[Tuple[str, str]], rnd: random.Random, messy_headers: bool = False) -> None:
+    ws = wb.create_sheet(title)
+    ws.append([f"Matrix: {title}"])
+    ws.append([])
+    if layout == "crosstab":
+        marked = set(pairs)
+        extra = ["", folders[0]] if messy_headers else []
+        ws.append(["FormOID", "DraftFormName"] + folders + extra)
+        for fm in forms:
+            row = [fm, f"{fm.title()} form"]
+            row += [rnd.choice(_MARKS) if (fo, fm) in marked else rnd.choice(_BLANKS) for fo in folders]
+            row += [rnd.choice(_MARKS + _BLANKS) for _ in extra]
+            ws.append(row)
+    else:
+        extra = ["", "Note", "FormOID"] if messy_headers else []
+        ws.append(["FolderOID", "FormOID", "Note"] + extra)
+        for fo, fm in pairs:
+            ws.append([fo, fm, ""] + [rnd.choice(["", "n", fm]) for _ in extra])
+
+
+def generate_als(
+    path: str,
+    size: str = "small",
+    layout: str = "crosstab",
+    seed: int = 1,
+    density: float = 0.3,
+    messy_headers: bool = False,
+) -> SyntheticALS:
+    """Write a synthetic ALS workbook to `path`; returns what was written."""
+    n_folders, n_forms, n_extra = SIZES[size]
+    rnd = random.Random(seed)
+    folders = [f"V{i:03d}" for i in range(n_folders)] + ["SCREEN", "EOS"]
+    forms = [f"FRM{i:04d}" for i in range(n_forms)]
+    spec = SyntheticALS(path=path, layout=layout, folders=folders, forms=forms)
+
+    wb = Workbook()
+    draft = wb.active
+    draft.title = "CRFDraft"
+    draft.append(["DraftName", "ProjectName"])
+    draft.append([f"Draft {seed}", "SYNTHETIC"])
+
+    ws = wb.create_sheet("Folders")
+    ws.append(["OID", "Ordinal", "FolderName", "ParentFolderOID"])
+    for i, fo in enumerate(folders):
+        ws.append([fo, i + 1, f"Visit {fo}", ""])
+    ws = wb.create_sheet("Forms")
+    ws.append(["OID", "Ordinal", "DraftFormName", "IsTemplate"])
+    for i, fm in enumerate(forms):
+        ws.append([fm, i + 1, f"{fm.title()} form", "FALSE"])
+
+    sheets = ["MASTERDASHBOARD", "Matrix"] + [f"Matrix{i}#M{i:02d}" for i in range(1, n_extra + 1)]
+    for title in sheets:
+        pairs = _matrix_pairs(rnd, folders, forms, density)
+        spec.matrices[title] = pairs
+        _write_matrix(wb, title, layout, folders, forms, pairs, rnd, messy_headers)
+
+    wb.save(path)
+    return spec
+
+
+def ssd_pairs(spec: SyntheticALS, seed: int = 1, churn: float = 0.02) -> List[Tuple[str, str]]:
+    """MASTERDASHBOARD pairs with ~churn of them dropped and as many unknown ones added."""
+    rnd = random.Random(seed)
+    pairs = [p for p in spec.matrices["MASTERDASHBOARD"] if rnd.random() >= churn]
+    n_extra = max(1, int(len(spec.matrices["MASTERDASHBOARD"]) * churn))
+    pairs += [(rnd.choice(spec.folders), f"NEW{i:04d}") for i in range(n_extra)]
+    return pairs
+
+
+def generate_ssd(spec: SyntheticALS, out_dir: str, seed: int = 1) -> Dict[str, str]:
+    """Write the SSD export in every format; returns format -> path."""
+    rows = [
+        {"FolderOID": fo, "OID": fm.lower() if i % 5 == 0 else fm, "FormName": f"{fm.title()} form"}
+        for i, (fo, fm) in enumerate(ssd_pairs(spec, seed))
+    ]
+    stem = os.path.join(out_dir, os.path.splitext(os.path.basename(spec.path))[0] + "_ssd")
+    paths = {fmt: f"{stem}.{fmt}" for fmt in SSD_FORMATS}
+
+    with open(paths["json"], "w", encoding="utf-8") as fh:
+        json.dump(rows, fh)
+    with open(paths["csv"], "w", encoding="utf-8", newline="") as fh:
+        writer = csv.DictWriter(fh, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "SSD"
+    ws.append(list(rows[0]))
+    for r in rows:
+        ws.append(list(r.values()))
+    wb.save(paths["xlsx"])
+    return paths
+
+
+def generate_set(
+    out_dir: str, size: str, layout: str, seed: int = 1, messy_headers: bool = False
+) -> Tuple[SyntheticALS, Dict[str, str]]:
+    """ALS workbook plus its SSD exports under `out_dir`, named after size and layout."""
+    os.makedirs(out_dir, exist_ok=True)
+    name = f"als_{size}_{layout}{'_messy' if messy_headers else ''}.xlsx"
+    spec = generate_als(os.path.join(out_dir, name), size, layout, seed, messy_headers=messy_headers)
+    return spec, generate_ssd(spec, out_dir, seed)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", required=True, help="output directory")
+    ap.add_argument("--size", choices=sorted(SIZES), default="small")
+    ap.add_argument("--layout", choices=LAYOUTS, default="crosstab")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--messy-headers", action="store_true", help="add a blank and a repeated matrix header")
+    args = ap.parse_args()
+    spec, ssd = generate_set(args.out, args.size, args.layout, args.seed, args.messy_headers)
+    print(spec.path)
+    for path in ssd.values():
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Shared fixtures: the app importable from backend/, stores kept out of the shared temp
+dir, and the synthetic ALS workbooks from benchmarks/synthetic_als.py.
+
+Run from backend/:
+    python -m pytest -q
+"""
+from __future__ import annotations
+from typing import Dict, Tuple
+import os
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# config reads these at import time; keep the tests off any store a running API uses,
+# and parse in a single pool worker so the pool tests do not depend on the host
+_STATE = tempfile.mkdtemp(prefix="als-tests-")
+os.environ.setdefault("RESULT_STORE_MAX_BYTES", "0")
+os.environ.setdefault("ALS_PARSE_WORKERS", "1")
+for _name in ("RESULT_STORE_DIR", "JOB_STORE_DIR", "UPLOAD_STORE_DIR"):
+    os.environ.setdefault(_name, os.path.join(_STATE, _name.lower()))
+
+import pytest  # noqa: E402
+
+from benchmarks.synthetic_als import LAYOUTS, SyntheticALS, generate_set  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def synthetic(tmp_path_factory) -> Dict[str, Tuple[SyntheticALS, Dict[str, str]]]:
+    """
+    (ALS workbook spec, SSD format -> path), small size, by layout: "crosstab", "long",
+    and "crosstab_messy" / "long_messy" with blank and repeated matrix headers.
+    """
+    out = str(tmp_path_factory.mktemp("synthetic"))
+    sets = {}
+    for layout in LAYOUTS:
+        sets[layout] = generate_set(out, "small", layout)
+        sets[f"{layout}_messy"] = generate_set(out, "small", layout, messy_headers=True)
+    return sets
+
+
+@pytest.fixture(scope="session")
+def client():
+    """A TestClient on the app, started once: parse pool up, shut down after the session."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
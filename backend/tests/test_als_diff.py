@@ -0,0 +1,81 @@
+"""POST /als/diff and changed_sheets() on a synthetic ALS and an amended copy of it."""
+from __future__ import annotations
+from typing import Any, Dict, Tuple
+
+import pytest
+from openpyxl import load_workbook
+
+from app.services.als_diff import changed_sheets
+from benchmarks.synthetic_als import SyntheticALS, generate_als
+
+
+@pytest.fixture(scope="module")
+def versions(tmp_path_factory) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    (old path, new path, what changed): one FolderName renamed, one MASTERDASHBOARD pair
+    added and one removed, Matrix1#M01 dropped and Matrix9#M09 added. Every other sheet
+    is only re-saved by openpyxl.
+    """
+    out = tmp_path_factory.mktemp("diff")
+    spec: SyntheticALS = generate_als(str(out / "v1.xlsx"), layout="crosstab", seed=7)
+    pairs = set(spec.matrices["MASTERDASHBOARD"])
+    added = next((fo, fm) for fm in spec.forms for fo in spec.folders if (fo, fm) not in pairs)
+    removed = sorted(pairs)[0]
+
+    wb = load_workbook(spec.path)
+    wb["Folders"].cell(row=2, column=3, value="Renamed visit")
+    ws = wb["MASTERDASHBOARD"]
+    for (fo, fm), mark in ((added, "X"), (removed, None)):
+        # title, blank and header rows come first; folders start in the third column
+        ws.cell(row=4 + spec.forms.index(fm), column=3 + spec.folders.index(fo)).value = mark
+    del wb["Matrix1#M01"]
+    wb.create_sheet("Matrix9#M09")
+    new_path = str(out / "v2.xlsx")
+    wb.save(new_path)
+    return spec.path, new_path, {"spec": spec, "added": added, "removed": removed}
+
+
+def _diff(client, old, new):
+    with open(old, "rb") as fo, open(new, "rb") as fn:
+        resp = client.post("/als/diff", files={"old_file": ("v1.xlsx", fo), "new_file": ("v2.xlsx", fn)})
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def test_diff_reports_the_amendments(client, versions):
+    old, new, changes = versions
+    spec = changes["spec"]
+    (fo_add, fm_add), (fo_rm, fm_rm) = changes["added"], changes["removed"]
+    diff = _diff(client, old, new)
+
+    assert diff["matrices"] == {"added": ["M09"], "removed": ["M01"]}
+    first = spec.folders[0]
+    assert diff["folderRenames"] == [{"folderOID": first, "old": f"Visit {first}", "new": "Renamed visit"}]
+    assert diff["formRenames"] == []
+    assert diff["matrixChanges"] == {
+        "MASTERDASHBOARD": {"formsAdded": {fo_add: [fm_add]}, "formsRemoved": {fo_rm: [fm_rm]}},
+    }
+    # re-saved but unchanged sheets (Forms, the other matrices) are not reported
+    assert diff["meta"]["changedSheets"] == ["Folders", "MASTERDASHBOARD"]
+    assert diff["meta"]["sheetsCompared"] == 2 + len(spec.matrices) - 1
+
+
+def test_diff_against_itself_is_empty(client, versions):
+    old, _, _ = versions
+    diff = _diff(client, old, old)
+    assert diff["meta"]["changedSheets"] == []
+    assert diff["matrices"] == {"added": [], "removed": []}
+    assert (diff["folderRenames"], diff["formRenames"], diff["matrixChanges"]) == ([], [], {})
+
+
+def test_changed_sheets(versions, tmp_path):
+    old, new, _ = versions
+    same = ["Forms", "Matrix", "Matrix2#M02"]
+    flags = changed_sheets(old, new, [(s, s) for s in same + ["Folders", "MASTERDASHBOARD", "Matrix1#M01"]])
+    assert flags == [False, False, False, True, True, True]  # a sheet missing on one side counts as changed
+    with open(old, "rb") as fh:
+        assert changed_sheets(fh.read(), old, [("Forms", "Forms")]) == [False]
+
+    not_xlsx = tmp_path / "als.csv"
+    not_xlsx.write_text("FolderOID,FormOID\n")
+    assert changed_sheets(old, str(not_xlsx), [("Forms", "Forms")]) is None
@@ -0,0 +1,44 @@
+"""POST /ssd/compare/batch: per-file results, and a full parse queue waited out."""
+from __future__ import annotations
+
+from app.api import routes_ssd
+from app.services.parse_pool import ParseQueueFull, extract_matrix_pooled
+
+
+def _files(spec, ssd, n):
+    files = [("als_files", (f"als{i}.xlsx", open(spec.path, "rb"))) for i in range(n)]
+    return files + [("ssd_file", ("ssd.csv", open(ssd["csv"], "rb")))]
+
+
+def _post(client, files):
+    try:
+        return client.post("/ssd/compare/batch", files=files)
+    finally:
+        for _, (_, fh) in files:
+            fh.close()
+
+
+def test_full_queue_is_retried_not_reported(synthetic, client, monkeypatch):
+    spec, ssd = synthetic["long"]
+    refusals = [ParseQueueFull(retry_after=0)] * 2
+
+    async def busy_then_free(*args, **kwargs):
+        if refusals:
+            raise refusals.pop()
+        return await extract_matrix_pooled(*args, **kwargs)
+
+    monkeypatch.setattr(routes_ssd, "extract_matrix_pooled", busy_then_free)
+    resp = _post(client, _files(spec, ssd, 2))
+    assert resp.status_code == 200
+    body = resp.json()
+    assert not refusals
+    assert body["counts"]["files"] == body["counts"]["ok"] == 2
+
+
+def test_a_bad_file_fails_alone(synthetic, client):
+    spec, ssd = synthetic["long"]
+    files = _files(spec, ssd, 1)
+    files.insert(1, ("als_files", ("broken.xlsx", open(ssd["csv"], "rb"))))
+    body = _post(client, files).json()
+    assert [r["status"] for r in body["results"]] == ["ok", "error"]
+    assert body["counts"]["failed"] == 1
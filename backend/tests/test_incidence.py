@@ -0,0 +1,76 @@
+"""Incidence set algebra against the per-folder set code it replaced (benchmarks/baseline.py)."""
+from __future__ import annotations
+from typing import Dict, List, Set, Tuple
+import random
+
+import pytest
+
+from app.services.als_matrix import _ssd_diff, extract_matrix
+from app.services.incidence import Incidence, Vocabulary
+from app.services.ssd_reader import read_ssd
+from benchmarks.baseline import form_changes_baseline, ssd_diff_baseline
+
+Pairs = List[Tuple[str, str]]
+
+
+def _random_pairs(rnd: random.Random, n: int) -> Pairs:
+    folders = [f"V{i:02d}" for i in range(12)] + ["SCREEN", ""]
+    forms = [f"FRM{i:03d}" for i in range(30)] + ["frm001", ""]
+    return [(rnd.choice(folders), rnd.choice(forms)) for _ in range(n)]
+
+
+def _grouped(pairs: Set[Tuple[str, str]]) -> Dict[str, List[str]]:
+    out: Dict[str, List[str]] = {}
+    for fo, fm in sorted(pairs):
+        out.setdefault(fo, []).append(fm)
+    return out
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_set_operations_match_python_sets(seed):
+    rnd = random.Random(seed)
+    a, b = _random_pairs(rnd, 200), _random_pairs(rnd, 150)
+    folders, forms = Vocabulary(), Vocabulary()
+    ia, ib = Incidence.from_pairs(a, folders, forms), Incidence.from_pairs(b, folders, forms)
+    sa, sb = set(a), set(b)
+
+    assert len(ia) == len(sa)
+    assert ia.difference(ib).to_folder_map() == _grouped(sa - sb)
+    assert ia.intersection(ib).to_folder_map() == _grouped(sa & sb)
+    assert ia.union(ib).to_folder_map() == _grouped(sa | sb)
+    assert ib.difference(ia).to_folder_map() == _grouped(sb - sa)
+
+
+def test_folder_order_and_vocabularies():
+    inc = Incidence.from_folder_map({"V2": ["b", "a"], "V1": ["c"], "V3": ["a"]}, upper_forms=True)
+    assert inc.to_folder_map() == {"V1": ["C"], "V2": ["A", "B"], "V3": ["A"]}
+    # folder_order sets the order and drops folders it does not list
+    assert list(inc.to_folder_map(["V3", "V2"]).items()) == [("V3", ["A"]), ("V2", ["A", "B"])]
+    assert Incidence.from_pairs([]).to_folder_map() == {}
+    with pytest.raises(ValueError):
+        inc.difference(Incidence.from_pairs([("V1", "C")]))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_form_changes_match_baseline(seed):
+    rnd = random.Random(seed)
+    before, after = _random_pairs(rnd, 120), _random_pairs(rnd, 120)
+    # as in als_diff.diff_als_versions: pairs with a blank side are ignored
+    folders, forms = Vocabulary(), Vocabulary()
+    old = Incidence.from_pairs(((fo, fm) for fo, fm in before if fo and fm), folders, forms)
+    new = Incidence.from_pairs(((fo, fm) for fo, fm in after if fo and fm), folders, forms)
+    assert (new.difference(old).to_folder_map(), old.difference(new).to_folder_map()) == form_changes_baseline(
+        before, after
+    )
+
+
+def test_ssd_diff_matches_baseline(synthetic):
+    spec, ssd = synthetic["long"]
+    folders = extract_matrix(spec.path, "MASTERDASHBOARD")["folders"]
+    ssd_map = read_ssd(ssd["csv"], "ssd.csv")
+    # case differences and folders known to one side only
+    ssd_map = {**ssd_map, "ONLYSSD": ["frm0001", "FRM0002"], spec.folders[0]: ["frm0000", "NEW"]}
+    for case in (ssd_map, {}, {fo: [] for fo in ssd_map}):
+        got, expected = _ssd_diff(folders, case), ssd_diff_baseline(folders, case)
+        # same content and the same folder order
+        assert {k: list(v.items()) for k, v in got.items()} == {k: list(v.items()) for k, v in expected.items()}
@@ -0,0 +1,99 @@
+"""Parse jobs: de-duplication, status polling and expiry (POST /jobs/*, GET /jobs/{id}, JobStore)."""
+from __future__ import annotations
+import subprocess
+import sys
+import time
+
+from app.services.jobs import DONE, ERROR, PENDING, RUNNING, JobStore, dedupe_key
+from benchmarks.synthetic_als import generate_als
+
+
+def _wait(client, job_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        body = client.get(f"/jobs/{job_id}").json()
+        if body["job"]["status"] in (DONE, ERROR) or time.monotonic() > deadline:
+            return body
+        time.sleep(0.05)
+
+
+def _submit(client, route, files, **params):
+    handles = {name: (fname, open(path, "rb")) for name, (fname, path) in files.items()}
+    try:
+        resp = client.post(route, params=params, files=handles)
+    finally:
+        for _, fh in handles.values():
+            fh.close()
+    assert resp.status_code == 202
+    return resp.json()
+
+
+def test_matrix_job_is_deduplicated_and_returns_the_parse(client, tmp_path):
+    path = generate_als(str(tmp_path / "als.xlsx"), seed=400).path
+    files = {"als_file": ("als.xlsx", path)}
+    first = _submit(client, "/jobs/als-matrix", files)
+    again = _submit(client, "/jobs/als-matrix", files)
+    assert (first["deduplicated"], again["deduplicated"]) == (False, True)
+    assert again["job"]["id"] == first["job"]["id"]
+
+    body = _wait(client, first["job"]["id"])
+    assert body["job"]["status"] == DONE
+    assert (body["job"]["step"], body["job"]["progress"]) == ("done", 1.0)
+    with open(path, "rb") as fh:
+        direct = client.post("/als/matrix", files={"als_file": ("als.xlsx", fh)}).json()
+    direct.pop("status")
+    assert body["result"] == direct
+
+    # a done job is still shared; other parameters are another job
+    assert _submit(client, "/jobs/als-matrix", files)["job"]["id"] == first["job"]["id"]
+    other = _submit(client, "/jobs/als-matrix", files, matrix_oid="M01")
+    assert other["job"]["id"] != first["job"]["id"]
+    assert _wait(client, other["job"]["id"])["result"]["meta"]["matrixOID"] == "M01"
+
+
+def test_failed_job_reports_its_error(client, synthetic, tmp_path):
+    spec, _ = synthetic["long"]
+    ssd = tmp_path / "ssd.txt"
+    ssd.write_text("FolderOID,OID\n")
+    files = {"als_file": ("als.xlsx", spec.path), "ssd_file": ("ssd.txt", str(ssd))}
+    job = _submit(client, "/jobs/ssd-compare", files)
+    body = _wait(client, job["job"]["id"])
+    assert body["job"]["status"] == ERROR
+    assert "Unsupported SSD file format" in body["job"]["error"]
+    assert body["result"] is None
+    assert client.get("/jobs/not-a-job").status_code == 404
+
+
+def test_store_dedupe_and_expiry(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"), ttl_s=60)
+    key = dedupe_key("als-matrix", als="abc", matrix_oid=None)
+    assert key == dedupe_key("als-matrix", matrix_oid=None, als="abc")
+    job, created = store.create_or_get("als-matrix", key, {"file_name": "a.xlsx"})
+    assert created and job["status"] == PENDING and job["params"] == {"file_name": "a.xlsx"}
+
+    for status in (RUNNING, DONE):
+        store.update(job["id"], status=status)
+        assert store.create_or_get("als-matrix", key, {}) == (store.get(job["id"]), False)
+
+    # past the TTL a finished job is dropped, and the next submission starts a new one
+    store._conn().execute("UPDATE jobs SET updated = ? WHERE id = ?", (time.time() - 120, job["id"]))
+    fresh, created = store.create_or_get("als-matrix", key, {})
+    assert created and fresh["id"] != job["id"]
+    assert store.get(job["id"]) is None
+
+    # a failed job is not reused
+    store.update(fresh["id"], status=ERROR, error="boom")
+    assert store.create_or_get("als-matrix", key, {})[1]
+
+
+def test_jobs_of_an_exited_worker_fail(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    key = dedupe_key("als-matrix", als="def")
+    job, _ = store.create_or_get("als-matrix", key, {})
+    gone = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    store.update(job["id"], status=RUNNING, owner=int(gone.stdout))
+
+    assert store.get(job["id"])["status"] == ERROR
+    assert store.get(job["id"])["error"] == "The worker running this job exited"
+    replacement, created = store.create_or_get("als-matrix", key, {})
+    assert created and replacement["id"] != job["id"]
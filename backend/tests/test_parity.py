@@ -0,0 +1,29 @@
+"""extract_matrix gives the same result as the pre-rewrite parser (benchmarks/baseline.py)."""
+from __future__ import annotations
+import pytest
+
+from app.config import READERS
+from app.services.als_matrix import extract_matrix
+from benchmarks.baseline import extract_matrix_baseline
+
+WORKBOOKS = ("crosstab", "long", "crosstab_messy", "long_messy")
+
+
+@pytest.mark.parametrize("reader", READERS)
+@pytest.mark.parametrize("workbook", WORKBOOKS)
+def test_matches_baseline(synthetic, workbook, reader):
+    spec, _ = synthetic[workbook]
+    for sheet in spec.matrices:
+        oid = sheet.split("#", 1)[-1]
+        expected = extract_matrix_baseline(spec.path, oid)
+        got = extract_matrix(spec.path, oid, file_hash=f"{reader}:{spec.path}", reader=reader)
+        assert got["meta"]["sheet"] == sheet
+        assert got == expected
+
+
+def test_messy_headers_reach_the_result(synthetic):
+    """The blank and repeated crosstab headers become folders the way pandas names them."""
+    spec, _ = synthetic["crosstab_messy"]
+    folders = {f["folderOID"] for f in extract_matrix(spec.path, "MASTERDASHBOARD")["folders"]}
+    n = len(spec.folders) + 2
+    assert {f"Unnamed:{n}", f"{spec.folders[0]}.1"} <= folders
@@ -0,0 +1,135 @@
+"""
+The parse pool (one worker, see conftest): admission, reserve() and the concurrent
+/als/matrix/all fan-out, and a timed-out parse stopped alone so the pool keeps serving.
+"""
+from __future__ import annotations
+from itertools import count
+import asyncio
+import time
+
+import pytest
+
+from app.services import parse_pool
+from app.services.parse_cache import workbook_cache
+from app.services.parse_pool import ParseQueueFull, ParseTimeout, reserve, run_parse
+from app.services.timing import timed_call
+from benchmarks.synthetic_als import generate_als
+
+_seeds = count(100)
+
+
+def _slow_call(fn, *args, listener=None):
+    """timed_call() behind a long sleep: a parse that runs into any short timeout."""
+    time.sleep(30)
+    return timed_call(fn, *args, listener=listener)
+
+
+@pytest.fixture
+def fresh(tmp_path):
+    """A workbook no earlier test has parsed, with an empty parse cache."""
+    workbook_cache.clear()
+    return generate_als(str(tmp_path / "als.xlsx"), seed=next(_seeds)).path
+
+
+def _post(client, path, route="/als/matrix", **params):
+    with open(path, "rb") as fh:
+        return client.post(route, params=params, files={"als_file": ("als.xlsx", fh)})
+
+
+def test_full_queue_is_a_503(client, fresh):
+    held = reserve(parse_pool.ALS_PARSE_QUEUE_MAX)
+    try:
+        resp = _post(client, fresh)
+    finally:
+        held.release()
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == str(parse_pool.ALS_PARSE_RETRY_AFTER_S)
+    assert parse_pool.pool_stats()["inFlight"] == 0
+    assert _post(client, fresh).status_code == 200
+
+
+def test_timeout_is_a_504_and_the_pool_keeps_serving(client, fresh, monkeypatch):
+    assert _post(client, fresh, "/als/matrices").status_code == 200  # the pool is up
+    executor = parse_pool.get_executor()
+    monkeypatch.setattr(parse_pool, "timed_call", _slow_call)
+    monkeypatch.setattr(parse_pool, "ALS_PARSE_TIMEOUT_S", 1)
+    resp = _post(client, fresh)
+    assert resp.status_code == 504
+
+    # the one worker was stopped, not left sleeping nor replaced by a new pool
+    monkeypatch.undo()
+    started = time.perf_counter()
+    assert _post(client, fresh).status_code == 200
+    assert time.perf_counter() - started < parse_pool._STOP_GRACE_S
+    assert parse_pool.get_executor() is executor
+
+
+def test_timed_out_task_stops_alone():
+    async def scenario():
+        executor = parse_pool.get_executor()
+        with pytest.raises(ParseTimeout):
+            await run_parse(time.sleep, 30, timeout=0.5)
+        started = time.perf_counter()
+        assert await run_parse(abs, -3) == 3
+        return time.perf_counter() - started, executor
+
+    waited, executor = asyncio.run(scenario())
+    assert waited < parse_pool._STOP_GRACE_S
+    assert parse_pool.get_executor() is executor
+
+
+def test_reserve(monkeypatch):
+    monkeypatch.setattr(parse_pool, "ALS_PARSE_QUEUE_MAX", 3)
+
+    async def scenario():
+        held = reserve(5)
+        assert held.left == 3
+        with pytest.raises(ParseQueueFull):
+            reserve(1)
+        with pytest.raises(ParseQueueFull):
+            await run_parse(abs, -1)
+        # a reserved slot admits its parse although the queue is full
+        assert await run_parse(abs, -1, reservation=held) == 1
+        assert (held.left, parse_pool.pool_stats()["inFlight"]) == (2, 2)
+        held.release()
+        assert parse_pool.pool_stats()["inFlight"] == 0
+        with pytest.raises(ParseQueueFull):
+            reserve(5, least=4)
+        partial = reserve(5, least=3)
+        assert partial.left == 3
+        partial.release()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_fan_out_stays_within_the_limits(client, fresh, monkeypatch):
+    sequential = _post(client, fresh, "/als/matrix/all").json()
+    workbook_cache.clear()
+
+    # room for two parses: one matrix task and the meta task, however many sheets are missing
+    monkeypatch.setattr(parse_pool, "ALS_PARSE_WORKERS", 2)
+    monkeypatch.setattr(parse_pool, "ALS_PARSE_QUEUE_MAX", 2)
+    calls, peak = [], []
+
+    async def counted(fn, *args, **kwargs):
+        calls.append(fn.__name__)
+        peak.append(parse_pool.pool_stats()["inFlight"])
+        return await run_parse(fn, *args, **kwargs)
+
+    monkeypatch.setattr(parse_pool, "run_parse", counted)
+    fanned = _post(client, fresh, "/als/matrix/all", concurrent="true").json()
+    assert calls == ["parse_sheets", "parse_sheets"]
+    assert max(peak) <= 2
+    assert fanned == sequential
+
+    # no room at all: the fan-out is refused whole
+    workbook_cache.clear()
+    calls.clear()
+    held = reserve(2)
+    try:
+        resp = _post(client, fresh, "/als/matrix/all", concurrent="true")
+    finally:
+        held.release()
+    assert resp.status_code == 503
+    assert not calls
+    assert parse_pool.pool_stats()["inFlight"] == 0
@@ -0,0 +1,101 @@
+"""read_ssd gives the same map as the pre-rewrite SSD parser (benchmarks/baseline.py)."""
+from __future__ import annotations
+import json
+
+import pytest
+from openpyxl import Workbook
+
+from app.config import READERS
+from app.services.ssd_reader import read_ssd
+from benchmarks.baseline import ssd_map_baseline
+
+CSV_CASES = {
+    "bom": "\\ufeffFolderOID,OID\\nSCR,DM\\nscr , ae \\nV1,VS\\n",
+    "duplicate_headers": "FolderOID,OID,OID,FolderOID\\nSCR,DM,XX,YY\\nV1,VS,ZZ,\\n",
+    "near_duplicate_headers": "FolderOID, folderoid ,OID,FormOID\\nSCR,V9,DM,AE\\nV1,,VS,LB\\n",
+    "quoted_headers": '"Folder OID","Form OID","Note, with comma"\\n"SCR","DM","a"\\n"V1","VS, LB","b"\\n',
+    "short_rows": "FolderOID,OID,Extra\\nSCR,DM\\nV1\\n,VS,x\\n",
+    "no_columns": "Folder,Form\\nSCR,DM\\n",
+}
+
+JSON_CASES = {
+    "rows": [{"FolderOID": "SCR", "OID": "dm"}, {"FolderOID": " v1 ", "OID": "VS", "Extra": 1}],
+    "rows_mixed_numbers": [{"FolderOID": "SCR", "OID": 7}, {"FolderOID": 1, "OID": "DM"}],
+    "rows_blank_and_zero": [
+        {"FolderOID": "SCR", "OID": ""}, {"FolderOID": "V1", "OID": 0}, {"FolderOID": "V2", "OID": "AE"},
+    ],
+    "dict": {"SCR": ["dm", "AE", "dm"], "V1": [1, "vs"], "ignored": "not a list"},
+    "empty_rows": [],
+}
+
+
+def _write(tmp_path, name, content):
+    path = tmp_path / name
+    if isinstance(content, str):
+        path.write_text(content, encoding="utf-8")
+    else:
+        path.write_text(json.dumps(content), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("case", CSV_CASES)
+def test_csv_matches_baseline(tmp_path, case):
+    path = _write(tmp_path, f"{case}.csv", CSV_CASES[case])
+    assert read_ssd(path, "ssd.csv") == ssd_map_baseline(path, "ssd.csv")
+
+
+@pytest.mark.parametrize("case", JSON_CASES)
+def test_json_matches_baseline(tmp_path, case):
+    path = _write(tmp_path, f"{case}.json", JSON_CASES[case])
+    assert read_ssd(path, "ssd.json") == ssd_map_baseline(path, "ssd.json")
+
+
+def test_json_rows_documented_differences(tmp_path):
+    """
+    The two changes from the DataFrame path: a null or missing OID used to become a
+    "NAN" OID and is now skipped, and an integer in an all-number column with gaps or
+    floats used to read as "1.0" and now reads as "1".
+    """
+    gaps = _write(tmp_path, "gaps.json", [
+        {"FolderOID": "SCR", "OID": "DM"},
+        {"FolderOID": "SCR", "OID": None},
+        {"FolderOID": "V1"},
+        {"FolderOID": None, "OID": "AE"},
+    ])
+    assert ssd_map_baseline(gaps, "ssd.json") == {"SCR": ["DM", "NAN"], "V1": ["NAN"], "NAN": ["AE"]}
+    assert read_ssd(gaps, "ssd.json") == {"SCR": ["DM"]}
+
+    numbers = _write(tmp_path, "numbers.json", [
+        {"FolderOID": "V1", "OID": 1},
+        {"FolderOID": "V2", "OID": 2.5},
+        {"FolderOID": "V3"},
+    ])
+    assert ssd_map_baseline(numbers, "ssd.json") == {"V1": ["1.0"], "V2": ["2.5"], "V3": ["NAN"]}
+    assert read_ssd(numbers, "ssd.json") == {"V1": ["1"], "V2": ["2.5"]}
+
+
+@pytest.mark.parametrize("reader", READERS)
+def test_xlsx_matches_baseline(tmp_path, synthetic, reader):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "SSD"
+    ws.append(["FolderOID", "OID", "OID", "Count"])
+    ws.append(["SCR", "DM", "XX", 3])
+    ws.append(["scr ", 101, None, 4])
+    ws.append([2, "vs", "YY", None])
+    ws.append([None, "AE", None, None])
+    ws.append(["V1"])
+    wb.create_sheet("Other").append(["FolderOID", "OID"])
+    handmade = str(tmp_path / "handmade.xlsx")
+    wb.save(handmade)
+
+    _, ssd = synthetic["long"]
+    for path in (handmade, ssd["xlsx"]):
+        got = read_ssd(path, "ssd.xlsx", file_hash=f"{reader}:{path}", reader=reader)
+        assert got == ssd_map_baseline(path, "ssd.xlsx")
+
+
+def test_synthetic_exports_match_baseline(synthetic):
+    _, ssd = synthetic["crosstab"]
+    for fmt in ("csv", "json"):
+        assert read_ssd(ssd[fmt], f"ssd.{fmt}") == ssd_map_baseline(ssd[fmt], f"ssd.{fmt}")
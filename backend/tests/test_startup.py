@@ -0,0 +1,16 @@
+"""Importing the app does not load the parse stack; the first parse (or warm_up()) does."""
+from __future__ import annotations
+import json
+import subprocess
+import sys
+
+from conftest import BACKEND
+
+HEAVY = ("pandas", "numpy", "openpyxl", "app.services.als_matrix", "app.services.ssd_reader")
+
+
+def test_app_import_skips_the_parsers():
+    # a fresh interpreter: this one already holds pandas from the other tests
+    script = f"import json, sys; import app.main; print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    out = subprocess.run([sys.executable, "-c", script], cwd=BACKEND, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.splitlines()[-1]) == []
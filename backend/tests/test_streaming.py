@@ -0,0 +1,38 @@
+"""POST /als/matrix?stream=true: the NDJSON records, and errors before the stream starts."""
+from __future__ import annotations
+import json
+
+from openpyxl import Workbook
+
+
+def _post(client, path, **params):
+    with open(path, "rb") as fh:
+        return client.post("/als/matrix", params=params, files={"als_file": (path, fh)})
+
+
+def test_stream_matches_the_json_response(synthetic, client):
+    spec, _ = synthetic["crosstab"]
+    whole = _post(client, spec.path).json()
+    resp = _post(client, spec.path, stream="true")
+    assert resp.status_code == 200
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["type"] for r in (lines[0], lines[-1])] == ["meta", "end"]
+    assert lines[0]["meta"] == whole["meta"]
+    assert [r["folder"] for r in lines[1:-1]] == whole["folders"]
+
+
+def test_missing_matrix_is_a_400_not_a_cut_stream(tmp_path, client):
+    wb = Workbook()
+    wb.active.title = "Folder"
+    wb["Folder"].append(["FolderOID", "FolderName"])
+    wb.create_sheet("Form").append(["FormOID", "DraftFormName"])
+    wb.create_sheet("Matrix3#VISIT").append(["FormOID", "SCREEN"])
+    path = str(tmp_path / "no_default_matrix.xlsx")
+    wb.save(path)
+
+    # listing caches the workbook's sheets, so the parse request finds an entry with no usable matrix
+    with open(path, "rb") as fh:
+        assert client.post("/als/matrices", files={"als_file": (path, fh)}).status_code == 200
+    resp = _post(client, path, stream="true")
+    assert resp.status_code == 400
+    assert "No usable Matrix sheet" in resp.json()["detail"]
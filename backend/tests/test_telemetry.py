@@ -0,0 +1,95 @@
+"""Server-Timing headers from TimingMiddleware and the /metrics exposition."""
+from __future__ import annotations
+from typing import Dict, List, Tuple
+import re
+
+from app.services.metrics import Histogram
+from app.services.parse_cache import workbook_cache
+from app.services.timing import PhaseTimer
+from benchmarks.synthetic_als import generate_als
+
+_TIMING = re.compile(r'^(?P<name>[a-z_]+);dur=(?P<dur>\d+\.\d)(;desc="(?P<desc>[^"]*)")?$')
+# label values may hold braces themselves (route="/jobs/{job_id}")
+_SAMPLE = re.compile(r'^(?P<name>[a-z_]+)(\{(?P<labels>(?:[^"}]|"(?:[^"\\]|\\.)*")*)\})? (?P<value>-?[0-9.e+]+)$')
+
+
+def _timings(header: str) -> List[Tuple[str, str]]:
+    out = []
+    for part in header.split(", "):
+        m = _TIMING.match(part)
+        assert m, part
+        out.append((m["name"], m["desc"] or ""))
+    return out
+
+
+def _samples(text: str) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+    """name -> [(labels, value)]; every line must be a HELP / TYPE comment or a sample."""
+    out: Dict[str, List[Tuple[Dict[str, str], float]]] = {}
+    typed = set()
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            typed.add(line.split()[2])
+            continue
+        if line.startswith("# HELP "):
+            continue
+        m = _SAMPLE.match(line)
+        assert m, line
+        labels = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', m["labels"] or ""))
+        out.setdefault(m["name"], []).append((labels, float(m["value"])))
+        assert re.sub(r"_(bucket|sum|count)$", "", m["name"]) in typed | {m["name"]}, line
+    return out
+
+
+def test_server_timing_lists_the_parse_phases(client, tmp_path):
+    workbook_cache.clear()
+    path = generate_als(str(tmp_path / "als.xlsx"), seed=300).path
+    headers = []
+    for _ in range(2):
+        with open(path, "rb") as fh:
+            resp = client.post("/als/matrix", files={"als_file": ("als.xlsx", fh)})
+        assert resp.status_code == 200
+        headers.append(_timings(resp.headers["server-timing"]))
+    cold, warm = headers
+
+    names = [n for n, _ in cold]
+    # phases recorded in the pool worker come back with the API process's own
+    assert {"upload", "cache_lookup", "workbook_load", "pair_extract", "build"} <= set(names)
+    assert names[-1] == "total" and names.count("total") == 1
+    assert ("cache_lookup", "hit=False") in cold
+    assert ("cache_lookup", "hit=True") in warm
+    assert "workbook_load" not in {n for n, _ in warm}
+
+    assert client.get("/als/ping").headers["server-timing"].startswith("total;dur=")
+
+
+def test_server_timing_format():
+    timer = PhaseTimer()
+    timer.add("meta_read", 5.06, {"sheet": 'Say "hi"'})
+    value = timer.server_timing(12.34)
+    assert value == "meta_read;dur=5.1;desc=\"sheet=Say 'hi'\", total;dur=12.3"
+
+
+def test_metrics_exposition(client):
+    assert client.get("/als/ping").status_code == 200
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = _samples(resp.text)
+
+    ping = [v for labels, v in samples["als_http_request_duration_seconds_count"]
+            if labels == {"method": "GET", "route": "/als/ping", "status": "200"}]
+    assert ping and ping[0] >= 1
+    assert {labels["cache"] for labels, _ in samples["als_cache_entries"]} >= {"workbook", "ssd"}
+    assert samples["als_parse_pool_workers"] == [({}, 1.0)]
+    assert samples["als_parse_pool_in_flight"] == [({}, 0.0)]
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = Histogram("t_seconds", "Test.", (0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 3.0):
+        hist.observe(v, route='/a"b')
+    samples = _samples("\n".join(hist.render()))
+    buckets = [(labels["le"], v) for labels, v in samples["t_seconds_bucket"]]
+    assert buckets == [("0.1", 2), ("1", 3), ("+Inf", 4)]
+    assert samples["t_seconds_count"] == [({"route": '/a\\"b'}, 4)]
+    assert samples["t_seconds_sum"][0][1] == 3.65
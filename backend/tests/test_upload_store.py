@@ -0,0 +1,81 @@
+"""Uploads held by content hash: GET /uploads/{sha256}, als_hash / ssd_hash, TTL and LRU eviction."""
+from __future__ import annotations
+import hashlib
+import os
+import time
+
+from app.services.upload_store import UploadStore
+from benchmarks.synthetic_als import generate_als
+
+
+def _sha(path):
+    with open(path, "rb") as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+
+def test_uploads_are_reused_by_hash(client, synthetic, tmp_path):
+    path = generate_als(str(tmp_path / "study.xlsx"), seed=500).path
+    sha = _sha(path)
+    assert client.get(f"/uploads/{sha}").status_code == 404
+    with open(path, "rb") as fh:
+        sent = client.post("/als/matrix", files={"als_file": ("study.xlsx", fh)})
+    assert sent.status_code == 200
+
+    held = client.get(f"/uploads/{sha.upper()}").json()["upload"]
+    assert (held["sha256"], held["file_name"], held["size"]) == (sha, "study.xlsx", os.path.getsize(path))
+    assert client.post("/als/matrix", params={"als_hash": sha}).json() == sent.json()
+
+    _, ssd = synthetic["long"]
+    with open(ssd["csv"], "rb") as fh:
+        first = client.post("/ssd/compare", params={"als_hash": sha}, files={"ssd_file": ("ssd.csv", fh)})
+    again = client.post("/ssd/compare", params={"als_hash": sha, "ssd_hash": _sha(ssd["csv"])})
+    assert first.status_code == again.status_code == 200
+    assert again.json() == first.json()
+
+
+def test_hash_errors(client, tmp_path):
+    assert client.get("/uploads/not-a-hash").status_code == 400
+    assert client.post("/als/matrix", params={"als_hash": "0" * 64}).status_code == 404
+    assert client.post("/als/matrix", params={"als_hash": "xyz"}).status_code == 400
+    path = tmp_path / "a.xlsx"
+    path.write_bytes(b"x")
+    with open(path, "rb") as fh:
+        both = client.post("/als/matrix", params={"als_hash": "0" * 64}, files={"als_file": ("a.xlsx", fh)})
+    assert both.status_code == 400
+    assert client.post("/als/matrix").status_code == 400
+
+
+def _put(store, tmp_path, name, size):
+    src = tmp_path / name
+    src.write_bytes(name.encode() * size)
+    sha = hashlib.sha256(src.read_bytes()).hexdigest()
+    store.put(str(src), sha, name, os.path.getsize(src))
+    return sha
+
+
+def test_least_recently_used_go_first(tmp_path):
+    store = UploadStore(str(tmp_path / "store"), max_bytes=250, ttl_s=0)
+    a = _put(store, tmp_path, "a", 100)
+    b = _put(store, tmp_path, "b", 100)
+    time.sleep(0.01)
+    assert store.info(a) is not None  # b is now the least recently used
+    c = _put(store, tmp_path, "c", 100)
+    assert store.info(b) is None and not os.path.exists(os.path.join(store.root, b))
+    assert store.info(a) is not None and store.info(c) is not None
+    assert store.stats() == {"entries": 2, "bytes": 200, "maxBytes": 250}
+
+
+def test_expired_uploads_are_not_served(tmp_path):
+    store = UploadStore(str(tmp_path / "store"), max_bytes=10_000, ttl_s=60)
+    sha = _put(store, tmp_path, "a", 100)
+    held = store.check_out(sha)
+    assert held["expires"] > time.time()
+
+    store._conn().execute("UPDATE uploads SET accessed = ?", (time.time() - 120,))
+    assert store.info(sha) is None
+    assert not os.path.exists(os.path.join(store.root, sha))
+    assert store.stats()["entries"] == 0
+    # a checked-out copy outlives the eviction of the stored file
+    with open(held["path"], "rb") as fh:
+        assert fh.read() == b"a" * 100
+    os.unlink(held["path"])